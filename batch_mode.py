@@ -0,0 +1,267 @@
+import inspect
+import json
+import sys
+import metrics
+from device_factory import DeviceFactory
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+
+class CommandError(Exception):
+    """
+    Erro de validação ou de execução de um comando em modo não interativo.
+    """
+
+
+def _to_int(value, field):
+    """
+    Converte o argumento inteiro de um comando.
+
+    :raises CommandError: Se o valor não for um inteiro, indicando o campo.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise CommandError(f"Invalid {field}: {value}")
+
+
+class CommandRunner:
+    """
+    Executa comandos orientados a linha sobre uma SmartHome, sem menus.
+
+    Cada linha é um comando em texto, com campos separados por espaços, ou um objeto
+    JSON com o campo "op":
+
+        add light kitchen                 {"op": "add", "type": "light", "name": "kitchen"}
+        trigger kitchen turn_on           {"op": "trigger", "name": "kitchen", "trigger": "turn_on"}
+        status kitchen                    {"op": "status", "name": "kitchen"}
+        broadcast light:on turn_off       {"op": "broadcast", "selector": "light:on", "trigger": "turn_off"}
+        remove kitchen | list [type|*] [offset] [limit] | active | count_active | stats [category]
+        changes [since]                   {"op": "changes", "since": 42}
+
+    Linhas vazias e iniciadas por '#' são ignoradas. Cada comando produz um resultado
+    JSON em uma linha: {"ok": true, "result": ...} ou {"ok": false, "error": ...}.
+    """
+    FIELDS = {
+        'add': ('type', 'name'),
+        'remove': ('name',),
+        'trigger': ('name', 'trigger'),
+        'status': ('name',),
+        'broadcast': ('selector', 'trigger'),
+        'list': ('type', 'offset', 'limit'),
+        'active': (),
+        'count_active': (),
+        'stats': ('category',),
+        'changes': ('since',),
+    }
+
+    def __init__(self, home, factory=None):
+        """
+        Inicializa o executor.
+
+        :param home: Instância de SmartHome sobre a qual os comandos são executados.
+        :param factory: Fábrica usada pelo comando 'add'; por padrão, DeviceFactory().
+        """
+        self.home = home
+        self.factory = factory or DeviceFactory()
+        self._handlers = {op: getattr(self, f'_op_{op}') for op in self.FIELDS}
+        # Campo JSON -> parâmetro do handler, na ordem de FIELDS (e.g., 'type' -> device_type)
+        self._params = {op: dict(zip(fields, inspect.signature(self._handlers[op]).parameters))
+                        for op, fields in self.FIELDS.items()}
+        self._encoded = {}
+
+    def parse(self, line):
+        """
+        Converte uma linha de comando em (operação, argumentos).
+
+        :param line: Linha em texto ou JSON.
+        :return: Tupla (op, args), ou None para linhas vazias e comentários. Em JSON, `args` é
+            um dicionário de argumentos por nome, de modo que campos omitidos assumem o valor padrão.
+        :raises CommandError: Se a linha não puder ser interpretada.
+        """
+        line = line.strip()
+        if not line or line[0] == '#':
+            return None
+        if line[0] == '{':
+            try:
+                command = json.loads(line)
+            except ValueError as e:
+                raise CommandError(f"Invalid JSON: {e}")
+            op = command.get('op')
+            fields = self.FIELDS.get(op)
+            if fields is None:
+                raise CommandError(f"Unknown command: {op}")
+            params = self._params[op]
+            return op, {params[field]: command[field] for field in fields if command.get(field) is not None}
+        op, *args = line.split()
+        return op, tuple(args)
+
+    def execute(self, op, args):
+        """
+        Executa um comando já interpretado.
+
+        :param op: Nome da operação.
+        :param args: Argumentos posicionais da operação, ou dicionário de argumentos por nome.
+        :return: Resultado da operação (serializável em JSON).
+        :raises CommandError: Se o comando for inválido ou falhar.
+        """
+        handler = self._handlers.get(op)
+        if handler is None:
+            raise CommandError(f"Unknown command: {op}")
+        try:
+            return handler(**args) if type(args) is dict else handler(*args)
+        except CommandError:
+            raise
+        except TypeError:
+            raise CommandError(f"Wrong number of arguments for {op}: expected {', '.join(self.FIELDS[op]) or 'none'}")
+        except Exception as e:
+            raise CommandError(str(e.args[0]) if e.args else type(e).__name__)
+
+    def _encode_result(self, result):
+        """
+        Serializa um resultado de sucesso, reaproveitando a serialização de resultados textuais repetidos.
+        """
+        if type(result) is str:
+            encoded = self._encoded.get(result)
+            if encoded is None:
+                if len(self._encoded) >= 4096:
+                    self._encoded.clear()
+                encoded = self._encoded[result] = _encode({'ok': True, 'result': result})
+            return encoded
+        return _encode({'ok': True, 'result': result})
+
+    def run_line(self, line):
+        """
+        Interpreta e executa uma linha, devolvendo o resultado em JSON.
+
+        :param line: Linha de comando.
+        :return: Resultado JSON em uma linha, ou None para linhas ignoradas.
+        """
+        try:
+            command = self.parse(line)
+            if command is None:
+                return None
+            return self._encode_result(self.execute(*command))
+        except CommandError as e:
+            return _encode({'ok': False, 'error': str(e)})
+
+    def run(self, lines, out, errors_only=False, chunk_size=4096):
+        """
+        Executa um fluxo de comandos, escrevendo os resultados em blocos.
+
+        :param lines: Iterável de linhas de comando (e.g., um arquivo ou sys.stdin).
+        :param out: Arquivo de saída para os resultados JSON.
+        :param errors_only: Se True, apenas os comandos com erro produzem saída.
+        :param chunk_size: Número de resultados acumulados antes de cada escrita.
+        :return: Tupla (comandos executados, comandos com erro).
+        """
+        executed = failed = 0
+        buffer = []
+        parse, execute, encode_result = self.parse, self.execute, self._encode_result
+        for line in lines:
+            try:
+                if line.lstrip()[:1] == '{':
+                    command = parse(line)
+                    if command is None:
+                        continue
+                    op, args = command
+                else:
+                    # Caminho rápido para o formato em texto
+                    args = line.split()
+                    if not args or args[0][0] == '#':
+                        continue
+                    op = args.pop(0)
+                executed += 1
+                result = execute(op, args)
+                if not errors_only:
+                    buffer.append(encode_result(result))
+            except CommandError as e:
+                failed += 1
+                buffer.append(_encode({'ok': False, 'error': str(e)}))
+            if len(buffer) >= chunk_size:
+                out.write('\n'.join(buffer) + '\n')
+                buffer.clear()
+        if buffer:
+            out.write('\n'.join(buffer) + '\n')
+        out.flush()
+        return executed, failed
+
+    def _device(self, name):
+        """
+        Obtém um dispositivo da casa pelo nome.
+        """
+        device = self.home.devices.get(name)
+        if device is None:
+            raise CommandError(f"Invalid device name: {name}")
+        return device
+
+    def _op_add(self, device_type, name=None):
+        if name is None:
+            self.home.device_count += 1
+            name = f'device_{self.home.device_count}'
+        self.home.add_device(name, self.factory.create_device(device_type))
+        return name
+
+    def _op_remove(self, name):
+        self._device(name)
+        self.home.remove_device(name)
+        return name
+
+    def _op_trigger(self, name, trigger):
+        device = self._device(name)
+        with self.home.lock_for(device):
+            if not device.can_trigger(trigger):
+                raise CommandError(f"Invalid action {trigger} for {name} in state {device.state}")
+            device._fire(trigger)
+            return device.state
+
+    def _op_status(self, name):
+        return self._device(name).get_status()
+
+    def _op_broadcast(self, selector, trigger):
+        if selector == '*':
+            selector = None
+        elif ':' in selector:
+            selector = tuple(selector.split(':', 1))
+        return len(self.home.broadcast(selector, trigger))
+
+    def _op_list(self, device_type=None, offset=0, limit=None):
+        if device_type == '*':
+            device_type = None
+        records = self.home.iter_statuses(device_type, _to_int(offset, 'offset'),
+                                          None if limit is None else _to_int(limit, 'limit'))
+        return [record.format() for record in records]
+
+    def _op_active(self):
+        return self.home.get_active_statuses()
+
+    def _op_count_active(self):
+        return self.home.count_active_devices()
+
+    def _op_changes(self, since=0):
+        delta = self.home.changes_since(_to_int(since, 'since'))
+        return {'version': delta.version, 'resync': delta.resync,
+                'changes': [record._asdict() for record in delta.changes]}
+
+    def _op_stats(self, category=None):
+        if not metrics.is_enabled():
+            raise CommandError("Metrics are disabled")
+        return metrics.METRICS.snapshot(category)
+
+
+def run_script(home, path, out=None, errors_only=False):
+    """
+    Executa um arquivo de comandos (ou a entrada padrão, se `path` for '-').
+
+    :param home: Instância de SmartHome.
+    :param path: Caminho do arquivo de comandos, ou '-' para a entrada padrão.
+    :param out: Arquivo de saída; por padrão, sys.stdout.
+    :param errors_only: Se True, apenas os comandos com erro produzem saída.
+    :return: Tupla (comandos executados, comandos com erro).
+    """
+    runner = CommandRunner(home)
+    out = out or sys.stdout
+    if path == '-':
+        return runner.run(sys.stdin, out, errors_only)
+    with open(path, encoding='utf-8') as lines:
+        return runner.run(lines, out, errors_only)
@@ -0,0 +1,357 @@
+"""
+Benchmarks reproduzíveis dos caminhos críticos de dispositivos e da SmartHome.
+
+Uso:
+
+    python benchmark.py --sizes 1000,10000,100000 --output results.json
+    python benchmark.py --sizes 1000000 --scenarios add_device,count_active --memory
+    python benchmark.py --compare results.json --output new.json
+    python benchmark.py --startup --scenarios ''
+
+Cada cenário informa vazão (operações por segundo), percentis de latência por
+operação e, com --memory, o pico de memória alocada (medido em uma execução
+separada com tracemalloc, para não distorcer os tempos). Com --startup, mede
+também o tempo de importação a frio dos pontos de entrada, cada um em um
+processo novo.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from device import Light, Thermostat, SecuritySystem, AirConditioner, DoorLock
+from observer import Observer
+from smart_home import SmartHome
+
+DEVICE_CLASSES = [Light, Thermostat, SecuritySystem, AirConditioner, DoorLock]
+DEFAULT_SIZES = [1000, 10000, 100000]
+MAX_SAMPLES = 100000
+QUERY_REPEATS = 20
+STARTUP_MODULES = ['smart_home', 'cli']
+STARTUP_RUNS = 15
+
+
+def _new_home(size):
+    """
+    Cria uma casa vazia com capacidade para `size` dispositivos.
+    """
+    return SmartHome(max_devices=size)
+
+
+def _fleet(size, seed=0):
+    """
+    Cria uma frota mista de dispositivos, em proporções iguais por classe.
+    """
+    rng = random.Random(seed)
+    return [(f'device_{i}', rng.choice(DEVICE_CLASSES)()) for i in range(size)]
+
+
+def _home_with_fleet(size):
+    """
+    Cria uma casa já preenchida com uma frota mista.
+    """
+    home = _new_home(size)
+    for name, device in _fleet(size):
+        home.add_device(name, device)
+    return home
+
+
+def _timed(operations):
+    """
+    Executa operações medindo cada uma individualmente.
+
+    :param operations: Iterável de funções sem argumentos.
+    :return: Lista de latências, em nanossegundos.
+    """
+    clock = time.perf_counter_ns
+    samples = []
+    append = samples.append
+    for operation in operations:
+        start = clock()
+        operation()
+        append(clock() - start)
+    return samples
+
+
+def bench_construct(size, device_class):
+    gc.collect()
+    start = time.perf_counter_ns()
+    devices = [device_class() for _ in range(size)]
+    elapsed = time.perf_counter_ns() - start
+    return size, elapsed, None, devices
+
+
+def bench_add_device(size):
+    home = _new_home(size)
+    fleet = _fleet(size)
+    add = home.add_device
+    samples = _timed(lambda name=name, device=device: add(name, device) for name, device in fleet)
+    return size, sum(samples), samples, home
+
+
+def bench_remove_device(size):
+    home = _home_with_fleet(size)
+    remove = home.remove_device
+    samples = _timed(lambda name=name: remove(name) for name in list(home.devices))
+    return size, sum(samples), samples, home
+
+
+def bench_trigger(size):
+    home = _home_with_fleet(size)
+    rng = random.Random(1)
+    operations = []
+    for device in home.devices.values():
+        operations.append(getattr(device, rng.choice(device.valid_triggers())))
+    samples = _timed(operations)
+    return len(samples), sum(samples), samples, home
+
+
+def bench_control_lights(size):
+    home = _home_with_fleet(size)
+    actions = ['turn_on', 'turn_off'] * (QUERY_REPEATS // 2)
+    samples = _timed(lambda action=action: home.control_lights(action) for action in actions)
+    return len(samples), sum(samples), samples, home
+
+
+def bench_get_all_status(size):
+    home = _home_with_fleet(size)
+    types = ['light', 'thermostat', 'security', 'air_conditioner', 'door_lock'] * (QUERY_REPEATS // 5)
+    samples = _timed(lambda device_type=device_type: home.get_all_status(device_type) for device_type in types)
+    return len(samples), sum(samples), samples, home
+
+
+def bench_count_active(size):
+    home = _home_with_fleet(size)
+    samples = _timed(home.count_active_devices for _ in range(QUERY_REPEATS))
+    return len(samples), sum(samples), samples, home
+
+
+def bench_observer_fanout(size, observers=8):
+    home = _home_with_fleet(size)
+    watchers = [Observer(capacity=1024, verbose=False) for _ in range(observers)]
+    devices = list(home.devices.values())
+    for device in devices:
+        for watcher in watchers:
+            device.add_observer(watcher)
+    samples = _timed(device.notify_observers for device in devices)
+    return len(samples), sum(samples), samples, home
+
+
+def bench_rule_engine(size, fleet=1000):
+    """
+    Dispara gatilhos em uma frota fixa com `size` regras, cada uma sobre um de `size`
+    dispositivos possíveis: a vazão deve ficar estável com o número de regras.
+    """
+    from rules import RuleEngine
+    home = _home_with_fleet(fleet)
+    engine = RuleEngine(home)
+    rng = random.Random(4)
+    devices = list(home.devices.items())
+    for _ in range(size):
+        device_class, other = rng.choice(DEVICE_CLASSES), rng.choice(DEVICE_CLASSES)
+        when = (device_class.device_type, rng.choice(device_class.states), f'device_{rng.randrange(size)}')
+        engine.add_rule(when=when, actions=[lambda event: None],
+                        conditions=[(other.device_type, rng.choice(other.states))])
+    operations = [(device, rng.choice(device.triggers)) for _, device in devices * 20]
+    samples = _timed(lambda operation=operation: _fire_if_valid(*operation) for operation in operations)
+    return len(samples), sum(samples), samples, (home, engine)
+
+
+def bench_subscriptions(size, fleet=1000):
+    """
+    Dispara gatilhos em uma frota fixa com `size` assinaturas filtradas por tipo, estado
+    de destino e um de `size` dispositivos possíveis: a vazão deve ficar estável com o
+    número de assinaturas.
+    """
+    from subscriptions import SubscriptionIndex
+    home = _home_with_fleet(fleet)
+    index = SubscriptionIndex(home)
+    rng = random.Random(5)
+    for _ in range(size):
+        device_class = rng.choice(DEVICE_CLASSES)
+        index.subscribe(lambda event: None, device_type=device_class.device_type,
+                        name=f'device_{rng.randrange(size)}',
+                        dest=rng.choice(device_class.states))
+    rng = random.Random(4)
+    operations = [(device, rng.choice(device.triggers)) for device in list(home.devices.values()) * 20]
+    samples = _timed(lambda operation=operation: _fire_if_valid(*operation) for operation in operations)
+    return len(samples), sum(samples), samples, (home, index)
+
+
+def _fire_if_valid(device, trigger):
+    """
+    Executa um gatilho se ele for válido no estado atual (sem lançar exceções).
+    """
+    if device.can_trigger(trigger):
+        getattr(device, trigger)()
+
+
+SCENARIOS = {
+    **{f'construct_{cls.__name__}': (lambda size, cls=cls: bench_construct(size, cls)) for cls in DEVICE_CLASSES},
+    'add_device': bench_add_device,
+    'remove_device': bench_remove_device,
+    'trigger': bench_trigger,
+    'control_lights': bench_control_lights,
+    'get_all_status': bench_get_all_status,
+    'count_active': bench_count_active,
+    'observer_fanout': bench_observer_fanout,
+    'rule_engine': bench_rule_engine,
+    'subscriptions': bench_subscriptions,
+}
+
+
+def _percentiles(samples):
+    """
+    Calcula percentis de latência, em microssegundos.
+    """
+    if len(samples) > MAX_SAMPLES:
+        samples = random.Random(2).sample(samples, MAX_SAMPLES)
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    pick = lambda q: round(ordered[min(last, int(q * len(ordered)))] / 1000, 3)
+    return {'p50': pick(0.50), 'p90': pick(0.90), 'p99': pick(0.99), 'p999': pick(0.999),
+            'max': round(ordered[-1] / 1000, 3)}
+
+
+def run_scenario(name, size, memory=False):
+    """
+    Executa um cenário em um tamanho de frota.
+
+    :param name: Nome do cenário (chave de SCENARIOS).
+    :param size: Número de dispositivos.
+    :param memory: Se True, mede também o pico de memória em uma segunda execução.
+    :return: Dicionário com os resultados.
+    """
+    scenario = SCENARIOS[name]
+    gc.collect()
+    ops, elapsed_ns, samples, _ = scenario(size)
+    result = {
+        'scenario': name,
+        'size': size,
+        'ops': ops,
+        'seconds': round(elapsed_ns / 1e9, 6),
+        'throughput': round(ops / (elapsed_ns / 1e9), 1) if elapsed_ns else None,
+        'latency_us': _percentiles(samples) if samples else None,
+    }
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        kept = scenario(size)
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        del kept
+    return result
+
+
+def measure_startup(modules=STARTUP_MODULES, runs=STARTUP_RUNS):
+    """
+    Mede o tempo de importação a frio de cada módulo, em processos Python novos.
+
+    :param modules: Módulos a importar.
+    :param runs: Número de processos por módulo.
+    :return: Lista de dicionários com a mediana e o mínimo, em milissegundos, e se a
+        biblioteca `transitions` foi carregada pela importação.
+    """
+    code = ("import sys, time; start = time.perf_counter(); import {0}; "
+            "print(time.perf_counter() - start, 'transitions' in sys.modules)")
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for module in modules:
+        samples = []
+        for _ in range(runs):
+            output = subprocess.run([sys.executable, '-c', code.format(module)], capture_output=True,
+                                    text=True, cwd=cwd, check=True).stdout.split()
+            samples.append(float(output[0]) * 1000)
+        samples.sort()
+        results.append({'module': module, 'runs': runs, 'median_ms': round(samples[len(samples) // 2], 3),
+                        'min_ms': round(samples[0], 3), 'loads_transitions': output[1] == 'True'})
+    return results
+
+
+def _metadata():
+    """
+    Descreve o ambiente e a revisão do código medidos.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(baseline, current):
+    """
+    Compara a vazão de duas execuções, cenário a cenário.
+
+    :return: Lista de linhas de texto com a razão atual/base.
+    """
+    previous = {(r['scenario'], r['size']): r for r in baseline['results']}
+    lines = []
+    for result in current['results']:
+        before = previous.get((result['scenario'], result['size']))
+        if before and before['throughput'] and result['throughput']:
+            ratio = result['throughput'] / before['throughput']
+            lines.append(f"{result['scenario']:28s} {result['size']:>9d}  {ratio:6.2f}x")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks dos caminhos críticos da casa inteligente.")
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help="tamanhos de frota separados por vírgula (e.g., 1000,1000000)")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help="cenários separados por vírgula (padrão: todos)")
+    parser.add_argument('--memory', action='store_true', help="mede também o pico de memória")
+    parser.add_argument('--output', help="grava os resultados em JSON neste arquivo (padrão: saída padrão)")
+    parser.add_argument('--compare', metavar='BASELINE', help="compara a vazão com um JSON anterior")
+    parser.add_argument('--startup', action='store_true', help="mede o tempo de importação a frio")
+    parser.add_argument('--metrics', action='store_true', help="executa com a instrumentação habilitada")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    names = [name for name in args.scenarios.split(',') if name]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    if args.metrics:
+        import metrics
+        metrics.enable()
+
+    random.seed(0)
+    report = {'meta': dict(_metadata(), metrics=args.metrics), 'results': []}
+    if args.startup:
+        report['startup'] = measure_startup()
+        for result in report['startup']:
+            print(f"import {result['module']:21s} {result['median_ms']:>9.1f} ms", file=sys.stderr)
+    for size in sizes:
+        for name in names:
+            result = run_scenario(name, size, args.memory)
+            report['results'].append(result)
+            print(f"{name:28s} {size:>9d}  {result['throughput'] or 0:>14,.0f} ops/s", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print('\n'.join(compare(json.load(f), report)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,61 @@
+import argparse
+import atexit
 from smart_home import SmartHome
 from device_factory import DeviceFactory
 from observer import Observer
-from device import Light, Thermostat, SecuritySystem, AirConditioner, DoorLock
 
-def main():
+def main(argv=None):
     """
     Main function to interact with the smart home system via CLI.
+
+    With --script, commands are read from a file (or stdin, with '-') and executed
+    without menus; results are written to stdout as JSON lines.
     """
+    parser = argparse.ArgumentParser(description="Smart home system CLI.")
+    parser.add_argument('--script', metavar='PATH',
+                        help="run the commands in PATH (or stdin, if '-') non-interactively")
+    parser.add_argument('--max-devices', type=int, default=1000000,
+                        help="maximum number of devices in script mode (default: 1000000)")
+    parser.add_argument('--errors-only', action='store_true',
+                        help="in script mode, only write results for failed commands")
+    parser.add_argument('--data-dir', metavar='DIR',
+                        help="persist the home in DIR (snapshot + journal) and restore it on startup")
+    parser.add_argument('--sync', choices=['always', 'batch', 'none'], default='batch',
+                        help="journal durability with --data-dir (default: batch)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="collect latency histograms and counters (see the 'stats' command)")
+    args = parser.parse_args(argv)
+
+    if args.metrics:
+        import metrics
+        metrics.enable()
+
+    store = None
+    if args.data_dir:
+        from persistence import HomeStore
+        store = HomeStore(args.data_dir, sync=args.sync)
+
+    if args.script:
+        from batch_mode import run_script
+        home = SmartHome(max_devices=args.max_devices)
+        if store:
+            store.open(home)
+            atexit.register(store.close, snapshot=True)
+        run_script(home, args.script, errors_only=args.errors_only)
+        return
+
     # Request the maximum number of devices from the user
     max_devices = int(input("Enter the maximum number of devices: "))
     
     # Initialize the smart home system with the provided device limit
     home = SmartHome(max_devices=max_devices)
+    if store:
+        store.open(home)
+        atexit.register(store.close, snapshot=True)
     factory = DeviceFactory()
     observer = Observer()
+    device_types = factory.device_types()
+    type_choices = ', '.join(device_types)
 
     while True:
         # Display the menu options
@@ -27,12 +69,13 @@ def main():
         print("7. List active devices")
         print("8. Count active devices")
         print("9. Exit")
+        print("10. Show statistics")
         choice = input("Choose an option: ")
 
         if choice == '1':
             # Add a new device
-            device_type = input("Enter the device type (light, thermostat, security, air_conditioner, door_lock): ").lower()
-            if device_type in ['light', 'thermostat', 'security', 'air_conditioner', 'door_lock']:
+            device_type = input(f"Enter the device type ({type_choices}): ").lower()
+            if device_type in device_types:
                 if len(home.devices) < max_devices:
                     try:
                         device = factory.create_device(device_type)
@@ -59,10 +102,9 @@ def main():
                 print("Invalid device name!")
         elif choice == '3':
             # Display status of specific devices
-            device_type = input("Enter the device type to show status (light, thermostat, security, air_conditioner, door_lock): ").lower()
-            if device_type in ['light', 'thermostat', 'security', 'air_conditioner', 'door_lock']:
-                device_class = factory.create_device(device_type).__class__
-                statuses = [f"{name}: {device.get_status()}" for name, device in home.devices.items() if isinstance(device, device_class)]
+            device_type = input(f"Enter the device type to show status ({type_choices}): ").lower()
+            if device_type in device_types:
+                statuses = [f"{name}: {device.get_status()}" for name, device in home.get_devices(device_type)]
                 if statuses:
                     print(f"Status of {device_type.capitalize()} devices:")
                     for status in statuses:
@@ -76,32 +118,18 @@ def main():
             device_name = input("Enter the name of the device to control: ")
             if device_name in home.devices:
                 device = home.devices[device_name]
-                if isinstance(device, Light):
-                    action = input("Enter the action (turn_on, turn_off): ").lower()
-                    action_mapping = {'turn_on': 'turn_on', 'turn_off': 'turn_off'}
-                elif isinstance(device, Thermostat):
-                    action = input("Enter the action (heat, cool, turn_off): ").lower()
-                    action_mapping = {'heat': 'heat', 'cool': 'cool', 'turn_off': 'turn_off'}
-                elif isinstance(device, SecuritySystem):
-                    action = input("Enter the action (arm_home, arm_away, disarm): ").lower()
-                    action_mapping = {'arm_home': 'arm_home', 'arm_away': 'arm_away', 'disarm': 'disarm'}
-                elif isinstance(device, AirConditioner):
-                    action = input("Enter the action (cool, heat, turn_off): ").lower()
-                    action_mapping = {'cool': 'cool', 'heat': 'heat', 'turn_off': 'turn_off'}
-                elif isinstance(device, DoorLock):
-                    action = input("Enter the action (unlock, lock, lock_with_alarm): ").lower()
-                    action_mapping = {'unlock': 'unlock', 'lock': 'lock', 'lock_with_alarm': 'lock_with_alarm'}
+                # The actions offered come from the device class's transition table
+                action = input(f"Enter the action ({', '.join(device.triggers)}): ").lower()
+                if action not in device.triggers:
+                    print("Invalid action!")
+                elif not device.can_trigger(action):
+                    print(f"Action '{action}' is not allowed now! Valid actions: "
+                          f"{', '.join(device.valid_triggers()) or 'none'}")
                 else:
-                    print("Unsupported device!")
-                    continue
-
-                try:
                     # Executes the selected action
-                    getattr(device, action_mapping[action])()
+                    getattr(device, action)()
                     device.notify_observers()
                     print("Action executed successfully!")
-                except (AttributeError, KeyError):
-                    print("Invalid action!")
             else:
                 print("Invalid device name!")
         elif choice == '5':
@@ -119,21 +147,22 @@ def main():
                 print("Unknown action!")
         elif choice == '6':
             # List all devices
-            devices = home.list_all_devices()
-            if devices:
+            records = home.iter_statuses()
+            first = next(records, None)
+            if first is not None:
                 print("List of all devices:")
-                for device_info in devices:
-                    print(device_info)
+                print(first.format())
+                for record in records:
+                    print(record.format())
             else:
                 print("No devices found.")
         elif choice == '7':
             # List active devices
-            active_devices = home.get_active_devices()
-            if active_devices:
+            active_statuses = home.get_active_statuses()
+            if active_statuses:
                 print("Active devices:")
-                for name, device in home.devices.items():
-                    if device in active_devices:
-                        print(f"{name}: {device.get_status()}")
+                for status in active_statuses:
+                    print(status)
             else:
                 print("No active devices found.")
         elif choice == '8':
@@ -144,6 +173,14 @@ def main():
             # Exit the program
             print("Exiting...")
             break
+        elif choice == '10':
+            # Show the collected metrics
+            import metrics
+            if metrics.is_enabled():
+                for line in metrics.METRICS.format():
+                    print(line)
+            else:
+                print("Metrics are disabled! Start with --metrics.")
         else:
             print("Invalid option! Please try again.")
 
@@ -0,0 +1,280 @@
+import heapq
+import threading
+import time
+from collections import namedtuple
+
+# Mudança líquida de um dispositivo em uma janela: estado antes da primeira transição,
+# estado depois da última e número de transições fundidas. Tem os campos de um
+# ChangeEvent, de modo que consumidores de EventBus (e.g., Observer.on_events) a aceitam.
+NetChange = namedtuple('NetChange', 'name device_type source dest timestamp count')
+
+
+class _Burst:
+    """
+    Mudanças pendentes de um dispositivo dentro da janela atual.
+    """
+    __slots__ = ('name', 'device_type', 'source', 'dest', 'timestamp', 'count', 'deadline', 'device')
+
+    def __init__(self, name, device_type, source, deadline, device=None):
+        self.name = name
+        self.device_type = device_type
+        self.source = source
+        self.deadline = deadline
+        self.count = 0
+        # Dispositivo sem nome: mantido enquanto a rajada está pendente, para que seu id
+        # não seja reaproveitado por outro objeto
+        self.device = device
+
+
+class Debouncer:
+    """
+    Funde rajadas de mudanças de estado em uma única mudança líquida por dispositivo.
+
+    A primeira mudança de um dispositivo abre uma janela (configurável por dispositivo
+    ou por tipo); as mudanças seguintes dentro dela apenas atualizam o estado final e
+    a contagem. Quando a janela vence, os consumidores recebem um NetChange (estado
+    inicial -> estado final); se o dispositivo voltou ao estado em que estava, a
+    rajada é descartada. Dispositivos sem janela (0) são repassados imediatamente.
+
+    Pode ser registrado como ouvinte da SmartHome (`home.add_listener(debouncer)`) ou
+    como observador de dispositivos (`device.add_observer(debouncer)`). As janelas
+    vencidas são entregues por `poll` (também chamado a cada nova mudança) ou pela
+    thread iniciada com `start`.
+
+    Dispositivos sem nome (observados fora de uma casa) são identificados por `id()` e
+    só são referenciados enquanto têm rajada pendente; seus NetChange têm nome None, e
+    o último estado visto é esquecido quando a rajada é entregue.
+    """
+    def __init__(self, windows=None, default=0.0, clock=time.monotonic):
+        """
+        Inicializa o debouncer.
+
+        :param windows: Dicionário nome do dispositivo ou tipo (e.g., 'light') -> janela em segundos.
+            A janela de um dispositivo prevalece sobre a do seu tipo.
+        :param default: Janela dos dispositivos sem configuração própria.
+        :param clock: Função que devolve o instante atual, em segundos.
+        :raises ValueError: Se alguma janela for negativa.
+        """
+        self.windows = {}
+        self.default = 0.0
+        self.clock = clock
+        self.received = 0
+        self.delivered = 0
+        self.cancelled = 0
+        self._bursts = {}
+        self._due = []
+        self._last = {}
+        self._consumers = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._closed = False
+        self._thread = None
+        self.set_window(None, default)
+        for key, seconds in (windows or {}).items():
+            self.set_window(key, seconds)
+
+    def set_window(self, key, seconds):
+        """
+        Define a janela de um dispositivo ou tipo.
+
+        :param key: Nome do dispositivo, tipo, ou None para a janela padrão.
+        :param seconds: Duração da janela; 0 desativa a fusão.
+        :raises ValueError: Se a janela for negativa.
+        """
+        if seconds < 0:
+            raise ValueError("Window must not be negative")
+        if key is None:
+            self.default = seconds
+        else:
+            self.windows[key] = seconds
+
+    def subscribe(self, consumer):
+        """
+        Registra um consumidor de lotes de mudanças líquidas.
+
+        :param consumer: Objeto com o método `on_events(changes)` ou uma função que recebe a lista de NetChange.
+        """
+        self._consumers.append(getattr(consumer, 'on_events', consumer))
+
+    def __len__(self):
+        """
+        :return: Número de dispositivos com mudanças pendentes.
+        """
+        return len(self._bursts)
+
+    def __call__(self, event):
+        """
+        Permite registrar o debouncer diretamente como ouvinte da SmartHome.
+        """
+        self.on_change(event)
+
+    def on_change(self, event):
+        """
+        Acrescenta um ChangeEvent à rajada do seu dispositivo.
+
+        :param event: Evento de mudança (inclusões e remoções também são fundidas).
+        """
+        self._add(event.name, event.device_type, event.source, event.dest, event.timestamp)
+
+    def update(self, device):
+        """
+        Interface de observador: acrescenta o estado atual de um dispositivo à sua rajada,
+        usando o último estado visto como origem.
+
+        :param device: Dispositivo com status alterado.
+        """
+        name = device._name
+        key = name if name is not None else id(device)
+        self._add(key, device.device_type, self._last.get(key), device.state, self.clock(),
+                  device if name is None else None)
+
+    def update_batch(self, devices):
+        """
+        Interface de observador para notificações agrupadas.
+
+        :param devices: Dispositivos com status alterado.
+        """
+        for device in devices:
+            self.update(device)
+
+    def _add(self, name, device_type, source, dest, timestamp, device=None):
+        """
+        Registra uma mudança, abrindo uma janela se o dispositivo não tiver rajada pendente.
+
+        :param device: Dispositivo sem nome identificado por `id()` em `name`, ou None.
+        """
+        window = self.windows.get(name)
+        if window is None:
+            window = self.windows.get(device_type, self.default)
+        now = self.clock()
+        with self._lock:
+            self.received += 1
+            if dest is None:
+                self._last.pop(name, None)
+            else:
+                self._last[name] = dest
+            burst = self._bursts.get(name)
+            if burst is None:
+                burst = _Burst(name, device_type, source, now + window, device)
+                if window:
+                    self._bursts[name] = burst
+                    heapq.heappush(self._due, (burst.deadline, id(burst), burst))
+                    self._wakeup.notify()
+            burst.dest = dest
+            burst.timestamp = timestamp
+            burst.count += 1
+            if not window and type(name) is int:
+                self._last.pop(name, None)
+            expired = self._due and self._due[0][0] <= now
+        if not window:
+            self._deliver([burst])
+        if expired:
+            self.poll()
+
+    def _take(self, now):
+        """
+        Retira as rajadas com janela vencida (todas, se `now` for None). Deve ser chamado com o lock adquirido.
+        """
+        due = self._due
+        bursts = []
+        while due and (now is None or due[0][0] <= now):
+            burst = heapq.heappop(due)[2]
+            del self._bursts[burst.name]
+            if type(burst.name) is int:
+                # Dispositivo sem nome: o id pode ser reaproveitado por outro objeto
+                self._last.pop(burst.name, None)
+            bursts.append(burst)
+        return bursts
+
+    def poll(self):
+        """
+        Entrega as rajadas cujas janelas já venceram.
+
+        :return: Número de mudanças líquidas entregues.
+        """
+        with self._lock:
+            bursts = self._take(self.clock())
+        return self._deliver(bursts)
+
+    def flush(self):
+        """
+        Entrega imediatamente todas as rajadas pendentes, sem esperar as janelas.
+
+        :return: Número de mudanças líquidas entregues.
+        """
+        with self._lock:
+            bursts = self._take(None)
+        return self._deliver(bursts)
+
+    def next_due(self):
+        """
+        :return: Instante em que vence a próxima janela, ou None se não houver rajadas pendentes.
+        """
+        due = self._due
+        return due[0][0] if due else None
+
+    def _deliver(self, bursts):
+        """
+        Converte as rajadas em mudanças líquidas, descarta as que se anularam e as entrega aos consumidores.
+        """
+        changes = []
+        for burst in bursts:
+            if burst.source == burst.dest:
+                self.cancelled += 1
+            else:
+                name = burst.name if type(burst.name) is not int else None
+                changes.append(NetChange(name, burst.device_type, burst.source, burst.dest,
+                                         burst.timestamp, burst.count))
+        if changes:
+            for consumer in self._consumers:
+                consumer(changes)
+            self.delivered += len(changes)
+        return len(changes)
+
+    def _run(self):
+        """
+        Laço da thread que entrega as rajadas quando as janelas vencem.
+        """
+        while True:
+            with self._lock:
+                while not self._closed:
+                    deadline = self.next_due()
+                    if deadline is not None and deadline <= self.clock():
+                        break
+                    self._wakeup.wait(None if deadline is None else deadline - self.clock())
+                bursts = self._take(None if self._closed else self.clock())
+            self._deliver(bursts)
+            if self._closed:
+                return
+
+    def start(self):
+        """
+        Inicia a thread que entrega as rajadas assim que as janelas vencem (requer um
+        relógio compatível com time.monotonic).
+
+        :return: O próprio debouncer.
+        """
+        if self._thread is None:
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name='Debouncer', daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self):
+        """
+        Encerra a thread, entregando as rajadas pendentes.
+        """
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self.flush()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,17 +1,218 @@
+import threading
 from abc import ABC, abstractmethod
-from transitions import Machine
+
+# Códigos globais de estado: cada par (classe, estado) recebe um byte único, na ordem
+# de definição das classes. Usados pelo armazenamento colunar (state_store).
+STATE_CODES = []
+
+# Classes de dispositivo indexadas pelo tipo (e.g., 'light'), preenchido por __init_subclass__.
+DEVICE_TYPES = {}
+
+# Travas listradas: os gatilhos de um dispositivo da casa são serializados pela trava
+# home._stripes[stripe_index(device)], guardada em device._lock enquanto ele pertencer à
+# casa; os dispositivos fora de uma casa compartilham _FREE_LOCK.
+LOCK_STRIPES = 64  # potência de dois
+_FREE_LOCK = threading.RLock()
+
+def stripe_index(device):
+    """
+    :return: Índice da trava listrada de um dispositivo, estável enquanto ele existir.
+    """
+    return (id(device) >> 4) & (LOCK_STRIPES - 1)
+
+def _compile_table(states, transitions):
+    """
+    Compila as definições de transição de uma classe em uma tabela gatilho -> {origem: destino}.
+
+    Segue a semântica da biblioteca `transitions`: a origem pode ser um estado, uma
+    lista de estados ou '*' (todos), e vale a primeira transição definida para cada
+    par (gatilho, origem).
+
+    :param states: Estados da classe.
+    :param transitions: Lista de dicionários com 'trigger', 'source' e 'dest'.
+    :return: Tabela de transições.
+    :raises ValueError: Se uma transição usar um estado desconhecido.
+    """
+    table = {}
+    for transition in transitions:
+        sources = transition['source']
+        if sources == '*':
+            sources = states
+        elif isinstance(sources, str):
+            sources = [sources]
+        dest = transition['dest']
+        for state in (dest, *sources):
+            if state not in states:
+                raise ValueError(f"State '{state}' is not a registered state.")
+        moves = table.setdefault(transition['trigger'], {})
+        for source in sources:
+            moves.setdefault(source, dest)
+    return table
+
+class _SharedMachine:
+    """
+    Descritor que constrói, no primeiro acesso, a `transitions.Machine` compartilhada de uma classe.
+    """
+    def __init__(self):
+        self._machines = {}
+
+    def __get__(self, instance, owner):
+        if not owner.transitions:
+            return None
+        machine = self._machines.get(owner)
+        if machine is None:
+            from transitions import Machine
+            machine = self._machines[owner] = Machine(
+                model=None, states=owner.states, transitions=owner.transitions,
+                initial=owner.initial, auto_transitions=False)
+        return machine
 
 class Device(ABC):
     """
     Classe base para dispositivos no sistema de casa inteligente.
+
+    Cada subclasse declara `states`, `initial` e `transitions`; essas definições são
+    compiladas uma única vez por classe em uma tabela de transições, sem depender da
+    biblioteca `transitions`. A tabela pública `transition_table` (estado -> {gatilho:
+    destino}) responde em O(1), sem exceções, quais gatilhos são válidos em cada
+    estado. As instâncias guardam apenas o estado atual e os observadores, e os
+    gatilhos (e.g., `turn_on()`) são métodos da classe. A `transitions.Machine`
+    equivalente, compartilhada pela classe, só é importada e construída no primeiro
+    acesso a `machine`.
+
+    Quando o dispositivo é ligado a um DeviceStateStore, `state` passa a ser uma
+    visão sobre o código guardado no slot correspondente do armazenamento. Quando
+    pertence a uma SmartHome, cada transição é informada à casa para que ela mantenha
+    seus índices.
     """
+    __slots__ = ('_state', '_observers', '_store', '_slot', '_home', '_name', '_lock')
+
+    device_type = None
+    label = None
+    states = []
+    initial = None
+    transitions = []
+    machine = _SharedMachine()
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Compila as transições da subclasse em uma tabela de transições e gera os gatilhos.
+        """
+        super().__init_subclass__(**kwargs)
+        if 'transitions' not in cls.__dict__:
+            return
+        cls._table = _compile_table(cls.states, cls.transitions)
+        for trigger in cls._table:
+            setattr(cls, trigger, _make_trigger(trigger))
+        cls.triggers = tuple(cls._table)
+        cls.transition_table = {state: {} for state in cls.states}
+        for trigger, moves in cls._table.items():
+            for source, dest in moves.items():
+                cls.transition_table[source][trigger] = dest
+        cls._valid = {state: tuple(moves) for state, moves in cls.transition_table.items()}
+        cls._codes = {}
+        for state in cls.states:
+            if len(STATE_CODES) >= 255:
+                raise TypeError("Too many device states to encode")
+            cls._codes[state] = len(STATE_CODES)
+            STATE_CODES.append((cls, state))
+        if cls.label is None:
+            cls.label = cls.__name__
+        if cls.device_type is not None:
+            DEVICE_TYPES[cls.device_type] = cls
+
     def __init__(self):
         """
-        Inicializa o dispositivo com uma máquina de estados e uma lista de observadores.
+        Inicializa o dispositivo no estado inicial da classe e sem observadores.
+        """
+        self._state = self.initial
+        self._observers = ()
+        self._store = None
+        self._slot = -1
+        self._home = None
+        self._name = None
+        self._lock = _FREE_LOCK
+
+    @property
+    def state(self):
+        """
+        Estado atual do dispositivo.
+        """
+        store = self._store
+        if store is None:
+            return self._state
+        return STATE_CODES[store.codes[self._slot]][1]
+
+    @state.setter
+    def state(self, value):
+        store = self._store
+        if store is None:
+            self._state = value
+        else:
+            store.codes[self._slot] = self._codes[value]
+
+    def _fire(self, trigger):
+        """
+        Executa uma transição consultando a tabela compilada da classe.
+
+        A transição é feita com a trava do dispositivo adquirida (ver SmartHome.lock_for).
+
+        :param trigger: Nome do gatilho.
+        :return: True se a transição foi realizada.
+        :raises MachineError: Se o gatilho não for válido a partir do estado atual.
+        """
+        with self._lock:
+            source = self.state
+            dest = self._table[trigger].get(source)
+            if dest is None:
+                from transitions import MachineError
+                raise MachineError(f"Can't trigger event {trigger} from state {source}!")
+            self.state = dest
+            home = self._home
+            if home is not None:
+                home._on_transition(self, source, dest)
+            return True
+
+    @classmethod
+    def triggers_from(cls, state):
+        """
+        :param state: Estado da classe.
+        :return: Tupla dos gatilhos válidos a partir do estado, na ordem de definição.
+        :raises KeyError: Se o estado não pertencer à classe.
+        """
+        return cls._valid[state]
+
+    def valid_triggers(self):
+        """
+        :return: Tupla dos gatilhos válidos no estado atual.
+        """
+        return self._valid[self.state]
+
+    def can_trigger(self, trigger):
+        """
+        Verifica, sem executar nem lançar exceções, se um gatilho seria aceito no estado atual.
+
+        :param trigger: Nome do gatilho (pode não existir na classe).
+        :return: True se o gatilho levaria a uma transição.
+        """
+        return trigger in self.transition_table[self.state]
+
+    def next_state(self, trigger):
+        """
+        :param trigger: Nome do gatilho.
+        :return: Estado que o gatilho produziria a partir do estado atual, ou None se ele não for válido.
+        """
+        return self.transition_table[self.state].get(trigger)
+
+    @classmethod
+    def format_status(cls, state):
+        """
+        Formata o status de um dispositivo da classe em um determinado estado.
+
+        :param state: Estado do dispositivo.
+        :return: Status em formato de string (e.g., 'Light is on').
         """
-        self.state = None
-        self.machine = None
-        self._observers = []
+        return f'{cls.label} is {state}'
 
     @abstractmethod
     def get_status(self):
@@ -26,7 +227,7 @@ class Device(ABC):
 
         :param observer: Instância de Observer para notificação.
         """
-        self._observers.append(observer)
+        self._observers = self._observers + (observer,)
 
     def notify_observers(self):
         """
@@ -35,21 +236,33 @@ class Device(ABC):
         for observer in self._observers:
             observer.update(self)
 
+def _make_trigger(trigger):
+    """
+    Cria o método de gatilho compartilhado por todas as instâncias de uma classe.
+
+    :param trigger: Nome do gatilho.
+    :return: Função a ser instalada como método da classe.
+    """
+    def fire(self, *args, **kwargs):
+        return self._fire(trigger)
+    fire.__name__ = fire.__qualname__ = trigger
+    fire.__doc__ = f"Dispara o gatilho '{trigger}'."
+    return fire
+
 class Light(Device):
     """
     Classe para representar um dispositivo de luz.
     """
-    states = ['off', 'on']
+    __slots__ = ()
 
-    def __init__(self):
-        """
-        Inicializa a luz com seus estados e transições.
-        """
-        super().__init__()
-        self.state = 'off'
-        self.machine = Machine(model=self, states=Light.states, initial='off')
-        self.machine.add_transition(trigger='turn_on', source='off', dest='on')
-        self.machine.add_transition(trigger='turn_off', source='on', dest='off')
+    device_type = 'light'
+    label = 'Light'
+    states = ['off', 'on']
+    initial = 'off'
+    transitions = [
+        {'trigger': 'turn_on', 'source': 'off', 'dest': 'on'},
+        {'trigger': 'turn_off', 'source': 'on', 'dest': 'off'},
+    ]
 
     def get_status(self):
         """
@@ -57,24 +270,23 @@ class Light(Device):
 
         :return: Status da luz em formato de string.
         """
-        return f'Light is {self.state}'
+        return self.format_status(self.state)
 
 class Thermostat(Device):
     """
     Classe para representar um dispositivo de termostato.
     """
-    states = ['off', 'heating', 'cooling']
+    __slots__ = ()
 
-    def __init__(self):
-        """
-        Inicializa o termostato com seus estados e transições.
-        """
-        super().__init__()
-        self.state = 'off'
-        self.machine = Machine(model=self, states=Thermostat.states, initial='off')
-        self.machine.add_transition(trigger='heat', source=['off', 'cooling'], dest='heating')
-        self.machine.add_transition(trigger='cool', source=['off', 'heating'], dest='cooling')
-        self.machine.add_transition(trigger='turn_off', source=['heating', 'cooling'], dest='off')
+    device_type = 'thermostat'
+    label = 'Thermostat'
+    states = ['off', 'heating', 'cooling']
+    initial = 'off'
+    transitions = [
+        {'trigger': 'heat', 'source': ['off', 'cooling'], 'dest': 'heating'},
+        {'trigger': 'cool', 'source': ['off', 'heating'], 'dest': 'cooling'},
+        {'trigger': 'turn_off', 'source': ['heating', 'cooling'], 'dest': 'off'},
+    ]
 
     def get_status(self):
         """
@@ -82,24 +294,23 @@ class Thermostat(Device):
 
         :return: Status do termostato em formato de string.
         """
-        return f'Thermostat is {self.state}'
+        return self.format_status(self.state)
 
 class SecuritySystem(Device):
     """
     Classe para representar um dispositivo de sistema de segurança.
     """
-    states = ['disarmed', 'armed_home', 'armed_away']
+    __slots__ = ()
 
-    def __init__(self):
-        """
-        Inicializa o sistema de segurança com seus estados e transições.
-        """
-        super().__init__()
-        self.state = 'disarmed'
-        self.machine = Machine(model=self, states=SecuritySystem.states, initial='disarmed')
-        self.machine.add_transition(trigger='arm_home', source='disarmed', dest='armed_home')
-        self.machine.add_transition(trigger='arm_away', source='disarmed', dest='armed_away')
-        self.machine.add_transition(trigger='disarm', source=['armed_home', 'armed_away'], dest='disarmed')
+    device_type = 'security'
+    label = 'Security System'
+    states = ['disarmed', 'armed_home', 'armed_away']
+    initial = 'disarmed'
+    transitions = [
+        {'trigger': 'arm_home', 'source': 'disarmed', 'dest': 'armed_home'},
+        {'trigger': 'arm_away', 'source': 'disarmed', 'dest': 'armed_away'},
+        {'trigger': 'disarm', 'source': ['armed_home', 'armed_away'], 'dest': 'disarmed'},
+    ]
 
     def get_status(self):
         """
@@ -107,23 +318,22 @@ class SecuritySystem(Device):
 
         :return: Status do sistema de segurança em formato de string.
         """
-        return f'Security System is {self.state}'
+        return self.format_status(self.state)
 
 class AirConditioner(Device):
     """
     Classe para representar um dispositivo de ar condicionado.
     """
-    states = ['off', 'cooling']
+    __slots__ = ()
 
-    def __init__(self):
-        """
-        Inicializa o ar condicionado com seus estados e transições.
-        """
-        super().__init__()
-        self.state = 'off'
-        self.machine = Machine(model=self, states=AirConditioner.states, initial='off')
-        self.machine.add_transition(trigger='cool', source='off', dest='cooling')
-        self.machine.add_transition(trigger='turn_off', source='cooling', dest='off')
+    device_type = 'air_conditioner'
+    label = 'Air Conditioner'
+    states = ['off', 'cooling']
+    initial = 'off'
+    transitions = [
+        {'trigger': 'cool', 'source': 'off', 'dest': 'cooling'},
+        {'trigger': 'turn_off', 'source': 'cooling', 'dest': 'off'},
+    ]
 
     def get_status(self):
         """
@@ -131,24 +341,23 @@ class AirConditioner(Device):
 
         :return: Status do ar condicionado em formato de string.
         """
-        return f'Air Conditioner is {self.state}'
+        return self.format_status(self.state)
 
 class DoorLock(Device):
     """
     Classe para representar um dispositivo de tranca.
     """
-    states = ['locked', 'unlocked', 'locked_with_alarm']
+    __slots__ = ()
 
-    def __init__(self):
-        """
-        Inicializa a tranca com seus estados e transições.
-        """
-        super().__init__()
-        self.state = 'locked'
-        self.machine = Machine(model=self, states=DoorLock.states, initial='locked')
-        self.machine.add_transition(trigger='lock', source='unlocked', dest='locked')
-        self.machine.add_transition(trigger='lock_with_alarm', source='unlocked', dest='locked_with_alarm')
-        self.machine.add_transition(trigger='unlock', source=['locked', 'locked_with_alarm'], dest='unlocked')
+    device_type = 'door_lock'
+    label = 'Door Lock'
+    states = ['locked', 'unlocked', 'locked_with_alarm']
+    initial = 'locked'
+    transitions = [
+        {'trigger': 'lock', 'source': 'unlocked', 'dest': 'locked'},
+        {'trigger': 'lock_with_alarm', 'source': 'unlocked', 'dest': 'locked_with_alarm'},
+        {'trigger': 'unlock', 'source': ['locked', 'locked_with_alarm'], 'dest': 'unlocked'},
+    ]
 
     def get_status(self):
         """
@@ -156,4 +365,4 @@ class DoorLock(Device):
 
         :return: Status da tranca em formato de string.
         """
-        return f'Door Lock is {self.state}'
+        return self.format_status(self.state)
@@ -1,9 +1,57 @@
-from device import Light, Thermostat, SecuritySystem, AirConditioner, DoorLock
+from itertools import repeat, starmap
+from device import DEVICE_TYPES, Device
 
 class DeviceFactory:
     """
     Fábrica para criar instâncias de dispositivos.
+
+    Os tipos ficam em um registro compartilhado (`device.DEVICE_TYPES`): as classes de
+    dispositivo com `device_type` definido são registradas automaticamente, e plugins
+    podem registrar outras classes com `DeviceFactory.register`.
     """
+    registry = DEVICE_TYPES
+
+    @classmethod
+    def register(cls, device_type, device_class=None):
+        """
+        Registra uma classe de dispositivo sob um tipo. Pode ser usado como decorador.
+
+        :param device_type: Nome do tipo (e.g., 'smart_plug').
+        :param device_class: Subclasse de Device; se omitida, retorna um decorador.
+        :return: A própria classe (ou o decorador).
+        :raises ValueError: Se a classe já usar outro tipo ou o tipo pertencer a outra classe.
+        """
+        if device_class is None:
+            return lambda device_class: cls.register(device_type, device_class)
+        if not (isinstance(device_class, type) and issubclass(device_class, Device)):
+            raise ValueError(f'{device_class!r} is not a Device class')
+        if device_class.__dict__.get('device_type') not in (None, device_type):
+            raise ValueError(f'{device_class.__name__} is already registered as {device_class.device_type}')
+        if cls.registry.get(device_type, device_class) is not device_class:
+            raise ValueError(f'Device type already registered: {device_type}')
+        device_class.device_type = device_type
+        cls.registry[device_type] = device_class
+        return device_class
+
+    def device_types(self):
+        """
+        :return: Lista dos tipos de dispositivo registrados.
+        """
+        return list(self.registry)
+
+    def get_class(self, device_type):
+        """
+        Obtém a classe de um tipo de dispositivo sem criar nenhuma instância.
+
+        :param device_type: Tipo do dispositivo.
+        :return: Classe do dispositivo.
+        :raises ValueError: Se o tipo de dispositivo for desconhecido.
+        """
+        device_class = self.registry.get(device_type)
+        if device_class is None:
+            raise ValueError(f'Unknown device type: {device_type}')
+        return device_class
+
     def create_device(self, device_type):
         """
         Cria um dispositivo com base no tipo fornecido.
@@ -12,15 +60,17 @@ class DeviceFactory:
         :return: Instância do dispositivo especificado.
         :raises ValueError: Se o tipo de dispositivo for desconhecido.
         """
-        if device_type == 'light':
-            return Light()
-        elif device_type == 'thermostat':
-            return Thermostat()
-        elif device_type == 'security':
-            return SecuritySystem()
-        elif device_type == 'air_conditioner':
-            return AirConditioner()
-        elif device_type == 'door_lock':
-            return DoorLock()
-        else:
-            raise ValueError(f'Unknown device type: {device_type}')
+        return self.get_class(device_type)()
+
+    def create_devices(self, device_type, count):
+        """
+        Cria vários dispositivos de um mesmo tipo de uma só vez.
+
+        A classe é resolvida uma única vez e as instâncias são criadas sem laço em Python.
+
+        :param device_type: Tipo do dispositivo.
+        :param count: Quantidade de dispositivos.
+        :return: Lista com as novas instâncias.
+        :raises ValueError: Se o tipo de dispositivo for desconhecido.
+        """
+        return list(starmap(self.get_class(device_type), repeat((), count)))
@@ -0,0 +1,229 @@
+import threading
+import time
+from collections import deque, namedtuple
+
+# Evento compacto de mudança: `source` é None quando o dispositivo é adicionado e
+# `dest` é None quando ele é removido.
+ChangeEvent = namedtuple('ChangeEvent', 'name device_type source dest timestamp')
+
+
+class EventBus:
+    """
+    Barramento assíncrono de eventos de mudança de estado.
+
+    As transições publicam eventos em uma fila limitada e retornam imediatamente; uma
+    thread de trabalho consome a fila em lotes e entrega cada lote aos consumidores.
+    Assim, a latência de um comando não depende da quantidade nem da lentidão dos
+    observadores.
+
+    Políticas quando a fila está cheia:
+
+    - 'block': quem publica espera até haver espaço.
+    - 'drop_oldest': o evento mais antigo é descartado.
+    - 'coalesce': eventos pendentes do mesmo dispositivo são fundidos em um único
+      evento (estado de origem do primeiro, destino do último). Nenhum evento é
+      descartado: há no máximo um evento pendente por dispositivo, de modo que a fila
+      é limitada pelo tamanho da frota e pode passar de `maxsize`, mas o estado final
+      de cada dispositivo sempre chega aos consumidores.
+
+    Uma exceção lançada por um consumidor não interrompe a entrega: ela é contada em
+    `errors` (a última fica em `last_error`) e os demais consumidores e lotes seguem
+    normalmente.
+    """
+    POLICIES = ('block', 'drop_oldest', 'coalesce')
+
+    def __init__(self, maxsize=10000, policy='block', batch_size=512):
+        """
+        Inicializa o barramento.
+
+        :param maxsize: Número máximo de eventos pendentes (não se aplica à política 'coalesce').
+        :param policy: Política de contrapressão ('block', 'drop_oldest' ou 'coalesce').
+        :param batch_size: Número máximo de eventos entregues por lote.
+        :raises ValueError: Se a política ou o tamanho forem inválidos.
+        """
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {policy}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.delivered = 0
+        self.errors = 0
+        self.last_error = None
+        self._queue = deque()
+        self._pending = {}  # política 'coalesce': nome -> evento pendente
+        self._consumers = []
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._busy = False
+        self._closed = False
+        self._thread = None
+
+    def subscribe(self, consumer):
+        """
+        Registra um consumidor de lotes de eventos.
+
+        :param consumer: Objeto com o método `on_events(events)` ou uma função que recebe a lista de eventos.
+        """
+        self._consumers.append(getattr(consumer, 'on_events', consumer))
+
+    def __call__(self, event):
+        """
+        Permite registrar o barramento diretamente como ouvinte da SmartHome.
+        """
+        self.publish(event)
+
+    def __len__(self):
+        """
+        :return: Número de eventos pendentes.
+        """
+        return len(self._pending) if self.policy == 'coalesce' else len(self._queue)
+
+    def publish(self, event):
+        """
+        Enfileira um evento de mudança aplicando a política de contrapressão.
+
+        :param event: Instância de ChangeEvent.
+        :raises RuntimeError: Se o barramento estiver fechado.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Event bus is closed")
+            if self.policy == 'coalesce':
+                previous = self._pending.get(event.name)
+                if previous is not None:
+                    self._pending[event.name] = event._replace(source=previous.source)
+                    return
+                self._pending[event.name] = event
+            else:
+                if len(self._queue) >= self.maxsize:
+                    if self.policy == 'block':
+                        while len(self._queue) >= self.maxsize and not self._closed:
+                            self._not_full.wait()
+                        if self._closed:
+                            raise RuntimeError("Event bus is closed")
+                    else:
+                        self._queue.popleft()
+                        self.dropped += 1
+                self._queue.append(event)
+            self._not_empty.notify()
+
+    def _take_batch(self):
+        """
+        Retira até `batch_size` eventos da fila. Deve ser chamado com o lock adquirido.
+        """
+        if self.policy == 'coalesce':
+            pending = self._pending
+            batch = [pending.pop(name) for name in list(pending)[:self.batch_size]]
+        else:
+            queue = self._queue
+            batch = [queue.popleft() for _ in range(min(self.batch_size, len(queue)))]
+            self._not_full.notify_all()
+        return batch
+
+    def dispatch_pending(self):
+        """
+        Entrega na thread atual todos os eventos pendentes.
+
+        Útil quando o barramento é usado sem a thread de trabalho (e.g., em testes).
+
+        :return: Número de eventos entregues.
+        """
+        delivered = 0
+        while True:
+            with self._lock:
+                batch = self._take_batch()
+            if not batch:
+                return delivered
+            self._deliver(batch)
+            delivered += len(batch)
+
+    def _deliver(self, batch):
+        """
+        Entrega um lote a todos os consumidores, contando as exceções lançadas por eles.
+        """
+        for consumer in self._consumers:
+            try:
+                consumer(batch)
+            except Exception as error:
+                self.errors += 1
+                self.last_error = error
+        self.delivered += len(batch)
+
+    def _run(self):
+        """
+        Laço da thread de trabalho.
+        """
+        while True:
+            with self._lock:
+                while not len(self) and not self._closed:
+                    self._busy = False
+                    self._idle.notify_all()
+                    self._not_empty.wait()
+                if not len(self) and self._closed:
+                    self._busy = False
+                    self._idle.notify_all()
+                    return
+                self._busy = True
+                batch = self._take_batch()
+            try:
+                self._deliver(batch)
+            except BaseException:
+                with self._lock:
+                    self._busy = False
+                    self._idle.notify_all()
+                raise
+
+    def start(self):
+        """
+        Inicia a thread de trabalho que consome os eventos.
+
+        :return: O próprio barramento.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='EventBus', daemon=True)
+            self._thread.start()
+        return self
+
+    def flush(self, timeout=None):
+        """
+        Aguarda até que todos os eventos publicados tenham sido entregues.
+
+        :param timeout: Tempo máximo de espera, em segundos.
+        :return: True se a fila foi esvaziada dentro do prazo.
+        """
+        if self._thread is None:
+            self.dispatch_pending()
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while len(self) or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self):
+        """
+        Fecha o barramento, entregando os eventos pendentes antes de encerrar a thread.
+        """
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        else:
+            self.dispatch_pending()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,295 @@
+from collections import defaultdict
+
+
+class Group:
+    """
+    Grupo de dispositivos (casa, andar, cômodo ou grupo avulso) com agregados mantidos
+    incrementalmente: total, ativos e contagem por (tipo, estado) de todos os
+    dispositivos do grupo e dos seus subgrupos, cada um contado uma única vez.
+    """
+    def __init__(self, name, kind='group', parent=None):
+        """
+        :param name: Nome do grupo, único na árvore.
+        :param kind: Nível do grupo (e.g., 'home', 'floor', 'room', 'group').
+        :param parent: Grupo pai, ou None para a raiz.
+        """
+        self.name = name
+        self.kind = kind
+        self.parent = parent
+        self.children = {}
+        self.members = set()
+        self.total = 0
+        self.active = 0
+        self.types = defaultdict(int)
+        self.states = defaultdict(int)
+
+    def __repr__(self):
+        return f'Group({self.path()!r}, kind={self.kind!r}, total={self.total})'
+
+    def path(self):
+        """
+        :return: Caminho do grupo a partir da raiz (e.g., 'home/ground/kitchen').
+        """
+        return self.name if self.parent is None else f'{self.parent.path()}/{self.name}'
+
+    def ancestors(self):
+        """
+        :return: Lista com o próprio grupo e seus ancestrais, até a raiz.
+        """
+        groups = []
+        group = self
+        while group is not None:
+            groups.append(group)
+            group = group.parent
+        return groups
+
+    def _move(self, device_type, source, dest):
+        """
+        Atualiza os agregados com a inclusão (source None), remoção (dest None) ou transição de um dispositivo.
+        """
+        if source is None:
+            self.total += 1
+            self.types[device_type] += 1
+        else:
+            self.states[(device_type, source)] -= 1
+            if source != 'off':
+                self.active -= 1
+        if dest is None:
+            self.total -= 1
+            self.types[device_type] -= 1
+        else:
+            self.states[(device_type, dest)] += 1
+            if dest != 'off':
+                self.active += 1
+
+    def count(self, device_type=None, state=None):
+        """
+        Conta os dispositivos do grupo, em O(1).
+
+        :param device_type: Tipo para filtrar, ou None para todos.
+        :param state: Estado para filtrar (exige `device_type`), ou None para todos.
+        :return: Número de dispositivos.
+        """
+        if device_type is None:
+            return self.total
+        if state is None:
+            return self.types.get(device_type, 0)
+        return self.states.get((device_type, state), 0)
+
+    def any_active(self):
+        """
+        :return: True se algum dispositivo do grupo estiver ativo (estado diferente de 'off').
+        """
+        return self.active > 0
+
+    def all_in(self, device_type, state):
+        """
+        :return: True se o grupo tiver dispositivos do tipo e todos estiverem no estado (e.g., todas as fechaduras trancadas).
+        """
+        total = self.types.get(device_type, 0)
+        return total > 0 and self.states.get((device_type, state), 0) == total
+
+    def summary(self):
+        """
+        :return: Dicionário com nome, nível, total, ativos e contagens por tipo e estado.
+        """
+        states = {}
+        for (device_type, state), count in self.states.items():
+            if count:
+                states.setdefault(device_type, {})[state] = count
+        return {'name': self.name, 'kind': self.kind, 'total': self.total, 'active': self.active,
+                'states': states}
+
+
+class GroupTree:
+    """
+    Hierarquia de grupos de uma SmartHome (casa -> andar -> cômodo -> grupo avulso).
+
+    A raiz representa a casa inteira e contém todos os dispositivos; os demais grupos
+    contêm os dispositivos atribuídos a eles e aos seus subgrupos. Um dispositivo pode
+    pertencer a vários grupos (e.g., um cômodo e um grupo avulso). Os agregados de cada
+    grupo são atualizados a cada mudança de estado, por um ouvinte da casa, de modo
+    que os resumos são lidos sem percorrer os dispositivos.
+    """
+    def __init__(self, home, name='home'):
+        """
+        Cria a árvore com a raiz e a registra como ouvinte da casa.
+
+        :param home: Instância de SmartHome.
+        :param name: Nome do grupo raiz.
+        """
+        self.home = home
+        self.root = Group(name, 'home')
+        self.groups = {name: self.root}
+        self._memberships = defaultdict(set)
+        self._affected = {}
+        self._root_only = (self.root,)
+        for device in home.devices.values():
+            self.root._move(device.device_type, None, device.state)
+        home.add_listener(self.on_change)
+
+    def close(self):
+        """
+        Desliga a árvore da casa.
+        """
+        self.home.remove_listener(self.on_change)
+
+    def get(self, name):
+        """
+        :param name: Nome do grupo.
+        :return: O grupo.
+        :raises KeyError: Se o grupo não existir.
+        """
+        group = self.groups.get(name)
+        if group is None:
+            raise KeyError(f"Group not found: {name}")
+        return group
+
+    def add_group(self, name, kind='group', parent=None):
+        """
+        Cria um grupo.
+
+        :param name: Nome do grupo, único na árvore.
+        :param kind: Nível do grupo (e.g., 'floor', 'room', 'group').
+        :param parent: Nome do grupo pai; por padrão, a raiz.
+        :return: O grupo criado.
+        :raises ValueError: Se já existir um grupo com o nome.
+        """
+        if name in self.groups:
+            raise ValueError(f"Group {name} already exists.")
+        parent = self.get(parent) if parent is not None else self.root
+        group = parent.children[name] = self.groups[name] = Group(name, kind, parent)
+        return group
+
+    def remove_group(self, name):
+        """
+        Remove um grupo e seus subgrupos; os dispositivos continuam na casa.
+
+        :param name: Nome do grupo.
+        :raises ValueError: Se o grupo for a raiz.
+        """
+        group = self.get(name)
+        if group is self.root:
+            raise ValueError("The root group cannot be removed.")
+        for member in self._subtree(group):
+            for device_name in list(member.members):
+                self.unassign(device_name, member.name)
+            del self.groups[member.name]
+        del group.parent.children[name]
+
+    def _subtree(self, group):
+        """
+        :return: Lista com o grupo e todos os seus descendentes.
+        """
+        groups = [group]
+        for group in groups:
+            groups.extend(group.children.values())
+        return groups
+
+    def _groups_of(self, device_name):
+        """
+        Grupos cujos agregados incluem um dispositivo: a raiz e os ancestrais de cada grupo dele, sem repetição.
+        """
+        if device_name not in self._memberships:
+            return self._root_only
+        affected = self._affected.get(device_name)
+        if affected is None:
+            groups = {self.root: None}
+            for group in self._memberships.get(device_name, ()):
+                groups.update(dict.fromkeys(group.ancestors()))
+            affected = self._affected[device_name] = tuple(groups)
+        return affected
+
+    def groups_of(self, device_name):
+        """
+        :param device_name: Nome do dispositivo.
+        :return: Tupla com a raiz e todos os grupos que contêm o dispositivo (diretamente ou
+            por um subgrupo), sem repetição.
+        """
+        return self._groups_of(device_name)
+
+    def _regroup(self, device_name, change):
+        """
+        Aplica uma mudança de participação, movendo o dispositivo entre os agregados afetados.
+        """
+        before = self._groups_of(device_name)
+        change()
+        self._affected.pop(device_name, None)
+        after = self._groups_of(device_name)
+        device = self.home.devices.get(device_name)
+        if device is not None:
+            for group in set(before) - set(after):
+                group._move(device.device_type, device.state, None)
+            for group in set(after) - set(before):
+                group._move(device.device_type, None, device.state)
+
+    def assign(self, device_name, group_name):
+        """
+        Atribui um dispositivo (pelo nome) a um grupo. O dispositivo pode ser incluído na casa depois.
+
+        :param device_name: Nome do dispositivo.
+        :param group_name: Nome do grupo.
+        """
+        group = self.get(group_name)
+        if device_name not in group.members:
+            def change():
+                group.members.add(device_name)
+                self._memberships[device_name].add(group)
+            self._regroup(device_name, change)
+
+    def unassign(self, device_name, group_name):
+        """
+        Retira um dispositivo de um grupo.
+
+        :param device_name: Nome do dispositivo.
+        :param group_name: Nome do grupo.
+        """
+        group = self.get(group_name)
+        if device_name in group.members:
+            def change():
+                group.members.discard(device_name)
+                memberships = self._memberships[device_name]
+                memberships.discard(group)
+                if not memberships:
+                    del self._memberships[device_name]
+            self._regroup(device_name, change)
+
+    def device_names(self, group_name):
+        """
+        :param group_name: Nome do grupo.
+        :return: Nomes dos dispositivos do grupo e dos seus subgrupos presentes na casa, sem repetição.
+        """
+        group = self.get(group_name)
+        if group is self.root:
+            return list(self.home.devices)
+        names = dict.fromkeys(name for member in self._subtree(group) for name in member.members)
+        return [name for name in names if name in self.home.devices]
+
+    def apply(self, group_name, trigger, device_type=None):
+        """
+        Aplica um gatilho aos dispositivos de um grupo, em um único lote.
+
+        Dispositivos que não têm o gatilho, ou para os quais ele não é válido no estado
+        atual, são ignorados.
+
+        :param group_name: Nome do grupo.
+        :param trigger: Nome do gatilho (e.g., 'turn_off', 'lock').
+        :param device_type: Tipo para filtrar, ou None para todos.
+        :return: Lista dos dispositivos que mudaram de estado.
+        """
+        devices = self.home.devices
+        commands = []
+        for name in self.device_names(group_name):
+            device = devices[name]
+            if trigger in device._table and (device_type is None or device.device_type == device_type):
+                commands.append((device, trigger))
+        return self.home.apply_batch(commands, strict=False)
+
+    def on_change(self, event):
+        """
+        Atualiza os agregados dos grupos afetados por um ChangeEvent da casa.
+
+        :param event: Evento de mudança.
+        """
+        for group in self._groups_of(event.name):
+            group._move(event.device_type, event.source, event.dest)
@@ -0,0 +1,282 @@
+"""
+Gerador de carga sintética e reprodução de fluxos de comandos.
+
+Uso:
+
+    python loadgen.py --size 10000 --mix light=6,thermostat=2,door_lock=2 --commands 200000
+    python loadgen.py --size 1000 --commands 50000 --rate 20000 --workers 4 --mode process
+    python loadgen.py --size 1000 --commands 50000 --record stream.txt
+    python loadgen.py --replay stream.txt --output run.json --compare baseline.json
+
+Os fluxos usam o formato do modo não interativo (ver batch_mode): um fluxo gravado
+começa com os comandos 'add' da frota e pode ser reproduzido de forma determinística,
+inclusive por `cli.py --script`. Cada execução informa vazão, percentis de latência
+e um resumo (digest) das respostas, que deve ser idêntico entre reproduções do mesmo
+fluxo.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import random
+import sys
+import threading
+import time
+from batch_mode import CommandRunner
+from device_factory import DeviceFactory
+from metrics import LatencyHistogram
+from smart_home import SmartHome
+
+INVALID_TRIGGERS = ('explode', 'self_destruct')
+
+
+def fleet_commands(size, mix=None, factory=None, seed=0):
+    """
+    Gera os comandos 'add' de uma frota sintética.
+
+    :param size: Número de dispositivos.
+    :param mix: Dicionário tipo -> peso; por padrão, todos os tipos registrados com o mesmo peso.
+    :param factory: Fábrica que fornece os tipos registrados; por padrão, DeviceFactory().
+    :param seed: Semente do sorteio dos tipos.
+    :return: Lista de linhas 'add <tipo> <nome>'.
+    :raises ValueError: Se algum tipo do mix for desconhecido.
+    """
+    factory = factory or DeviceFactory()
+    mix = mix or dict.fromkeys(factory.device_types(), 1)
+    for device_type in mix:
+        factory.get_class(device_type)
+    rng = random.Random(seed)
+    types = rng.choices(list(mix), weights=list(mix.values()), k=size)
+    return [f'add {device_type} {device_type}_{i}' for i, device_type in enumerate(types)]
+
+
+def command_stream(fleet, count, invalid=0.1, queries=0.1, seed=0, factory=None):
+    """
+    Gera um fluxo de comandos aleatórios sobre uma frota.
+
+    Os gatilhos válidos são sorteados entre os da classe de cada dispositivo (podendo
+    ser inválidos no estado atual); os inválidos, entre os de outras classes e nomes
+    inexistentes. O fluxo depende apenas da frota e da semente.
+
+    :param fleet: Linhas 'add' da frota (ver fleet_commands).
+    :param count: Número de comandos.
+    :param invalid: Fração de gatilhos que não existem para a classe do dispositivo.
+    :param queries: Fração de consultas ('status', 'count_active').
+    :param seed: Semente do sorteio.
+    :param factory: Fábrica que fornece as classes dos tipos; por padrão, DeviceFactory().
+    :return: Gerador de linhas de comando.
+    """
+    factory = factory or DeviceFactory()
+    rng = random.Random(seed)
+    devices = [line.split()[1:] for line in fleet]
+    triggers = {device_type: sorted(factory.get_class(device_type)._table) for device_type, _ in devices}
+    every_trigger = sorted({trigger for names in triggers.values() for trigger in names}) + list(INVALID_TRIGGERS)
+    for _ in range(count):
+        device_type, name = rng.choice(devices)
+        roll = rng.random()
+        if roll < queries:
+            yield f'status {name}' if roll < queries / 2 else 'count_active'
+        elif roll < queries + invalid:
+            own = triggers[device_type]
+            yield f'trigger {name} {rng.choice([t for t in every_trigger if t not in own])}'
+        else:
+            yield f'trigger {name} {rng.choice(triggers[device_type])}'
+
+
+def drive(runner, lines, rate=None):
+    """
+    Executa linhas de comando medindo a latência de cada uma.
+
+    :param runner: CommandRunner sobre a casa.
+    :param lines: Iterável de linhas de comando.
+    :param rate: Vazão alvo, em comandos por segundo, ou None para o máximo possível.
+    :return: Dicionário com 'commands', 'errors', 'seconds', 'histogram' (LatencyHistogram) e
+        'digest' (SHA-1 das respostas, na ordem).
+    """
+    histogram = LatencyHistogram()
+    digest = hashlib.sha1()
+    clock = time.perf_counter_ns
+    run_line = runner.run_line
+    interval = 1e9 / rate if rate else 0
+    commands = errors = 0
+    start = clock()
+    for line in lines:
+        if interval:
+            ahead = start + commands * interval - clock()
+            if ahead > 1e6:
+                time.sleep(ahead / 1e9)
+        began = clock()
+        result = run_line(line)
+        if result is None:
+            continue
+        histogram.record(clock() - began)
+        commands += 1
+        if result.startswith('{"ok":false'):
+            errors += 1
+        digest.update(result.encode('utf-8'))
+        digest.update(b'\n')
+    return {'commands': commands, 'errors': errors, 'seconds': (clock() - start) / 1e9,
+            'histogram': histogram, 'digest': digest.hexdigest()}
+
+
+def build_home(fleet, factory=None):
+    """
+    Monta uma casa com a frota, criando os dispositivos em lote pela fábrica.
+
+    :param fleet: Linhas 'add' da frota.
+    :param factory: Fábrica de dispositivos; por padrão, DeviceFactory().
+    :return: Nova SmartHome.
+    """
+    factory = factory or DeviceFactory()
+    home = SmartHome(max_devices=len(fleet))
+    home.add_devices((name, factory.create_device(device_type))
+                     for _, device_type, name in (line.split() for line in fleet))
+    return home
+
+
+def _worker(job):
+    """
+    Executa um fluxo em uma casa própria (usado pelos processos de trabalho).
+    """
+    fleet, stream, rate = job
+    return drive(CommandRunner(build_home(fleet)), stream, rate)
+
+
+def run(fleet, commands, rate=None, workers=1, mode='thread', seed=0, invalid=0.1, queries=0.1):
+    """
+    Monta a frota e executa o fluxo de comandos gerado, com um ou mais trabalhadores.
+
+    Com threads, os trabalhadores dividem a mesma casa, contando com a sincronização
+    dela (ver o modelo de concorrência em SmartHome). Com processos, cada trabalhador monta sua própria cópia da frota e
+    executa seu próprio fluxo.
+
+    :param fleet: Linhas 'add' da frota.
+    :param commands: Número total de comandos.
+    :param rate: Vazão alvo total, em comandos por segundo, ou None.
+    :param workers: Número de trabalhadores.
+    :param mode: 'thread' ou 'process'.
+    :return: Relatório (ver `report`).
+    :raises ValueError: Se o modo for desconhecido.
+    """
+    per_worker = rate / workers if rate else None
+    streams = [list(command_stream(fleet, commands // workers + (i < commands % workers), invalid, queries,
+                                   seed + i)) for i in range(workers)]
+    if mode == 'process':
+        with multiprocessing.get_context().Pool(workers) as pool:
+            results = pool.map(_worker, [(fleet, stream, per_worker) for stream in streams])
+    elif mode == 'thread':
+        home = build_home(fleet)
+        results = [None] * workers
+
+        def target(index):
+            results[index] = drive(CommandRunner(home), streams[index], per_worker)
+
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+    return report(results, {'fleet': len(fleet), 'workers': workers, 'mode': mode, 'rate': rate})
+
+
+def replay(path, rate=None):
+    """
+    Reproduz um fluxo gravado em uma casa nova.
+
+    Como em `run`, a frota (os comandos 'add' do início do fluxo) é montada antes da
+    medição e fica fora das latências e do digest, de modo que a reprodução de um fluxo
+    gravado com `--record` tem o mesmo digest da execução que o gerou.
+
+    :param path: Arquivo com o fluxo (formato do modo não interativo).
+    :param rate: Vazão alvo, em comandos por segundo, ou None.
+    :return: Relatório (ver `report`).
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    size = 0
+    while size < len(lines) and lines[size].startswith('add ') and len(lines[size].split()) == 3:
+        size += 1
+    home = build_home(lines[:size])
+    home.max_devices = max(size, sum(line.startswith('add ') for line in lines))
+    return report([drive(CommandRunner(home), lines[size:], rate)], {'replay': path, 'rate': rate})
+
+
+def report(results, config):
+    """
+    Combina os resultados dos trabalhadores em um relatório serializável em JSON.
+    """
+    histogram = LatencyHistogram()
+    for result in results:
+        histogram.merge(result['histogram'])
+    commands = sum(result['commands'] for result in results)
+    seconds = max(result['seconds'] for result in results)
+    return dict(config, **{
+        'commands': commands,
+        'errors': sum(result['errors'] for result in results),
+        'seconds': round(seconds, 6),
+        'throughput': round(commands / seconds, 1) if seconds else None,
+        'latency_us': {f'p{q:g}': round(histogram.percentile(q / 100) / 1000, 3) for q in (50, 90, 99, 99.9)},
+        'max_us': round(histogram.max / 1000, 3),
+        'digest': hashlib.sha1(''.join(result['digest'] for result in results).encode()).hexdigest(),
+    })
+
+
+def _parse_mix(text):
+    """
+    Converte 'light=6,thermostat=2' em um dicionário tipo -> peso.
+    """
+    mix = {}
+    for item in text.split(','):
+        device_type, _, weight = item.partition('=')
+        mix[device_type] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Synthetic load generator and command replay.")
+    parser.add_argument('--size', type=int, default=1000, help="number of devices (default: 1000)")
+    parser.add_argument('--mix', help="device type weights, e.g. light=6,thermostat=2 (default: all types equally)")
+    parser.add_argument('--commands', type=int, default=100000, help="number of commands (default: 100000)")
+    parser.add_argument('--rate', type=float, help="target commands per second (default: unthrottled)")
+    parser.add_argument('--invalid', type=float, default=0.1, help="fraction of invalid triggers (default: 0.1)")
+    parser.add_argument('--queries', type=float, default=0.1, help="fraction of status queries (default: 0.1)")
+    parser.add_argument('--workers', type=int, default=1, help="number of threads or processes (default: 1)")
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread', help="worker kind")
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--record', metavar='PATH', help="write the fleet and command stream to PATH and exit")
+    parser.add_argument('--replay', metavar='PATH', help="replay a recorded stream")
+    parser.add_argument('--output', metavar='PATH', help="write the JSON report to PATH (default: stdout)")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare throughput and digest with a previous report")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        result = replay(args.replay, args.rate)
+    else:
+        fleet = fleet_commands(args.size, _parse_mix(args.mix) if args.mix else None, seed=args.seed)
+        if args.record:
+            with open(args.record, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(fleet) + '\n')
+                for line in command_stream(fleet, args.commands, args.invalid, args.queries, args.seed):
+                    f.write(line + '\n')
+            print(f"Recorded {len(fleet)} devices and {args.commands} commands to {args.record}", file=sys.stderr)
+            return
+        result = run(fleet, args.commands, args.rate, args.workers, args.mode, args.seed, args.invalid, args.queries)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        ratio = result['throughput'] / baseline['throughput'] if baseline.get('throughput') else float('nan')
+        same = 'same' if baseline.get('digest') == result['digest'] else 'DIFFERENT'
+        print(f"throughput {ratio:.2f}x, responses {same}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
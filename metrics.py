@@ -0,0 +1,279 @@
+"""
+Instrumentação opcional: contadores e histogramas de latência dos caminhos críticos.
+
+Uso:
+
+    import metrics
+    metrics.enable()
+    ...
+    for line in metrics.METRICS.format():
+        print(line)
+    metrics.disable()
+
+Enquanto desabilitada, a instrumentação não tem custo: `enable()` substitui os
+métodos medidos (disparo de gatilhos, notificação de observadores, formatação de
+status e consultas da SmartHome) por versões cronometradas, e `disable()` restaura
+os originais.
+"""
+from array import array
+from functools import wraps
+from time import perf_counter_ns
+from device import Device
+from smart_home import SmartHome
+
+SIGNIFICANT_BITS = 6
+MAX_VALUE_NS = 1 << 42  # ~73 minutos; valores maiores caem no último balde
+
+# Consultas da SmartHome cronometradas quando a instrumentação está habilitada.
+QUERIES = ('get_devices', 'get_device_status', 'page_statuses', 'get_statuses', 'get_all_status',
+           'get_active_devices', 'get_active_statuses', 'count_active_devices', 'list_all_devices',
+           'apply_batch', 'broadcast')
+
+
+def _bucket(value):
+    """
+    Calcula o balde log-linear de um valor: exato abaixo de 2**SIGNIFICANT_BITS e, acima
+    disso, com 2**(SIGNIFICANT_BITS - 1) baldes por potência de dois (erro relativo < 3.2%).
+    """
+    shift = value.bit_length() - SIGNIFICANT_BITS
+    if shift <= 0:
+        return value
+    return (shift << (SIGNIFICANT_BITS - 1)) + (value >> shift)
+
+
+def _bucket_upper(index):
+    """
+    :return: Maior valor contido no balde `index`.
+    """
+    half = 1 << (SIGNIFICANT_BITS - 1)
+    if index < 2 * half:
+        return index
+    shift = (index >> (SIGNIFICANT_BITS - 1)) - 1
+    return ((index - (shift << (SIGNIFICANT_BITS - 1)) + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências em nanossegundos, no estilo HDR: baldes log-linear de
+    tamanho fixo, registro O(1) e percentis com erro relativo limitado.
+    """
+    __slots__ = ('counts', 'count', 'errors', 'total', 'max')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * (_bucket(MAX_VALUE_NS) + 1)))
+        self.count = 0
+        self.errors = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        """
+        Registra uma latência.
+
+        :param value: Latência, em nanossegundos.
+        """
+        self.counts[_bucket(min(value, MAX_VALUE_NS))] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        :param q: Quantil entre 0 e 1 (e.g., 0.99).
+        :return: Latência do quantil, em nanossegundos (limite superior do balde), ou 0 se vazio.
+        """
+        if not self.count:
+            return 0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(_bucket_upper(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        """
+        Acumula outro histograma neste.
+
+        :param other: Outro LatencyHistogram.
+        """
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.errors += other.errors
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+
+class Metrics:
+    """
+    Registro de histogramas indexados por (categoria, tipo de dispositivo, nome).
+
+    Categorias usadas pela instrumentação: 'trigger' (nome = gatilho), 'observer'
+    (nome = classe do observador), 'status' (formatação de status) e 'query' (tipo
+    vazio, nome = método da SmartHome). A contagem de cada histograma é também o
+    contador de chamadas, e `errors` conta as chamadas que terminaram em exceção.
+    """
+    def __init__(self):
+        self.histograms = {}
+
+    def histogram(self, category, device_type, name):
+        """
+        :return: Histograma da chave, criado no primeiro uso.
+        """
+        key = (category, device_type, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        return histogram
+
+    def reset(self):
+        """
+        Descarta todas as medições.
+        """
+        self.histograms.clear()
+
+    def snapshot(self, category=None):
+        """
+        Resume as medições.
+
+        :param category: Categoria para filtrar, ou None para todas.
+        :return: Lista de dicionários (serializáveis em JSON) com contagens e latências em microssegundos.
+        """
+        rows = []
+        for (kind, device_type, name), histogram in sorted(self.histograms.items()):
+            if category is not None and kind != category:
+                continue
+            rows.append({
+                'category': kind,
+                'device_type': device_type,
+                'name': name,
+                'count': histogram.count,
+                'errors': histogram.errors,
+                'mean_us': round(histogram.total / histogram.count / 1000, 3) if histogram.count else 0.0,
+                'p50_us': round(histogram.percentile(0.50) / 1000, 3),
+                'p90_us': round(histogram.percentile(0.90) / 1000, 3),
+                'p99_us': round(histogram.percentile(0.99) / 1000, 3),
+                'max_us': round(histogram.max / 1000, 3),
+            })
+        return rows
+
+    def format(self, category=None):
+        """
+        :return: Lista de linhas de texto com o resumo das medições.
+        """
+        lines = [f"{'category':9s} {'device_type':16s} {'name':22s} {'count':>9s} {'errors':>6s} "
+                 f"{'p50 us':>9s} {'p99 us':>9s} {'max us':>9s}"]
+        for row in self.snapshot(category):
+            lines.append(f"{row['category']:9s} {row['device_type']:16s} {row['name']:22s} {row['count']:>9d} "
+                         f"{row['errors']:>6d} {row['p50_us']:>9.3f} {row['p99_us']:>9.3f} {row['max_us']:>9.3f}")
+        return lines
+
+
+METRICS = Metrics()
+_originals = {}
+
+
+def _timed(metrics, key_of, function):
+    """
+    Envolve uma função para registrar a latência de cada chamada.
+
+    :param key_of: Função que recebe os argumentos da chamada e devolve (categoria, tipo, nome).
+    """
+    @wraps(function)
+    def timed(*args, **kwargs):
+        histogram = metrics.histogram(*key_of(*args, **kwargs))
+        start = perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            histogram.errors += 1
+            raise
+        finally:
+            histogram.record(perf_counter_ns() - start)
+    return timed
+
+
+def _timed_notify_observers(metrics):
+    def notify_observers(self):
+        for observer in self._observers:
+            histogram = metrics.histogram('observer', self.device_type, type(observer).__name__)
+            start = perf_counter_ns()
+            try:
+                observer.update(self)
+            except Exception:
+                histogram.errors += 1
+                raise
+            finally:
+                histogram.record(perf_counter_ns() - start)
+    return notify_observers
+
+
+def _timed_notify_grouped(metrics):
+    def _notify_grouped(self, devices):
+        groups = {}
+        for device in devices:
+            for observer in device._observers:
+                groups.setdefault(observer, []).append(device)
+        for observer, observed in groups.items():
+            histogram = metrics.histogram('observer', '', type(observer).__name__)
+            start = perf_counter_ns()
+            try:
+                update_batch = getattr(observer, 'update_batch', None)
+                if update_batch is not None:
+                    update_batch(observed)
+                else:
+                    for device in observed:
+                        observer.update(device)
+            except Exception:
+                histogram.errors += 1
+                raise
+            finally:
+                histogram.record(perf_counter_ns() - start)
+    return _notify_grouped
+
+
+def is_enabled():
+    """
+    :return: True se a instrumentação estiver habilitada.
+    """
+    return bool(_originals)
+
+
+def enable(metrics=None):
+    """
+    Habilita a instrumentação, substituindo os métodos medidos por versões cronometradas.
+
+    :param metrics: Registro que recebe as medições; por padrão, METRICS.
+    :return: O registro em uso.
+    """
+    metrics = metrics or METRICS
+    if _originals:
+        disable()
+    patches = {
+        (Device, '_fire'): _timed(metrics, lambda device, trigger: ('trigger', device.device_type, trigger),
+                                  Device._fire),
+        (Device, 'notify_observers'): _timed_notify_observers(metrics),
+        (Device, 'format_status'): classmethod(_timed(metrics, lambda cls, state: ('status', cls.device_type, state),
+                                                      Device.format_status.__func__)),
+        (SmartHome, '_notify_grouped'): _timed_notify_grouped(metrics),
+    }
+    for query in QUERIES:
+        patches[SmartHome, query] = _timed(metrics, lambda *args, query=query, **kwargs: ('query', '', query),
+                                           getattr(SmartHome, query))
+    for (owner, attribute), replacement in patches.items():
+        _originals[owner, attribute] = owner.__dict__[attribute]
+        setattr(owner, attribute, replacement)
+    return metrics
+
+
+def disable():
+    """
+    Desabilita a instrumentação, restaurando os métodos originais. As medições são mantidas.
+    """
+    for (owner, attribute), original in _originals.items():
+        setattr(owner, attribute, original)
+    _originals.clear()
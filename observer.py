@@ -1,12 +1,119 @@
+import threading
+import time
+from array import array
+from collections import namedtuple
+from device import DEVICE_TYPES, STATE_CODES
+
+NO_STATE = 255
+
+# Registro do histórico, montado apenas na leitura. `source` é None quando o estado
+# anterior não é conhecido (e.g., dispositivo recém-adicionado).
+HistoryRecord = namedtuple('HistoryRecord', 'seq name device_type source dest timestamp')
+
+
 class Observer:
     """
     Observador para ser notificado sobre mudanças de estado dos dispositivos.
+
+    O histórico de notificações é um buffer circular de capacidade fixa, guardado em
+    arrays pré-alocados: identificador do dispositivo, código do estado anterior,
+    código do novo estado e instante monotônico. O texto só é formatado quando o
+    histórico é lido, e a memória não cresce com o número de mudanças.
+
+    A tabela de identificadores também é limitada: um dispositivo é esquecido (junto
+    com o último estado visto) quando sua última notificação sai do histórico, e seu
+    identificador é reaproveitado. Dispositivos sem nome são identificados por `id()`,
+    sem manter referências a eles.
     """
-    def __init__(self):
+    def __init__(self, capacity=4096, verbose=True):
         """
         Inicializa o observador.
+
+        :param capacity: Número máximo de notificações mantidas no histórico.
+        :param verbose: Se True, cada notificação também é impressa na saída padrão.
         """
-        self.notifications = []
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.verbose = verbose
+        self.seq = 0
+        self._ids = array('I', bytes(4 * capacity))
+        self._sources = array('B', bytes(capacity))
+        self._dests = array('B', bytes(capacity))
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._keys = []
+        self._key_ids = {}
+        self._refs = []   # identificador -> notificações no histórico
+        self._free = []   # identificadores liberados
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def _key_id(self, key):
+        """
+        Obtém o identificador numérico de um dispositivo, registrando-o se necessário.
+
+        :param key: Nome do dispositivo (ou `id()` do objeto, se ele não tiver nome).
+        """
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            if self._free:
+                key_id = self._free.pop()
+                self._keys[key_id] = key
+            else:
+                key_id = len(self._keys)
+                self._keys.append(key)
+                self._refs.append(0)
+            self._key_ids[key] = key_id
+        return key_id
+
+    def _release(self, key_id):
+        """
+        Desconta uma notificação que saiu do histórico, esquecendo o dispositivo se for a última.
+        """
+        self._refs[key_id] -= 1
+        if not self._refs[key_id]:
+            del self._key_ids[self._keys[key_id]]
+            self._keys[key_id] = None
+            self._last.pop(key_id, None)
+            self._free.append(key_id)
+
+    def _append(self, key, source_code, dest_code, timestamp):
+        """
+        Grava uma mudança no histórico. Deve ser chamado com o lock adquirido.
+        """
+        key_id = self._key_id(key)
+        self._refs[key_id] += 1
+        position = self.seq % self.capacity
+        if self.seq >= self.capacity:
+            self._release(self._ids[position])
+        self._ids[position] = key_id
+        self._sources[position] = source_code
+        self._dests[position] = dest_code
+        self._timestamps[position] = time.monotonic() if timestamp is None else timestamp
+        self._last[key_id] = dest_code
+        self.seq += 1
+
+    def record(self, key, source_code, dest_code, timestamp=None):
+        """
+        Grava uma mudança no histórico, sobrescrevendo a mais antiga se ele estiver cheio.
+
+        :param key: Nome do dispositivo (ou `id()` do objeto, se ele não tiver nome).
+        :param source_code: Código global do estado anterior, ou NO_STATE.
+        :param dest_code: Código global do novo estado.
+        :param timestamp: Instante da mudança; por padrão, time.monotonic().
+        """
+        with self._lock:
+            self._append(key, source_code, dest_code, timestamp)
+
+    def _record_device(self, device):
+        """
+        Grava o estado atual de um dispositivo, usando o último estado visto como origem.
+        """
+        key = device._name if device._name is not None else id(device)
+        dest_code = device._codes[device.state]
+        with self._lock:
+            source_code = self._last.get(self._key_ids.get(key), NO_STATE)
+            self._append(key, source_code, dest_code, None)
 
     def update(self, device):
         """
@@ -14,5 +121,77 @@ class Observer:
 
         :param device: Dispositivo com status alterado.
         """
-        self.notifications.append(device.get_status())
-        print(f"Observador notificado: {device.get_status()}")
+        self._record_device(device)
+        if self.verbose:
+            print(f"Observador notificado: {device.get_status()}")
+
+    def update_batch(self, devices):
+        """
+        Atualiza o observador com vários dispositivos de uma só vez.
+
+        :param devices: Dispositivos com status alterado.
+        """
+        for device in devices:
+            self._record_device(device)
+        if self.verbose:
+            print('\n'.join(f"Observador notificado: {device.get_status()}" for device in devices))
+
+    def on_events(self, events):
+        """
+        Consome um lote de eventos entregue por um EventBus.
+
+        :param events: Lista de ChangeEvent; remoções de dispositivos são ignoradas.
+        """
+        for event in events:
+            if event.dest is None:
+                continue
+            codes = DEVICE_TYPES[event.device_type]._codes
+            source_code = NO_STATE if event.source is None else codes[event.source]
+            self.record(event.name, source_code, codes[event.dest], event.timestamp)
+
+    def __len__(self):
+        """
+        :return: Número de notificações mantidas no histórico.
+        """
+        return min(self.seq, self.capacity)
+
+    def _read(self, seq):
+        """
+        Monta o registro de uma notificação ainda mantida no histórico.
+        """
+        position = seq % self.capacity
+        key = self._keys[self._ids[position]]
+        source_code = self._sources[position]
+        device_class, dest = STATE_CODES[self._dests[position]]
+        source = None if source_code == NO_STATE else STATE_CODES[source_code][1]
+        name = key if isinstance(key, str) else None
+        return HistoryRecord(seq, name, device_class.device_type, source, dest, self._timestamps[position])
+
+    def since(self, seq):
+        """
+        Obtém as notificações com número de sequência maior ou igual a `seq`.
+
+        Se `seq` já saiu do histórico, a leitura começa pela notificação mais antiga mantida.
+
+        :param seq: Número de sequência inicial.
+        :return: Lista de HistoryRecord, da mais antiga para a mais recente.
+        """
+        start = max(seq, self.seq - len(self), 0)
+        return [self._read(s) for s in range(start, self.seq)]
+
+    def last(self, n):
+        """
+        Obtém as `n` notificações mais recentes.
+
+        :param n: Quantidade de notificações.
+        :return: Lista de HistoryRecord, da mais antiga para a mais recente.
+        """
+        return self.since(self.seq - n) if n > 0 else []
+
+    @property
+    def notifications(self):
+        """
+        Status formatados das notificações mantidas no histórico (e.g., 'Light is on').
+        """
+        return [DEVICE_TYPES[record.device_type].format_status(record.dest)
+                for record in self.since(0)]
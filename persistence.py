@@ -0,0 +1,403 @@
+import gc
+import mmap
+import os
+import struct
+import threading
+import time
+from device import DEVICE_TYPES
+from smart_home import SmartHome
+
+SNAPSHOT_MAGIC = b'SHSNAP1\0'
+JOURNAL_MAGIC = b'SHJRNL1\0'
+
+# Cabeçalho do snapshot: geração, limite de dispositivos, contador de nomes, dispositivos, tipos
+_SNAPSHOT_HEADER = struct.Struct('<QQQQH')
+_SNAPSHOT_RECORD = struct.Struct('<BBH')   # índice do tipo, índice do estado, tamanho do nome
+_JOURNAL_HEADER = struct.Struct('<Q')      # geração
+_JOURNAL_RECORD = struct.Struct('<BBHB')   # operação, índice do estado, tamanho do nome, tamanho do tipo
+
+OP_ADD = 1
+OP_REMOVE = 2
+OP_TRANSITION = 3
+
+SYNC_MODES = ('always', 'batch', 'none')
+
+
+class Journal:
+    """
+    Diário (write-ahead log) binário e somente de acréscimo das mudanças da casa.
+
+    Cada registro ocupa 5 bytes mais o nome do dispositivo (e o tipo, na inclusão).
+    A durabilidade é controlada por `sync`:
+
+    - 'always': cada registro é gravado e sincronizado (fsync) antes de retornar.
+    - 'batch': registros são agrupados e sincronizados a cada `group_size` registros
+      ou, no máximo, `interval` segundos depois do mais antigo pendente, por um timer
+      (group commit).
+    - 'none': registros são agrupados e entregues ao sistema operacional sem fsync.
+    """
+    def __init__(self, path, generation, sync='batch', group_size=256, interval=0.05):
+        """
+        Abre o diário para acréscimo, criando-o (ou reiniciando-o) na geração informada.
+
+        :param path: Caminho do arquivo do diário.
+        :param generation: Geração do snapshot ao qual o diário se refere.
+        :param sync: Modo de sincronização ('always', 'batch' ou 'none').
+        :param group_size: Registros por grupo nos modos 'batch' e 'none'.
+        :param interval: Atraso máximo, em segundos, de um registro pendente no modo 'batch'.
+        :raises ValueError: Se o modo de sincronização for desconhecido.
+        """
+        if sync not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode: {sync}")
+        self.path = path
+        self.generation = generation
+        self.sync = sync
+        self.group_size = 1 if sync == 'always' else group_size
+        self.interval = interval
+        self.records = 0
+        self._pending = bytearray()
+        self._pending_count = 0
+        self._pending_since = None
+        self._flusher = None
+        self._type_bytes = {}
+        self._lock = threading.RLock()
+        if read_journal_generation(path) != generation:
+            _write_atomically(path, JOURNAL_MAGIC + _JOURNAL_HEADER.pack(generation))
+        self._file = open(path, 'ab')
+
+    def append(self, op, name, state_index=0, device_type=''):
+        """
+        Acrescenta um registro ao diário.
+
+        :param op: OP_ADD, OP_REMOVE ou OP_TRANSITION.
+        :param name: Nome do dispositivo.
+        :param state_index: Índice do novo estado em `states` da classe do dispositivo.
+        :param device_type: Tipo do dispositivo (apenas em OP_ADD).
+        """
+        name_bytes = name.encode('utf-8')
+        type_bytes = self._type_bytes.get(device_type)
+        if type_bytes is None:
+            type_bytes = self._type_bytes[device_type] = device_type.encode('utf-8')
+        with self._lock:
+            pending = self._pending
+            pending += _JOURNAL_RECORD.pack(op, state_index, len(name_bytes), len(type_bytes))
+            pending += type_bytes
+            pending += name_bytes
+            self._pending_count += 1
+            self.records += 1
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+                if self.sync == 'batch' and self._pending_count < self.group_size:
+                    self._flusher = threading.Timer(self.interval, self._commit_pending)
+                    self._flusher.daemon = True
+                    self._flusher.start()
+            if self._pending_count >= self.group_size:
+                self.commit()
+
+    def _commit_pending(self):
+        """
+        Timer do modo 'batch': grava os registros pendentes há `interval` segundos.
+        """
+        with self._lock:
+            if not self._file.closed:
+                self.commit()
+
+    def commit(self):
+        """
+        Grava os registros pendentes e, exceto no modo 'none', sincroniza o arquivo.
+        """
+        with self._lock:
+            if self._flusher is not None:
+                self._flusher.cancel()
+                self._flusher = None
+            if self._pending:
+                self._file.write(self._pending)
+                self._file.flush()
+                if self.sync != 'none':
+                    os.fsync(self._file.fileno())
+                self._pending.clear()
+            self._pending_count = 0
+            self._pending_since = None
+
+    def close(self):
+        """
+        Grava os registros pendentes e fecha o arquivo.
+        """
+        with self._lock:
+            self.commit()
+            self._file.close()
+
+
+def read_journal_generation(path):
+    """
+    :param path: Caminho do arquivo do diário.
+    :return: Geração registrada no diário, ou None se ele não existir ou for inválido.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(len(JOURNAL_MAGIC) + _JOURNAL_HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < len(JOURNAL_MAGIC) + _JOURNAL_HEADER.size or not header.startswith(JOURNAL_MAGIC):
+        return None
+    return _JOURNAL_HEADER.unpack_from(header, len(JOURNAL_MAGIC))[0]
+
+
+def _write_atomically(path, data):
+    """
+    Grava um arquivo por completo em um temporário e o renomeia sobre o destino.
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _map(path):
+    """
+    Mapeia um arquivo em memória somente para leitura.
+
+    :return: Objeto mmap, ou bytes vazios se o arquivo estiver vazio.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class HomeStore:
+    """
+    Persistência da casa inteligente com snapshot binário compacto mais diário de mudanças.
+
+    Toda inclusão, remoção e transição é acrescentada ao diário. `snapshot()` grava o
+    estado completo da casa e inicia um novo diário; na abertura, a casa é restaurada
+    a partir do snapshot (lido via mmap) e apenas o diário posterior a ele é reaplicado.
+
+    Snapshot e diário carregam um número de geração: um diário só é reaplicado sobre o
+    snapshot da mesma geração, o que torna segura uma queda entre a gravação do
+    snapshot e a troca do diário.
+
+    O snapshot pode ser gravado enquanto outras threads alteram a casa: ele e a troca do
+    diário são feitos com a trava da persistência, a mesma que serializa os acréscimos
+    ao diário, de modo que cada mudança vai para o diário antigo (e está no snapshot) ou
+    para o novo. Uma mudança concorrente pode aparecer nos dois; a reaplicação do diário
+    tolera a repetição.
+    """
+    SNAPSHOT_FILE = 'snapshot.bin'
+    JOURNAL_FILE = 'journal.log'
+
+    def __init__(self, directory, sync='batch', group_size=256, interval=0.05, snapshot_every=None):
+        """
+        Inicializa a persistência em um diretório.
+
+        :param directory: Diretório dos arquivos de snapshot e diário (criado se necessário).
+        :param sync: Modo de sincronização do diário ('always', 'batch' ou 'none').
+        :param group_size: Registros por grupo nos modos 'batch' e 'none'.
+        :param interval: Atraso máximo, em segundos, de um registro pendente no modo 'batch'.
+        :param snapshot_every: Se informado, grava um snapshot a cada N registros no diário.
+        """
+        if sync not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode: {sync}")
+        os.makedirs(directory, exist_ok=True)
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, self.JOURNAL_FILE)
+        self.sync = sync
+        self.group_size = group_size
+        self.interval = interval
+        self.snapshot_every = snapshot_every
+        self.generation = 0
+        self.home = None
+        self.journal = None
+        self._lock = threading.RLock()
+
+    def open(self, home=None, max_devices=10):
+        """
+        Restaura a casa a partir do disco e passa a registrar suas mudanças.
+
+        :param home: SmartHome vazia a ser preenchida; por padrão, uma nova SmartHome.
+        :param max_devices: Limite de dispositivos quando não houver snapshot.
+        :return: A SmartHome restaurada.
+        """
+        if home is None:
+            home = SmartHome(max_devices=max_devices)
+        self.home = home
+        # A restauração cria milhões de objetos de vida longa; o coletor cíclico só atrasaria
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if os.path.exists(self.snapshot_path):
+                self._load_snapshot(home)
+            if read_journal_generation(self.journal_path) == self.generation:
+                home.device_count += self._replay_journal(home)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        self.journal = Journal(self.journal_path, self.generation, self.sync, self.group_size, self.interval)
+        home.add_listener(self._on_change)
+        return home
+
+    def _load_snapshot(self, home):
+        """
+        Carrega o snapshot na casa.
+        """
+        data = _map(self.snapshot_path)
+        try:
+            if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError(f"Invalid snapshot file: {self.snapshot_path}")
+            offset = len(SNAPSHOT_MAGIC)
+            generation, max_devices, device_count, count, type_count = _SNAPSHOT_HEADER.unpack_from(data, offset)
+            offset += _SNAPSHOT_HEADER.size
+            classes = []
+            for _ in range(type_count):
+                length = data[offset]
+                classes.append(DEVICE_TYPES[bytes(data[offset + 1:offset + 1 + length]).decode('utf-8')])
+                offset += 1 + length
+            self.generation = generation
+            home.max_devices = max(home.max_devices, max_devices)
+            home.device_count = device_count
+            unpack_record = _SNAPSHOT_RECORD.unpack_from
+            record_size = _SNAPSHOT_RECORD.size
+            add_device = home.add_device
+            for _ in range(count):
+                type_index, state_index, length = unpack_record(data, offset)
+                offset += record_size
+                name = bytes(data[offset:offset + length]).decode('utf-8')
+                offset += length
+                device_class = classes[type_index]
+                device = device_class()
+                device._state = device_class.states[state_index]
+                add_device(name, device)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def _replay_journal(self, home):
+        """
+        Reaplica na casa os registros do diário; um registro final incompleto é ignorado.
+        O limite de dispositivos da casa é ampliado, se necessário, para caber todas as
+        inclusões registradas.
+
+        :return: Número de inclusões reaplicadas.
+        """
+        data = _map(self.journal_path)
+        added = 0
+        try:
+            offset = len(JOURNAL_MAGIC) + _JOURNAL_HEADER.size
+            end = len(data)
+            unpack_record = _JOURNAL_RECORD.unpack_from
+            record_size = _JOURNAL_RECORD.size
+            devices = home.devices
+            while offset + record_size <= end:
+                op, state_index, name_length, type_length = unpack_record(data, offset)
+                start = offset + record_size
+                offset = start + type_length + name_length
+                if offset > end:
+                    break
+                name = bytes(data[start + type_length:offset]).decode('utf-8')
+                if op == OP_ADD:
+                    device_class = DEVICE_TYPES[bytes(data[start:start + type_length]).decode('utf-8')]
+                    device = device_class()
+                    device._state = device_class.states[state_index]
+                    # Inclusão concorrente ao snapshot: o dispositivo já pode estar nele
+                    if name in devices:
+                        home.remove_device(name)
+                    else:
+                        added += 1
+                    if len(devices) >= home.max_devices:
+                        home.max_devices = len(devices) + 1
+                    home.add_device(name, device)
+                elif op == OP_REMOVE:
+                    if name in devices:
+                        home.remove_device(name)
+                else:
+                    # Transição concorrente ao snapshot: ele já pode ter o novo estado
+                    device = devices.get(name)
+                    if device is None:
+                        continue
+                    source = device.state
+                    dest = device.states[state_index]
+                    if dest != source:
+                        device.state = dest
+                        home._on_transition(device, source, dest)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+        return added
+
+    def _on_change(self, event):
+        """
+        Ouvinte da casa: acrescenta cada mudança ao diário.
+        """
+        with self._lock:
+            journal = self.journal
+            if journal is None:
+                return
+            if event.source is None:
+                device_class = DEVICE_TYPES[event.device_type]
+                journal.append(OP_ADD, event.name, device_class.states.index(event.dest), event.device_type)
+            elif event.dest is None:
+                journal.append(OP_REMOVE, event.name)
+            else:
+                device_class = DEVICE_TYPES[event.device_type]
+                journal.append(OP_TRANSITION, event.name, device_class.states.index(event.dest))
+            if self.snapshot_every and journal.records >= self.snapshot_every:
+                self.snapshot()
+
+    def snapshot(self):
+        """
+        Grava o estado completo da casa em um novo snapshot e reinicia o diário.
+
+        Os acréscimos ao diário esperam até que o novo diário esteja aberto.
+        """
+        with self._lock:
+            home = self.home
+            classes = {}
+            body = bytearray()
+            pack_record = _SNAPSHOT_RECORD.pack
+            devices = list(home.devices.items())
+            for name, device in devices:
+                device_class = type(device)
+                type_index = classes.setdefault(device_class, len(classes))
+                name_bytes = name.encode('utf-8')
+                body += pack_record(type_index, device_class.states.index(device.state), len(name_bytes))
+                body += name_bytes
+            type_table = bytearray()
+            for device_class in classes:
+                type_bytes = device_class.device_type.encode('utf-8')
+                type_table.append(len(type_bytes))
+                type_table += type_bytes
+            generation = self.generation + 1
+            header = _SNAPSHOT_HEADER.pack(generation, home.max_devices, home.device_count,
+                                           len(devices), len(classes))
+            if self.journal is not None:
+                self.journal.commit()
+            _write_atomically(self.snapshot_path, SNAPSHOT_MAGIC + header + type_table + body)
+            self.generation = generation
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = Journal(self.journal_path, generation, self.sync, self.group_size, self.interval)
+
+    def commit(self):
+        """
+        Força a gravação dos registros pendentes no diário.
+        """
+        with self._lock:
+            if self.journal is not None:
+                self.journal.commit()
+
+    def close(self, snapshot=False):
+        """
+        Para de registrar as mudanças da casa e fecha o diário.
+
+        :param snapshot: Se True, grava um snapshot antes de fechar.
+        """
+        with self._lock:
+            if snapshot:
+                self.snapshot()
+            if self.home is not None:
+                self.home.remove_listener(self._on_change)
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
@@ -0,0 +1,209 @@
+from itertools import count
+from device import DEVICE_TYPES
+
+MAX_CASCADE = 10000
+
+
+class Rule:
+    """
+    Regra de automação: quando um dispositivo entra no estado de `when` e todas as
+    `conditions` são verdadeiras, as `actions` são executadas.
+    """
+    __slots__ = ('id', 'name', 'when', 'conditions', 'actions', 'missing', 'fired')
+
+    def __init__(self, rule_id, name, when, conditions, actions):
+        self.id = rule_id
+        self.name = name
+        self.when = when
+        self.conditions = conditions
+        self.actions = actions
+        self.missing = 0
+        self.fired = 0
+
+    def __repr__(self):
+        return f'Rule({self.name!r}, when={self.when}, conditions={self.conditions})'
+
+
+class AlphaMemory:
+    """
+    Quantidade de dispositivos que satisfazem uma condição (tipo, estado, nome) e as regras que dependem dela.
+    """
+    __slots__ = ('count', 'rules')
+
+    def __init__(self, count):
+        self.count = count
+        self.rules = {}
+
+
+class RuleEngine:
+    """
+    Motor de regras declarativas alimentado pelas mudanças de estado de uma SmartHome.
+
+    As regras são indexadas pelo evento que as dispara, (tipo, estado) ou (tipo, estado,
+    nome), de modo que uma mudança só consulta as regras que podem casar com ela. As
+    condições são avaliadas de forma incremental, como nas memórias alfa do algoritmo
+    Rete: cada condição distinta mantém a contagem de dispositivos que a satisfazem, e
+    cada regra mantém quantas de suas condições estão faltando. Uma mudança só atualiza
+    as regras de uma condição quando a contagem passa de 0 para 1 ou de 1 para 0, e
+    verificar uma regra disparada custa O(1), independentemente do número de regras e
+    de dispositivos.
+
+    As ações das regras disparadas são executadas depois de cada mudança, em ordem; as
+    mudanças causadas por elas podem disparar outras regras (em cadeia, até MAX_CASCADE
+    ações por mudança externa).
+    """
+    def __init__(self, home):
+        """
+        Inicializa o motor e o registra como ouvinte da casa.
+
+        :param home: Instância de SmartHome.
+        """
+        self.home = home
+        self.rules = {}
+        self._by_event = {}
+        self._alphas = {}
+        self._agenda = []
+        self._running = False
+        self._ids = count(1)
+        home.add_listener(self.on_change)
+
+    def close(self):
+        """
+        Desliga o motor da casa.
+        """
+        self.home.remove_listener(self.on_change)
+
+    def _key(self, condition):
+        """
+        Valida uma condição e a normaliza em (tipo, estado, nome ou None).
+        """
+        device_type, state, *name = condition
+        device_class = DEVICE_TYPES.get(device_type)
+        if device_class is None:
+            raise ValueError(f"Unknown device type: {device_type}")
+        if state not in device_class.states:
+            raise ValueError(f"Unknown state for {device_type}: {state}")
+        if len(name) > 1:
+            raise ValueError(f"Invalid condition: {condition}")
+        return device_type, state, name[0] if name else None
+
+    def _alpha(self, key):
+        """
+        Obtém a memória alfa de uma condição, contando os dispositivos que já a satisfazem.
+        """
+        alpha = self._alphas.get(key)
+        if alpha is None:
+            device_type, state, name = key
+            if name is None:
+                matches = len(self.home.get_devices(device_type, state))
+            else:
+                device = self.home.devices.get(name)
+                matches = int(device is not None and device.device_type == device_type and device.state == state)
+            alpha = self._alphas[key] = AlphaMemory(matches)
+        return alpha
+
+    def add_rule(self, when, actions, conditions=(), name=None):
+        """
+        Adiciona uma regra.
+
+        :param when: Evento que dispara a regra: (tipo, estado) ou (tipo, estado, nome do dispositivo).
+        :param actions: Lista de ações; cada ação é uma tupla (nome do dispositivo, gatilho) ou uma
+            função que recebe o ChangeEvent que disparou a regra.
+        :param conditions: Condições que devem ser verdadeiras no momento do evento, no mesmo
+            formato de `when`; (tipo, estado) significa "algum dispositivo do tipo no estado".
+        :param name: Nome descritivo da regra.
+        :return: A Rule criada.
+        :raises ValueError: Se um tipo ou estado for desconhecido.
+        """
+        when = self._key(when)
+        conditions = tuple(dict.fromkeys(self._key(condition) for condition in conditions))
+        rule_id = next(self._ids)
+        rule = Rule(rule_id, name or f'rule_{rule_id}', when, conditions, list(actions))
+        for key in conditions:
+            alpha = self._alpha(key)
+            alpha.rules[rule_id] = rule
+            if not alpha.count:
+                rule.missing += 1
+        self._by_event.setdefault(when, {})[rule_id] = rule
+        self.rules[rule_id] = rule
+        return rule
+
+    def remove_rule(self, rule):
+        """
+        Remove uma regra.
+
+        :param rule: Rule devolvida por `add_rule`.
+        """
+        del self.rules[rule.id]
+        rules = self._by_event[rule.when]
+        del rules[rule.id]
+        if not rules:
+            del self._by_event[rule.when]
+        for key in rule.conditions:
+            alpha = self._alphas[key]
+            del alpha.rules[rule.id]
+            if not alpha.rules:
+                del self._alphas[key]
+
+    def _update(self, key, delta):
+        """
+        Atualiza a contagem de uma memória alfa e as condições faltantes das suas regras.
+        """
+        alpha = self._alphas.get(key)
+        if alpha is None:
+            return
+        alpha.count += delta
+        if alpha.count == (1 if delta > 0 else 0):
+            for rule in alpha.rules.values():
+                rule.missing -= delta
+
+    def on_change(self, event):
+        """
+        Processa um ChangeEvent da casa: atualiza as memórias alfa e executa as regras disparadas.
+
+        :param event: Evento de mudança.
+        """
+        device_type, name, source, dest = event.device_type, event.name, event.source, event.dest
+        if self._alphas:
+            if source is not None:
+                self._update((device_type, source, None), -1)
+                self._update((device_type, source, name), -1)
+            if dest is not None:
+                self._update((device_type, dest, None), 1)
+                self._update((device_type, dest, name), 1)
+        if dest is None:
+            return
+        for key in ((device_type, dest, None), (device_type, dest, name)):
+            rules = self._by_event.get(key)
+            if rules:
+                self._agenda.extend((rule, event) for rule in rules.values() if not rule.missing)
+        if self._agenda and not self._running:
+            self._run_agenda()
+
+    def _run_agenda(self):
+        """
+        Executa as ações das regras disparadas, incluindo as disparadas em cadeia.
+
+        :raises RuntimeError: Se a cadeia de regras passar de MAX_CASCADE ações.
+        """
+        self._running = True
+        executed = 0
+        try:
+            while self._agenda:
+                agenda, self._agenda = self._agenda, []
+                for rule, event in agenda:
+                    rule.fired += 1
+                    commands = []
+                    for action in rule.actions:
+                        if callable(action):
+                            action(event)
+                        else:
+                            commands.append(action)
+                    if commands:
+                        self.home.apply_batch(commands, strict=False)
+                    executed += len(rule.actions)
+                    if executed > MAX_CASCADE:
+                        raise RuntimeError(f"Rule cascade limit exceeded ({MAX_CASCADE} actions)")
+        finally:
+            self._agenda.clear()
+            self._running = False
@@ -0,0 +1,263 @@
+import time
+from itertools import count
+
+# Bits de cada nível da roda: 256 ticks no primeiro nível e 64 slots em cada nível seguinte.
+LEVEL_BITS = (8, 6, 6, 6)
+
+
+class Timer:
+    """
+    Ação agendada: um gatilho aplicado a um dispositivo (ou, com `broadcast`, a um seletor).
+    """
+    __slots__ = ('id', 'due', 'target', 'trigger', 'every', 'broadcast', '_slot')
+
+    def __init__(self, timer_id, due, target, trigger, every=None, broadcast=False):
+        self.id = timer_id
+        self.due = due
+        self.target = target
+        self.trigger = trigger
+        self.every = every
+        self.broadcast = broadcast
+        self._slot = None
+
+    @property
+    def active(self):
+        """
+        :return: True enquanto o timer estiver pendente.
+        """
+        return self._slot is not None
+
+    def __repr__(self):
+        return f'Timer({self.id}, due={self.due}, target={self.target!r}, trigger={self.trigger!r})'
+
+
+class Scheduler:
+    """
+    Agendador de ações de dispositivos baseado em uma roda de timers hierárquica.
+
+    O tempo é dividido em ticks de `tick` segundos. O primeiro nível da roda tem um
+    slot por tick; cada nível seguinte cobre um intervalo 64 vezes maior e, quando o
+    nível inferior completa uma volta, seus timers descem um nível (cascata). Cada
+    slot é um dicionário id -> Timer, de modo que agendar e cancelar são O(1),
+    independentemente de quantos timers estão pendentes.
+
+    O relógio é injetável (qualquer função que devolva segundos), o que permite testes
+    determinísticos. `run_pending()` avança a roda até o instante atual e executa as
+    ações vencidas em lote: os gatilhos por nome são aplicados com
+    `SmartHome.apply_batch` e os seletores com `SmartHome.broadcast`.
+    """
+    def __init__(self, home, clock=time.time, tick=1.0):
+        """
+        Inicializa o agendador.
+
+        :param home: Instância de SmartHome.
+        :param clock: Função que devolve o instante atual, em segundos.
+        :param tick: Resolução da roda, em segundos.
+        """
+        self.home = home
+        self.clock = clock
+        self.tick = tick
+        self._origin = clock()
+        self._base = 0  # próximo tick a processar
+        self._levels = [[{} for _ in range(1 << bits)] for bits in LEVEL_BITS]
+        # (alcance em ticks, deslocamento, máscara, slots) de cada nível
+        self._layout = []
+        shift = 0
+        for bits, slots in zip(LEVEL_BITS, self._levels):
+            self._layout.append((1 << (shift + bits), shift, (1 << bits) - 1, slots))
+            shift += bits
+        self._ids = count(1)
+        self._pending = 0
+
+    def __len__(self):
+        """
+        :return: Número de timers pendentes.
+        """
+        return self._pending
+
+    def _tick_of(self, when):
+        """
+        Converte um instante no último tick já iniciado até ele.
+        """
+        return int((when - self._origin) // self.tick)
+
+    def _insert(self, timer):
+        """
+        Coloca um timer no slot correspondente ao seu vencimento.
+        """
+        base = self._base
+        due = -int((self._origin - timer.due) // self.tick)
+        if due < base:
+            due = base
+        delta = due - base
+        for limit, shift, mask, slots in self._layout:
+            if delta < limit:
+                break
+        else:
+            # Além do alcance da roda: fica no último slot alcançável e volta a descer na cascata
+            due = base + limit - 1
+        slot = slots[(due >> shift) & mask]
+        slot[timer.id] = timer
+        timer._slot = slot
+
+    def schedule(self, when, target, trigger, every=None, broadcast=False):
+        """
+        Agenda um gatilho para um instante.
+
+        :param when: Instante de execução, na escala do relógio (e.g., time.time()).
+        :param target: Nome do dispositivo, ou seletor de `SmartHome.broadcast` se `broadcast` for True.
+        :param trigger: Nome do gatilho (e.g., 'turn_off').
+        :param every: Intervalo de repetição, em segundos, ou None para executar uma única vez.
+        :param broadcast: Se True, `target` é um seletor (tipo, (tipo, estado) ou None).
+        :return: O Timer criado, que pode ser cancelado com `cancel`.
+        :raises ValueError: Se o intervalo de repetição não for positivo.
+        """
+        if every is not None and every <= 0:
+            raise ValueError("The repeat interval must be positive.")
+        timer = Timer(next(self._ids), when, target, trigger, every, broadcast)
+        self._insert(timer)
+        self._pending += 1
+        return timer
+
+    def after(self, delay, target, trigger, every=None, broadcast=False):
+        """
+        Agenda um gatilho para daqui a `delay` segundos. Ver `schedule`.
+        """
+        return self.schedule(self.clock() + delay, target, trigger, every, broadcast)
+
+    def cancel(self, timer):
+        """
+        Cancela um timer pendente.
+
+        :param timer: Timer devolvido por `schedule` ou `after`.
+        :return: True se o timer estava pendente.
+        """
+        if timer._slot is None:
+            return False
+        del timer._slot[timer.id]
+        timer._slot = None
+        self._pending -= 1
+        return True
+
+    def auto_trigger(self, device_type, state, delay, trigger):
+        """
+        Aplica um gatilho a cada dispositivo que permanecer `delay` segundos em um estado
+        (e.g., trancar uma fechadura destrancada há 5 minutos). O timer é cancelado se o
+        dispositivo sair do estado antes.
+
+        :param device_type: Tipo de dispositivo (e.g., 'door_lock').
+        :param state: Estado observado (e.g., 'unlocked').
+        :param delay: Tempo no estado, em segundos.
+        :param trigger: Gatilho aplicado ao fim do tempo (e.g., 'lock').
+        """
+        timers = {}
+
+        def on_change(event):
+            timer = timers.pop(event.name, None)
+            if timer is not None:
+                self.cancel(timer)
+            if event.device_type == device_type and event.dest == state:
+                timers[event.name] = self.after(delay, event.name, trigger)
+
+        self.home.add_listener(on_change)
+
+    def _cascade(self, level):
+        """
+        Redistribui os timers do slot atual de um nível nos níveis inferiores.
+
+        :return: Índice do slot esvaziado.
+        """
+        shift = sum(LEVEL_BITS[:level])
+        index = (self._base >> shift) & ((1 << LEVEL_BITS[level]) - 1)
+        slot = self._levels[level][index]
+        timers = list(slot.values())
+        slot.clear()
+        for timer in timers:
+            self._insert(timer)
+        return index
+
+    def _expire(self, until):
+        """
+        Avança a roda até o tick `until` (exclusivo), devolvendo os timers vencidos.
+        """
+        due = []
+        first = self._levels[0]
+        mask = len(first) - 1
+        while self._base < until:
+            index = self._base & mask
+            if index == 0:
+                level = 1
+                while level < len(self._levels) and self._cascade(level) == 0:
+                    level += 1
+            slot = first[index]
+            if slot:
+                for timer in slot.values():
+                    timer._slot = None
+                due.extend(slot.values())
+                slot.clear()
+            self._base += 1
+        self._pending -= len(due)
+        return due
+
+    def run_pending(self):
+        """
+        Executa, em lote, todas as ações vencidas até o instante atual.
+
+        Ações são aplicadas na ordem de vencimento; dispositivos removidos e gatilhos
+        inválidos no estado atual são ignorados. Timers recorrentes são reagendados.
+        Um timer nunca é executado antes do seu instante: ele fica no primeiro tick que
+        começa depois dele, e a roda só avança até o tick em curso, de modo que o atraso
+        é de até um tick.
+
+        :return: Lista dos timers executados.
+        """
+        now = self.clock()
+        timers = self._expire(self._tick_of(now) + 1)
+        if not timers:
+            return timers
+        timers.sort(key=lambda timer: (timer.due, timer.id))
+        commands = []
+        for timer in timers:
+            if timer.broadcast:
+                self._flush(commands)
+                try:
+                    self.home.broadcast(timer.target, timer.trigger)
+                except ValueError:
+                    pass
+            else:
+                commands.append((timer.target, timer.trigger))
+        self._flush(commands)
+        for timer in timers:
+            if timer.every is not None:
+                timer.due += timer.every
+                if timer.due <= now:
+                    timer.due += (now - timer.due) // timer.every * timer.every + timer.every
+                self._insert(timer)
+                self._pending += 1
+        return timers
+
+    def _flush(self, commands):
+        """
+        Aplica os gatilhos por nome acumulados em um único lote.
+        """
+        if commands:
+            self.home.apply_batch(commands, strict=False)
+            commands.clear()
+
+    def next_due(self):
+        """
+        :return: Menor instante de vencimento pendente, ou None se não houver timers.
+        """
+        return min((timer.due for slots in self._levels for slot in slots for timer in slot.values()),
+                   default=None)
+
+    def run_forever(self, sleep=time.sleep, stop=None):
+        """
+        Executa as ações vencidas a cada tick até que `stop()` devolva True.
+
+        :param sleep: Função usada para esperar (injetável, como o relógio).
+        :param stop: Função sem argumentos que encerra o laço; por padrão, nunca encerra.
+        """
+        while stop is None or not stop():
+            self.run_pending()
+            sleep(self.tick)
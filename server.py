@@ -0,0 +1,266 @@
+"""
+Servidor local da casa inteligente, com protocolo de linhas JSON sobre TCP.
+
+Uso:
+
+    python server.py --port 8765 --max-devices 100000
+    python server.py --load-test --connections 1000 --requests 200 --pipeline 8
+
+Cada linha enviada é um comando no formato do modo não interativo (ver batch_mode),
+em texto ou JSON, e recebe uma resposta em uma linha, na mesma ordem. Os clientes
+podem enviar vários comandos sem esperar as respostas (pipelining). Além dos
+comandos do batch_mode, o servidor aceita:
+
+    subscribe [type]      passa a receber {"event": {...}} a cada mudança (do tipo, se informado)
+    unsubscribe           deixa de receber eventos
+
+Linhas de evento não são respostas e não entram no pareamento com os comandos. Um
+assinante que não consome os eventos a tempo tem a assinatura cancelada e recebe
+um último evento {"event": {"dropped": "slow consumer"}}.
+
+Todos os comandos são executados na thread do laço de eventos, um de cada vez, de
+modo que as mutações da casa são naturalmente serializadas.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from batch_mode import CommandRunner
+from device_factory import DeviceFactory
+from smart_home import SmartHome
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+# Assinantes com mais bytes pendentes de envio que isso perdem a assinatura.
+MAX_SUBSCRIBER_BACKLOG = 1 << 20
+MAX_LINE = 1 << 20
+
+
+class ConnectionRunner(CommandRunner):
+    """
+    Executor de comandos de uma conexão: os comandos do batch_mode mais as assinaturas de eventos.
+    """
+    FIELDS = dict(CommandRunner.FIELDS, subscribe=('type',), unsubscribe=())
+
+    def __init__(self, server, transport):
+        super().__init__(server.home, server.factory)
+        self.server = server
+        self.transport = transport
+
+    def _op_subscribe(self, device_type=None):
+        if device_type is not None:
+            self.home._resolve_class(device_type)
+        self.server.subscribers[self] = device_type
+        return 'subscribed'
+
+    def _op_unsubscribe(self):
+        self.server.subscribers.pop(self, None)
+        return 'unsubscribed'
+
+
+class _Connection(asyncio.Protocol):
+    """
+    Protocolo de uma conexão: executa todas as linhas completas de cada leitura e
+    envia as respostas em uma única escrita. Enquanto o cliente não consome as
+    respostas (buffer de envio cheio), a leitura de novos comandos fica suspensa.
+    """
+    def __init__(self, server):
+        self.server = server
+        self.runner = None
+        self.transport = None
+        self._buffer = b''
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.runner = ConnectionRunner(self.server, transport)
+        self.server.connections += 1
+
+    def data_received(self, data):
+        lines = (self._buffer + data).split(b'\n')
+        self._buffer = lines.pop()
+        if len(self._buffer) > MAX_LINE:
+            self.transport.close()
+            return
+        run_line = self.runner.run_line
+        results = []
+        for line in lines:
+            result = run_line(line.decode('utf-8', 'replace'))
+            if result is not None:
+                results.append(result)
+        if results:
+            results.append('')
+            self.transport.write('\n'.join(results).encode('utf-8'))
+
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+    def connection_lost(self, exc):
+        self.server.connections -= 1
+        self.server.subscribers.pop(self.runner, None)
+
+
+class HomeServer:
+    """
+    Servidor asyncio que expõe uma SmartHome a muitos clientes simultâneos.
+    """
+    def __init__(self, home, host='127.0.0.1', port=8765):
+        """
+        :param home: Instância de SmartHome servida.
+        :param host: Endereço de escuta (por padrão, apenas a máquina local).
+        :param port: Porta de escuta; 0 escolhe uma porta livre.
+        """
+        self.home = home
+        self.host = host
+        self.port = port
+        self.factory = DeviceFactory()
+        self.subscribers = {}
+        self.connections = 0
+        self._server = None
+        home.add_listener(self._publish)
+
+    async def start(self):
+        """
+        Começa a aceitar conexões.
+
+        :return: Porta efetivamente usada.
+        """
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(lambda: _Connection(self), self.host, self.port, backlog=4096)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def close(self):
+        """
+        Para de aceitar conexões e desliga o servidor da casa.
+        """
+        self.home.remove_listener(self._publish)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        """
+        Inicia o servidor e atende clientes até ser cancelado.
+        """
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def _publish(self, event):
+        """
+        Envia um ChangeEvent a todos os assinantes interessados.
+        """
+        if not self.subscribers:
+            return
+        line = (_encode({'event': {'name': event.name, 'device_type': event.device_type,
+                                   'source': event.source, 'dest': event.dest}}) + '\n').encode('utf-8')
+        dropped = []
+        for runner, device_type in self.subscribers.items():
+            if device_type is not None and device_type != event.device_type:
+                continue
+            transport = runner.transport
+            if transport.is_closing():
+                dropped.append(runner)
+            elif transport.get_write_buffer_size() > MAX_SUBSCRIBER_BACKLOG:
+                dropped.append(runner)
+                transport.write(_encode({'event': {'dropped': 'slow consumer'}}).encode('utf-8') + b'\n')
+            else:
+                transport.write(line)
+        for runner in dropped:
+            del self.subscribers[runner]
+
+
+async def load_test(host, port, connections=100, requests=100, pipeline=4):
+    """
+    Cliente de carga: abre várias conexões e envia comandos com até `pipeline` pendentes por conexão.
+
+    Cada conexão cria sua própria luz e alterna entre ligar, desligar, consultar o
+    status e contar os ativos.
+
+    :param host: Endereço do servidor.
+    :param port: Porta do servidor.
+    :param connections: Número de conexões simultâneas.
+    :param requests: Número de comandos por conexão.
+    :param pipeline: Número máximo de comandos sem resposta por conexão.
+    :return: Tupla (comandos, duração em nanossegundos, latências em nanossegundos, erros).
+    """
+    samples = []
+    errors = 0
+
+    async def client(index):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        name = f'load_{index}_{time.monotonic_ns()}'
+        commands = [f'trigger {name} turn_on\n', f'trigger {name} turn_off\n', f'status {name}\n', 'count_active\n']
+        writer.write(f'add light {name}\n'.encode())
+        await reader.readline()
+        clock = time.perf_counter_ns
+        sent = []
+        for i in range(requests):
+            sent.append(clock())
+            writer.write(commands[i % len(commands)].encode())
+            if len(sent) >= pipeline or i == requests - 1:
+                await writer.drain()
+                while sent:
+                    response = await reader.readline()
+                    samples.append(clock() - sent.pop(0))
+                    if not response.startswith(b'{"ok":true'):
+                        errors += 1
+        writer.write(f'remove {name}\n'.encode())
+        await reader.readline()
+        writer.close()
+
+    start = time.perf_counter_ns()
+    await asyncio.gather(*(client(index) for index in range(connections)))
+    return len(samples), time.perf_counter_ns() - start, samples, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Smart home JSON line server.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument('--max-devices', type=int, default=1000000, help="maximum number of devices")
+    parser.add_argument('--load-test', action='store_true',
+                        help="run the load-test client (against --port if --connect, otherwise an in-process server)")
+    parser.add_argument('--connect', action='store_true', help="with --load-test, use an already running server")
+    parser.add_argument('--connections', type=int, default=100, help="load-test connections (default: 100)")
+    parser.add_argument('--requests', type=int, default=100, help="load-test requests per connection (default: 100)")
+    parser.add_argument('--pipeline', type=int, default=4, help="load-test requests in flight per connection")
+    args = parser.parse_args(argv)
+
+    async def run():
+        if not args.load_test:
+            server = HomeServer(SmartHome(max_devices=args.max_devices), args.host, args.port)
+            await server.start()
+            print(f"Listening on {args.host}:{server.port}", file=sys.stderr)
+            await server.serve_forever()
+            return
+        server = None
+        port = args.port
+        if not args.connect:
+            server = HomeServer(SmartHome(max_devices=args.max_devices), args.host, 0)
+            port = await server.start()
+        count, elapsed, samples, errors = await load_test(args.host, port, args.connections, args.requests,
+                                                          args.pipeline)
+        if server is not None:
+            await server.close()
+        samples.sort()
+        pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] / 1000, 1)
+        print(json.dumps({'connections': args.connections, 'requests': count, 'errors': errors,
+                          'seconds': round(elapsed / 1e9, 3), 'rps': round(count / (elapsed / 1e9)),
+                          'latency_us': {'p50': pick(0.5), 'p99': pick(0.99), 'p999': pick(0.999),
+                                         'max': round(samples[-1] / 1000, 1)}}))
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
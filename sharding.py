@@ -0,0 +1,202 @@
+import multiprocessing
+import os
+import zlib
+from batch_mode import CommandError, CommandRunner
+from smart_home import SmartHome
+
+
+def _shard_main(connection):
+    """
+    Laço de um processo de shard: mantém suas casas e atende as mensagens do gerenciador.
+
+    :param connection: Extremidade do Pipe ligada ao gerenciador.
+    """
+    runners = {}
+    while True:
+        kind, payload = connection.recv()
+        try:
+            if kind == 'create':
+                home_id, max_devices, columnar = payload
+                if home_id in runners:
+                    raise ValueError(f"Home {home_id} already exists.")
+                runners[home_id] = CommandRunner(SmartHome(max_devices=max_devices, columnar=columnar))
+                reply = home_id
+            elif kind == 'batch':
+                reply = []
+                for home_id, op, args in payload:
+                    runner = runners.get(home_id)
+                    try:
+                        if runner is None:
+                            raise CommandError(f"Unknown home: {home_id}")
+                        reply.append((True, runner.execute(op, args)))
+                    except CommandError as e:
+                        reply.append((False, str(e)))
+            elif kind == 'count_active':
+                reply = {home_id: runner.home.count_active_devices() for home_id, runner in runners.items()}
+            elif kind == 'statuses':
+                reply = {home_id: [record.format() for record in runner.home.iter_statuses(payload)]
+                         for home_id, runner in runners.items()}
+            elif kind == 'stop':
+                connection.send((True, None))
+                return
+            else:
+                raise ValueError(f"Unknown message: {kind}")
+            connection.send((True, reply))
+        except Exception as e:
+            connection.send((False, f'{type(e).__name__}: {e}'))
+
+
+class ShardedHomeManager:
+    """
+    Gerencia várias casas independentes distribuídas entre processos de trabalho.
+
+    Cada casa pertence a um único shard, escolhido por um hash estável do seu
+    identificador; comandos e consultas são roteados ao shard dono, e as consultas
+    sobre todas as casas são enviadas a todos os shards em paralelo e combinadas.
+    Os comandos usam o mesmo formato do modo não interativo (ver batch_mode).
+    """
+    def __init__(self, shards=None, start_method=None):
+        """
+        Inicia os processos de shard.
+
+        :param shards: Número de processos; por padrão, o número de CPUs.
+        :param start_method: Método de início do multiprocessing (e.g., 'spawn'); por padrão, o da plataforma.
+        """
+        context = multiprocessing.get_context(start_method)
+        self._connections = []
+        self._processes = []
+        for index in range(shards or os.cpu_count() or 1):
+            parent, child = context.Pipe()
+            process = context.Process(target=_shard_main, args=(child,), name=f'home-shard-{index}', daemon=True)
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+
+    @property
+    def shards(self):
+        """
+        :return: Número de shards.
+        """
+        return len(self._connections)
+
+    def shard_of(self, home_id):
+        """
+        :param home_id: Identificador da casa.
+        :return: Índice do shard dono da casa.
+        """
+        return zlib.crc32(str(home_id).encode('utf-8')) % len(self._connections)
+
+    def _request(self, shard, kind, payload=None):
+        """
+        Envia uma mensagem a um shard e aguarda a resposta.
+        """
+        self._connections[shard].send((kind, payload))
+        return self._receive(shard)
+
+    def _receive(self, shard):
+        ok, reply = self._connections[shard].recv()
+        if not ok:
+            raise RuntimeError(reply)
+        return reply
+
+    def _broadcast(self, kind, payload=None):
+        """
+        Envia uma mensagem a todos os shards e combina as respostas em um único dicionário.
+        """
+        for connection in self._connections:
+            connection.send((kind, payload))
+        merged = {}
+        for shard in range(len(self._connections)):
+            merged.update(self._receive(shard))
+        return merged
+
+    def create_home(self, home_id, max_devices=10, columnar=False):
+        """
+        Cria uma casa no shard responsável pelo seu identificador.
+
+        :param home_id: Identificador da casa.
+        :param max_devices: Número máximo de dispositivos da casa.
+        :param columnar: Se True, a casa usa o armazenamento colunar de estados.
+        """
+        self._request(self.shard_of(home_id), 'create', (home_id, max_devices, columnar))
+
+    def execute(self, home_id, op, *args):
+        """
+        Executa um comando em uma casa.
+
+        :param home_id: Identificador da casa.
+        :param op: Operação (e.g., 'add', 'trigger', 'count_active').
+        :param args: Argumentos da operação.
+        :return: Resultado da operação.
+        :raises CommandError: Se o comando falhar.
+        """
+        ok, result = self.execute_many([(home_id, op, args)])[0]
+        if not ok:
+            raise CommandError(result)
+        return result
+
+    def execute_many(self, commands):
+        """
+        Executa muitos comandos, enviando um lote por shard para que todos trabalhem em paralelo.
+
+        A ordem dos comandos é preservada dentro de cada casa.
+
+        :param commands: Iterável de tuplas (home_id, op, args).
+        :return: Lista de tuplas (ok, resultado ou mensagem de erro), na ordem dos comandos.
+        """
+        batches = [[] for _ in self._connections]
+        positions = [[] for _ in self._connections]
+        count = 0
+        for position, (home_id, op, args) in enumerate(commands):
+            shard = self.shard_of(home_id)
+            batches[shard].append((home_id, op, tuple(args)))
+            positions[shard].append(position)
+            count = position + 1
+        busy = [shard for shard, batch in enumerate(batches) if batch]
+        for shard in busy:
+            self._connections[shard].send(('batch', batches[shard]))
+        results = [None] * count
+        for shard in busy:
+            for position, result in zip(positions[shard], self._receive(shard)):
+                results[position] = result
+        return results
+
+    def count_active(self):
+        """
+        Conta os dispositivos ativos de todas as casas.
+
+        :return: Tupla (total, dicionário home_id -> contagem).
+        """
+        per_home = self._broadcast('count_active')
+        return sum(per_home.values()), per_home
+
+    def list_statuses(self, device_type=None):
+        """
+        Lista o status dos dispositivos de todas as casas.
+
+        :param device_type: Tipo de dispositivo para filtrar, ou None para todos.
+        :return: Dicionário home_id -> lista de status em texto.
+        """
+        return self._broadcast('statuses', device_type)
+
+    def close(self):
+        """
+        Encerra os processos de shard.
+        """
+        for shard, connection in enumerate(self._connections):
+            try:
+                self._request(shard, 'stop')
+            except (EOFError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
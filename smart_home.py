@@ -1,27 +1,146 @@
-from device import Device, Light, Thermostat, SecuritySystem, AirConditioner, DoorLock
+import threading
+import time
+from collections import defaultdict, namedtuple
+from contextlib import ExitStack
+from itertools import islice
+from device import _FREE_LOCK, DEVICE_TYPES, LOCK_STRIPES, Device, Light, stripe_index
+from event_bus import ChangeEvent
+from state_store import DeviceStateStore
 
-class SmartHome:
+DEVICE_CLASSES = DEVICE_TYPES
+
+# Dispositivos copiados de cada vez por `iter_statuses`
+STATUS_CHUNK = 1024
+
+
+class StatusRecord(namedtuple('StatusRecord', 'name device_type state')):
     """
-    Classe para representar a casa inteligente com o padrão Singleton.
+    Status estruturado de um dispositivo; o texto só é montado por `format()`.
+    """
+    __slots__ = ()
+
+    def format(self):
+        """
+        :return: Status em texto (e.g., 'device_1: Light is on').
+        """
+        return f'{self.name}: {DEVICE_TYPES[self.device_type].format_status(self.state)}'
+
+# Resposta de `changes_since`: versão atual, StatusRecord dos dispositivos que mudaram
+# (estado None para os removidos) e se o cliente precisa reler a frota inteira.
+FeedDelta = namedtuple('FeedDelta', 'version changes resync')
+
+class SmartHome:
     """
-    _instance = None
-    
-    def __new__(cls, *args, **kwargs):
-        if not cls._instance:
-            cls._instance = super(SmartHome, cls).__new__(cls)
-        return cls._instance
+    Classe para representar a casa inteligente.
+
+    Cada instância é uma casa independente; para distribuir várias casas entre
+    processos, veja sharding.ShardedHomeManager.
 
-    def __init__(self, max_devices=10):
+    Modelo de concorrência (CPython):
+
+    - Os gatilhos de um dispositivo da casa são serializados por uma trava listrada
+      (uma de LOCK_STRIPES RLocks, escolhida pela identidade do dispositivo): a leitura
+      do estado, a transição, a atualização dos índices e a entrega aos ouvintes são
+      atômicas para aquele dispositivo, e seus eventos chegam aos ouvintes em ordem.
+      Dispositivos diferentes podem ser acionados em paralelo.
+    - Inclusões e remoções usam a trava do registro (depois da trava do dispositivo); as
+      operações em massa (`add_devices` e `broadcast` no modo colunar) adquirem todas
+      as travas listradas, sempre na mesma ordem, antes da trava do registro. Os
+      eventos de inclusão e remoção são entregues com a trava do registro adquirida,
+      de modo que a remoção de um nome e sua reinclusão chegam aos ouvintes em ordem.
+    - Consultas sobre a frota não adquirem travas: trabalham sobre cópias dos índices
+      (feitas em C, atomicamente em relação às outras threads) e podem não refletir
+      mudanças concorrentes ao seu início.
+    - Os ouvintes são chamados na thread que provocou a mudança, com a trava do
+      dispositivo adquirida. Um ouvinte que aciona outros dispositivos de forma síncrona
+      (e.g., RuleEngine) pode causar deadlock se várias threads fizerem o mesmo; nesse
+      caso, entregue os eventos por um EventBus.
+    - Dispositivos fora de uma casa compartilham uma única trava global.
+
+    Cada inclusão, remoção e transição incrementa `version` e é registrada no feed de
+    mudanças (ver `changes_since`), de modo que clientes que consultam periodicamente
+    só buscam os dispositivos que mudaram.
+    """
+    def __init__(self, max_devices=10, columnar=False, feed_size=None):
         """
         Inicializa a casa inteligente com um limite de dispositivos.
 
+        Sem o armazenamento colunar, a casa mantém índices secundários atualizados a
+        cada inclusão, remoção e transição: dispositivos por classe, por (classe,
+        estado) e o conjunto de dispositivos ativos.
+
         :param max_devices: Número máximo de dispositivos permitidos.
+        :param columnar: Se True, o estado dos dispositivos é guardado em um
+            DeviceStateStore e as consultas sobre a frota inteira são vetorizadas.
+        :param feed_size: Número máximo de dispositivos (incluindo removidos) mantidos no
+            feed de mudanças; por padrão, `max_devices`.
+        """
+        self.devices = {}
+        self.device_count = 0
+        self.max_devices = max_devices
+        self.store = DeviceStateStore() if columnar else None
+        self._by_class = defaultdict(dict)
+        self._by_state = defaultdict(dict)
+        self._active = {}
+        self._listeners = ()
+        self._lock = threading.RLock()
+        self._stripes = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self.version = 0
+        self.feed_size = max_devices if feed_size is None else feed_size
+        self._feed = {}
+        self._feed_floor = 0
+        self._feed_lock = threading.Lock()
+
+    def lock_for(self, device):
+        """
+        Obtém a trava listrada que serializa os gatilhos de um dispositivo.
+
+        :param device: Instância do dispositivo.
+        :return: RLock compartilhada com os dispositivos da mesma listra.
+        """
+        return self._stripes[stripe_index(device)]
+
+    def _all_stripes(self):
+        """
+        Adquire todas as travas listradas, em ordem, para uma operação em massa.
+
+        :return: Contexto que libera as travas ao sair.
+        """
+        stack = ExitStack()
+        for stripe in self._stripes:
+            stack.enter_context(stripe)
+        return stack
+
+    def add_listener(self, listener):
+        """
+        Registra um ouvinte de mudanças (inclusão, remoção e transições de dispositivos).
+
+        O ouvinte é chamado na thread que provocou a mudança, com um ChangeEvent; para
+        entregar as mudanças de forma assíncrona, registre um EventBus.
+
+        :param listener: Função (ou EventBus) que recebe um ChangeEvent.
+        """
+        with self._lock:
+            self._listeners = self._listeners + (listener,)
+
+    def remove_listener(self, listener):
+        """
+        Remove um ouvinte registrado com add_listener.
+
+        :param listener: Ouvinte a ser removido.
+        """
+        with self._lock:
+            listeners = list(self._listeners)
+            listeners.remove(listener)
+            self._listeners = tuple(listeners)
+
+    def _emit(self, name, device_type, source, dest):
+        """
+        Entrega um ChangeEvent a todos os ouvintes.
         """
-        if not hasattr(self, 'initialized'):
-            self.devices = {}
-            self.device_count = 0
-            self.max_devices = max_devices
-            self.initialized = True
+        event = ChangeEvent(name, device_type, source, dest, time.monotonic())
+        for listener in self._listeners:
+            listener(event)
 
     def add_device(self, name: str, device: Device):
         """
@@ -30,11 +149,58 @@ class SmartHome:
         :param name: Nome do dispositivo.
         :param device: Instância do dispositivo a ser adicionado.
         """
-        if len(self.devices) >= self.max_devices:
-            raise Exception("Device limit reached")
-        if name in self.devices:
-            raise ValueError(f"Device with name {name} already exists.")
+        with self.lock_for(device):
+            with self._lock:
+                if len(self.devices) >= self.max_devices:
+                    raise Exception("Device limit reached")
+                if name in self.devices:
+                    raise ValueError(f"Device with name {name} already exists.")
+                if device._home is not None:
+                    raise ValueError(f"Device {name} already belongs to a smart home.")
+                self._insert(name, device)
+                if self._listeners:
+                    self._emit(name, device.device_type, None, device.state)
+
+    def add_devices(self, items):
+        """
+        Adiciona vários dispositivos de uma vez, validando todos antes de incluir qualquer um.
+
+        :param items: Iterável de tuplas (nome, dispositivo).
+        :raises Exception: Se o limite de dispositivos for ultrapassado.
+        :raises ValueError: Se algum nome se repetir ou algum dispositivo já pertencer a uma casa.
+        """
+        items = list(items)
+        with self._all_stripes():
+            with self._lock:
+                if len(self.devices) + len(items) > self.max_devices:
+                    raise Exception("Device limit reached")
+                names = set()
+                for name, device in items:
+                    if name in self.devices or name in names:
+                        raise ValueError(f"Device with name {name} already exists.")
+                    if device._home is not None:
+                        raise ValueError(f"Device {name} already belongs to a smart home.")
+                    names.add(name)
+                insert = self._insert
+                for name, device in items:
+                    insert(name, device)
+                if self._listeners:
+                    for name, device in items:
+                        self._emit(name, device.device_type, None, device.state)
+
+    def _insert(self, name, device):
+        """
+        Inclui um dispositivo já validado no registro e nos índices (com a trava do registro adquirida).
+        """
+        if self.store is not None:
+            self.store.attach(name, device)
+        else:
+            self._index(name, device)
+        device._home = self
+        device._lock = self._stripes[stripe_index(device)]
+        device._name = name
         self.devices[name] = device
+        self._stamp(name, device.device_type)
 
     def remove_device(self, name: str):
         """
@@ -42,10 +208,157 @@ class SmartHome:
 
         :param name: Nome do dispositivo a ser removido.
         """
-        if name in self.devices:
-            del self.devices[name]
-        else:
+        device = self.devices.get(name)
+        if device is None:
             raise KeyError("Device not found.")
+        with self.lock_for(device):
+            with self._lock:
+                if self.devices.get(name) is not device:
+                    raise KeyError("Device not found.")
+                state = device.state
+                del self.devices[name]
+                if self.store is not None:
+                    self.store.detach(device)
+                else:
+                    self._unindex(name, device)
+                device._home = None
+                device._lock = _FREE_LOCK
+                device._name = None
+                self._stamp(name, device.device_type)
+                if self._listeners:
+                    self._emit(name, device.device_type, state, None)
+
+    def _index(self, name, device):
+        """
+        Inclui um dispositivo nos índices por classe, por estado e de ativos.
+        """
+        device_class = type(device)
+        state = device.state
+        self._by_class[device_class][name] = device
+        self._by_state[(device_class, state)][name] = device
+        if state != 'off':
+            self._active[name] = device
+
+    def _unindex(self, name, device):
+        """
+        Retira um dispositivo dos índices por classe, por estado e de ativos.
+        """
+        device_class = type(device)
+        del self._by_class[device_class][name]
+        del self._by_state[(device_class, device.state)][name]
+        self._active.pop(name, None)
+
+    def _on_transition(self, device, source, dest):
+        """
+        Atualiza os índices e avisa os ouvintes após a transição de um dispositivo da casa.
+
+        Chamado por Device._fire com a trava do dispositivo adquirida. Cada atualização
+        dos índices é uma única operação de dicionário (atômica sob o GIL), e a remoção do
+        dispositivo exige a mesma trava; por isso a trava do registro não é necessária.
+
+        :param device: Dispositivo que mudou de estado.
+        :param source: Estado anterior.
+        :param dest: Novo estado.
+        """
+        if self.store is None:
+            name = device._name
+            device_class = type(device)
+            del self._by_state[(device_class, source)][name]
+            self._by_state[(device_class, dest)][name] = device
+            if dest == 'off':
+                del self._active[name]
+            elif source == 'off':
+                self._active[name] = device
+        self._stamp(device._name, device.device_type)
+        if self._listeners:
+            self._emit(device._name, device.device_type, source, dest)
+
+    def _stamp(self, name, device_type):
+        """
+        Incrementa a versão e move o dispositivo para o fim do feed de mudanças,
+        descartando a entrada mais antiga se o feed passar de `feed_size`.
+        """
+        with self._feed_lock:
+            self.version = version = self.version + 1
+            feed = self._feed
+            feed.pop(name, None)
+            feed[name] = (version, device_type)
+            if len(feed) > self.feed_size:
+                self._feed_floor = feed.pop(next(iter(feed)))[0]
+
+    def changes_since(self, version):
+        """
+        Obtém os dispositivos incluídos, removidos ou alterados depois de uma versão.
+
+        O feed guarda a última versão de cada dispositivo, em ordem de mudança, e é lido
+        do fim para o começo: o custo depende do número de dispositivos que mudaram, não
+        do tamanho da frota. Os estados devolvidos são os atuais; um dispositivo que
+        mudar durante a consulta volta a aparecer na consulta seguinte.
+
+        Se a versão for anterior à janela mantida pelo feed (ou posterior à versão
+        atual), o resultado pede uma releitura completa: leia `version` antes de
+        percorrer a frota (e.g., com `iter_statuses`) e continue a partir dela.
+
+        :param version: Última versão vista pelo cliente (0 para a primeira consulta).
+        :return: FeedDelta com a versão atual, a lista de StatusRecord em ordem de mudança
+            (estado None para dispositivos removidos) e `resync`.
+        """
+        with self._feed_lock:
+            current = self.version
+            if version < self._feed_floor or version > current:
+                return FeedDelta(current, [], True)
+            changed = []
+            for name, (stamp, device_type) in reversed(self._feed.items()):
+                if stamp <= version:
+                    break
+                changed.append((name, device_type))
+        devices = self.devices
+        changes = []
+        for name, device_type in reversed(changed):
+            device = devices.get(name)
+            changes.append(StatusRecord(name, device_type, None if device is None else device.state))
+        return FeedDelta(current, changes, False)
+
+    def _resolve_class(self, device_type):
+        """
+        Converte um tipo de dispositivo (e.g., 'light') na classe correspondente.
+
+        :param device_type: Nome do tipo ou a própria classe.
+        :return: Classe do dispositivo.
+        :raises ValueError: Se o tipo de dispositivo não for reconhecido.
+        """
+        if isinstance(device_type, type) and issubclass(device_type, Device):
+            return device_type
+        device_class = DEVICE_CLASSES.get(device_type)
+        if not device_class:
+            raise ValueError(f"Tipo de dispositivo desconhecido: {device_type}")
+        return device_class
+
+    def get_devices(self, device_type, state=None):
+        """
+        Obtém os dispositivos de um tipo, opcionalmente filtrados por estado.
+
+        O custo é proporcional ao número de dispositivos retornados.
+
+        :param device_type: O tipo de dispositivo (e.g., 'security') ou sua classe.
+        :param state: Estado para filtrar (e.g., 'armed_away'), ou None para todos.
+        :return: Lista de tuplas (nome, dispositivo).
+        :raises ValueError: Se o tipo de dispositivo não for reconhecido.
+        """
+        device_class = self._resolve_class(device_type)
+        if self.store is not None:
+            store = self.store
+            if state is None:
+                codes = store.class_codes(device_class)
+            elif state in device_class._codes:
+                codes = [device_class._codes[state]]
+            else:
+                return []
+            names, devices = store.names, store.devices
+            return [(names[slot], devices[slot]) for slot in store.slots(codes) if devices[slot] is not None]
+        if state is None:
+            return list(self._by_class.get(device_class, {}).items())
+        return list(self._by_state.get((device_class, state), {}).items())
 
     def get_device_status(self, name: str) -> str:
         """
@@ -58,13 +371,75 @@ class SmartHome:
             return self.devices[name].get_status()
         return f'{name} not found'
 
+    def iter_statuses(self, device_type=None, offset=0, limit=None):
+        """
+        Percorre o status dos dispositivos sob demanda, sem montar listas nem textos.
+
+        Os dispositivos são copiados em blocos de até STATUS_CHUNK, de modo que a memória
+        usada não depende do tamanho da frota. Cada bloco é copiado atomicamente; se o
+        registro mudar de tamanho entre dois blocos (inclusões e remoções concorrentes), a
+        leitura continua da mesma posição, que pode ter se deslocado, como entre as páginas
+        de `page_statuses`.
+
+        :param device_type: Tipo de dispositivo para filtrar, ou None para todos.
+        :param offset: Número de dispositivos a pular (percorridos, custo O(offset)).
+        :param limit: Número máximo de registros, ou None para todos.
+        :return: Gerador de StatusRecord, na ordem de inclusão.
+        :raises ValueError: Se o tipo de dispositivo não for reconhecido.
+        """
+        if device_type is None:
+            items = self.devices.items()
+        else:
+            device_class = self._resolve_class(device_type)
+            if self.store is not None:
+                items = self.get_devices(device_class)
+            else:
+                items = self._by_class.get(device_class, {}).items()
+        position = offset
+        remaining = limit
+        iterator = islice(items, position, None)
+        while remaining is None or remaining > 0:
+            size = STATUS_CHUNK if remaining is None else min(STATUS_CHUNK, remaining)
+            try:
+                chunk = list(islice(iterator, size))
+            except RuntimeError:
+                # O dicionário mudou de tamanho entre dois blocos: retoma da posição atual
+                iterator = islice(items, position, None)
+                continue
+            if not chunk:
+                return
+            position += len(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+            for name, device in chunk:
+                yield StatusRecord(name, device.device_type, device.state)
+
+    def page_statuses(self, device_type=None, cursor=0, limit=100):
+        """
+        Obtém uma página de status dos dispositivos.
+
+        O cursor é a posição do próximo dispositivo na ordem de inclusão: cada página
+        percorre os dispositivos anteriores a ela, de modo que seu custo é O(cursor +
+        limit), e inclusões ou remoções entre páginas deslocam as posições seguintes. Para
+        percorrer toda a frota, prefira `iter_statuses` sem paginação.
+
+        :param device_type: Tipo de dispositivo para filtrar, ou None para todos.
+        :param cursor: Posição inicial, devolvida pela página anterior (0 para a primeira).
+        :param limit: Tamanho máximo da página.
+        :return: Tupla (lista de StatusRecord, cursor da próxima página ou None no fim).
+        """
+        records = list(self.iter_statuses(device_type, cursor, limit + 1))
+        if len(records) > limit:
+            return records[:limit], cursor + limit
+        return records, None
+
     def get_statuses(self):
         """
         Obtém o status de todos os dispositivos no sistema.
 
         :return: Uma lista de strings, onde cada string representa o status de um dispositivo.
         """
-        return [f'{name}: {device.get_status()}' for name, device in self.devices.items()]
+        return [record.format() for record in self.iter_statuses()]
 
     def get_all_status(self, device_type: str) -> str:
         """
@@ -74,18 +449,7 @@ class SmartHome:
         :return: Uma string com o status de todos os dispositivos do tipo especificado.
         :raises ValueError: Se o tipo de dispositivo não for reconhecido.
         """
-        device_classes = {
-            'light': Light,
-            'thermostat': Thermostat,
-            'security': SecuritySystem,
-            'air_conditioner': AirConditioner,
-            'door_lock': DoorLock
-        }
-        device_class = device_classes.get(device_type)
-        if not device_class:
-            raise ValueError(f"Tipo de dispositivo desconhecido: {device_type}")
-        
-        statuses = [f'{name}: {device.get_status()}' for name, device in self.devices.items() if isinstance(device, device_class)]
+        statuses = [record.format() for record in self.iter_statuses(device_type)]
         return '\n'.join(statuses) if statuses else "Nenhum dispositivo encontrado."
 
     def get_active_devices(self):
@@ -94,7 +458,18 @@ class SmartHome:
 
         :return: Uma lista de dispositivos que estão em um estado diferente de 'off'.
         """
-        return [device for device in self.devices.values() if device.state != 'off']
+        if self.store is not None:
+            devices = self.store.devices
+            return [devices[slot] for slot in self.store.slots(self.store.active_codes()) if devices[slot] is not None]
+        return list(self._active.values())
+
+    def get_active_statuses(self):
+        """
+        Obtém o status dos dispositivos ativos.
+
+        :return: Lista de strings com o nome e o status de cada dispositivo ativo.
+        """
+        return [f'{device._name}: {device.get_status()}' for device in self.get_active_devices()]
 
     def count_active_devices(self):
         """
@@ -102,7 +477,134 @@ class SmartHome:
 
         :return: O número total de dispositivos ativos.
         """
-        return sum(1 for device in self.devices.values() if device.state != 'off')
+        if self.store is not None:
+            return self.store.count_active()
+        return len(self._active)
+
+    def _plan_batch(self, commands):
+        """
+        Simula um lote sobre os estados atuais, consultando apenas as tabelas de transição.
+
+        :return: Tupla (lista de (dispositivo, gatilho) a executar, lista de mensagens de erro).
+        """
+        plan = []
+        errors = []
+        pending = {}
+        for target, trigger in commands:
+            device = self.devices.get(target) if isinstance(target, str) else target
+            if device is None or device._home is not self:
+                errors.append(f"{target} not found")
+                continue
+            moves = device._table.get(trigger)
+            if moves is None:
+                errors.append(f"Ação {trigger} não encontrada para {type(device).__name__}.")
+                continue
+            source = pending.get(device, device.state)
+            dest = moves.get(source)
+            if dest is None:
+                if source not in moves.values():
+                    errors.append(f"Can't trigger event {trigger} from state {source}!")
+                continue
+            pending[device] = dest
+            plan.append((device, trigger))
+        return plan, errors
+
+    def validate_batch(self, commands):
+        """
+        Valida um lote sem executá-lo (dry run), com as mesmas regras de `apply_batch`:
+        cada comando é verificado a partir do estado que os comandos anteriores do lote
+        produziriam.
+
+        :param commands: Iterável de tuplas (nome ou dispositivo, gatilho).
+        :return: Lista de mensagens de erro; vazia se o lote for válido.
+        """
+        return self._plan_batch(commands)[1]
+
+    def apply_batch(self, commands, strict=True):
+        """
+        Aplica vários comandos (dispositivo, gatilho) em uma única passada.
+
+        Todos os comandos são validados antes de qualquer transição, usando a tabela de
+        transições de cada classe. Comandos cujo dispositivo já está no estado de destino
+        do gatilho são ignorados. Ao final, cada observador recebe uma única notificação
+        agrupada com os dispositivos que mudaram. Cada comando é revalidado com a trava do
+        dispositivo adquirida; comandos invalidados por mudanças concorrentes são ignorados.
+
+        :param commands: Iterável de tuplas (nome ou dispositivo, gatilho).
+        :param strict: Se True, comandos inválidos abortam o lote inteiro; se False, são ignorados.
+        :return: Lista dos dispositivos que mudaram de estado, na ordem de aplicação.
+        :raises ValueError: Se strict for True e algum comando for inválido.
+        """
+        plan, errors = self._plan_batch(commands)
+        if strict and errors:
+            raise ValueError('; '.join(errors))
+
+        fired = []
+        for device, trigger in plan:
+            with self.lock_for(device):
+                if device._home is self and device.state in device._table[trigger]:
+                    device._fire(trigger)
+                    fired.append(device)
+        changed = list(dict.fromkeys(fired))
+        self._notify_grouped(changed)
+        return changed
+
+    def broadcast(self, selector, trigger):
+        """
+        Aplica um gatilho a todos os dispositivos selecionados.
+
+        Dispositivos para os quais o gatilho não é válido no estado atual são ignorados.
+
+        :param selector: Tipo de dispositivo (e.g., 'light') ou classe, uma tupla
+            (tipo, estado), ou None para todos os dispositivos que possuem o gatilho.
+        :param trigger: Nome do gatilho (e.g., 'turn_off', 'arm_away').
+        :return: Lista dos dispositivos que mudaram de estado.
+        :raises ValueError: Se o tipo não for reconhecido ou não tiver o gatilho.
+        """
+        if selector is None:
+            classes = [cls for cls in DEVICE_CLASSES.values() if trigger in cls._table]
+            state = None
+        else:
+            device_type, state = selector if isinstance(selector, tuple) else (selector, None)
+            classes = [self._resolve_class(device_type)]
+            if trigger not in classes[0]._table:
+                raise ValueError(f"Ação {trigger} não encontrada para {classes[0].__name__}.")
+
+        if self.store is not None and state is None:
+            changed = []
+            with self._all_stripes():
+                for device_class in classes:
+                    for slot, source, dest in self.store.apply(device_class, trigger):
+                        device = self.store.devices[slot]
+                        self._on_transition(device, source, dest)
+                        changed.append(device)
+            self._notify_grouped(changed)
+            return changed
+
+        commands = []
+        for device_class in classes:
+            for source in device_class._table[trigger]:
+                if state is None or state == source:
+                    commands.extend((device, trigger) for _, device in self.get_devices(device_class, source))
+        return self.apply_batch(commands, strict=False)
+
+    def _notify_grouped(self, devices):
+        """
+        Envia uma única notificação por observador com todos os dispositivos que ele acompanha.
+
+        :param devices: Dispositivos que mudaram de estado.
+        """
+        groups = {}
+        for device in devices:
+            for observer in device._observers:
+                groups.setdefault(observer, []).append(device)
+        for observer, observed in groups.items():
+            update_batch = getattr(observer, 'update_batch', None)
+            if update_batch is not None:
+                update_batch(observed)
+            else:
+                for device in observed:
+                    observer.update(device)
 
     def control_lights(self, action):
         """
@@ -113,23 +615,12 @@ class SmartHome:
         """
         if action not in ['turn_on', 'turn_off']:
             raise ValueError(f"Ação não reconhecida: {action}. Use 'turn_on' ou 'turn_off'.")
-        
-        for device in self.devices.values():
-            if isinstance(device, Light):
-                if action == 'turn_on' and device.state == 'on':
-                    continue  # Já está ligado, não faz nada
-                elif action == 'turn_off' and device.state == 'off':
-                    continue  # Já está desligado, não faz nada
-                if hasattr(device, action):
-                    getattr(device, action)()
-                    device.notify_observers()
-                else:
-                    raise ValueError(f"Ação {action} não encontrada para Light.")
-                
+        self.broadcast(Light, action)
+
     def list_all_devices(self):
         """
         Lista todos os dispositivos na casa inteligente.
 
         :return: Lista de strings com o nome e o status de todos os dispositivos.
         """
-        return [f"{name}: {device.get_status()}" for name, device in self.devices.items()]
+        return [record.format() for record in self.iter_statuses()]
@@ -0,0 +1,167 @@
+from device import STATE_CODES
+
+EMPTY = 255
+
+
+def _find_all(buffer, value):
+    """
+    Percorre as posições de um byte em um buffer usando a busca nativa de bytearray.
+
+    :param buffer: bytearray a ser percorrido.
+    :param value: Valor do byte procurado.
+    :return: Gerador com as posições encontradas, em ordem crescente.
+    """
+    find = buffer.find
+    position = find(value)
+    while position != -1:
+        yield position
+        position = find(value, position + 1)
+
+
+class DeviceStateStore:
+    """
+    Armazenamento colunar do estado dos dispositivos.
+
+    O estado de cada dispositivo é guardado como um código de um byte (ver
+    `device.STATE_CODES`) em um bytearray indexado pelo slot do dispositivo. Como o
+    código identifica a classe e o estado ao mesmo tempo, contagens, filtros e
+    transições em massa são feitos com `count`, `find` e `translate`, que percorrem a
+    coluna inteira em C em vez de iterar sobre objetos Python.
+    """
+    def __init__(self):
+        """
+        Inicializa o armazenamento vazio.
+        """
+        self.codes = bytearray()
+        self.devices = []
+        self.names = []
+        self._free = []
+
+    def __len__(self):
+        """
+        :return: Número de slots ocupados.
+        """
+        return len(self.devices) - len(self._free)
+
+    def attach(self, name, device):
+        """
+        Associa um dispositivo a um slot livre e passa a guardar seu estado na coluna.
+
+        :param name: Nome do dispositivo.
+        :param device: Instância do dispositivo.
+        :return: O slot ocupado pelo dispositivo.
+        :raises ValueError: Se o dispositivo já estiver associado a um armazenamento.
+        """
+        if device._store is not None:
+            raise ValueError(f"Device {name} is already attached to a state store.")
+        code = device._codes[device._state]
+        if self._free:
+            slot = self._free.pop()
+            self.codes[slot] = code
+            self.devices[slot] = device
+            self.names[slot] = name
+        else:
+            slot = len(self.devices)
+            self.codes.append(code)
+            self.devices.append(device)
+            self.names.append(name)
+        device._store = self
+        device._slot = slot
+        return slot
+
+    def detach(self, device):
+        """
+        Libera o slot de um dispositivo, devolvendo o estado para o próprio objeto.
+
+        :param device: Instância do dispositivo associada a este armazenamento.
+        """
+        slot = device._slot
+        device._state = STATE_CODES[self.codes[slot]][1]
+        device._store = None
+        device._slot = -1
+        self.codes[slot] = EMPTY
+        self.devices[slot] = None
+        self.names[slot] = None
+        self._free.append(slot)
+
+    def _mask(self, codes):
+        """
+        Converte a coluna de estados em uma máscara com 1 nos slots cujos códigos pertencem a `codes`.
+
+        :param codes: Códigos de estado selecionados.
+        :return: bytearray do mesmo tamanho da coluna.
+        """
+        table = bytearray(256)
+        for code in codes:
+            table[code] = 1
+        return self.codes.translate(table)
+
+    def count(self, codes):
+        """
+        Conta os slots cujos estados pertencem a `codes`.
+
+        :param codes: Códigos de estado selecionados.
+        :return: Número de slots correspondentes.
+        """
+        return sum(self.codes.count(code) for code in codes)
+
+    def slots(self, codes):
+        """
+        Lista, em ordem de slot, os slots cujos estados pertencem a `codes`.
+
+        :param codes: Códigos de estado selecionados.
+        :return: Lista de slots.
+        """
+        codes = list(codes)
+        if len(codes) == 1:
+            return list(_find_all(self.codes, codes[0]))
+        return list(_find_all(self._mask(codes), 1))
+
+    def class_codes(self, device_class):
+        """
+        :param device_class: Classe de dispositivo.
+        :return: Códigos de todos os estados da classe.
+        """
+        return device_class._codes.values()
+
+    def active_codes(self):
+        """
+        :return: Códigos dos estados considerados ativos (diferentes de 'off').
+        """
+        return [code for code, (_, state) in enumerate(STATE_CODES) if state != 'off']
+
+    def count_active(self):
+        """
+        Conta os dispositivos ativos (ou seja, que não estão em estado 'off').
+
+        :return: Número de dispositivos ativos.
+        """
+        inactive = [code for code, (_, state) in enumerate(STATE_CODES) if state == 'off']
+        return len(self) - self.count(inactive)
+
+    def apply(self, device_class, trigger):
+        """
+        Aplica um gatilho a todos os dispositivos de uma classe em uma única passada.
+
+        Dispositivos cujo estado atual não aceita o gatilho permanecem inalterados.
+
+        :param device_class: Classe dos dispositivos afetados.
+        :param trigger: Nome do gatilho.
+        :return: Lista, em ordem de slot, de tuplas (slot, estado anterior, novo estado)
+            dos dispositivos que mudaram.
+        :raises ValueError: Se a classe não tiver o gatilho.
+        """
+        moves = device_class._table.get(trigger)
+        if moves is None:
+            raise ValueError(f"Ação {trigger} não encontrada para {device_class.__name__}.")
+        codes = device_class._codes
+        table = bytearray(range(256))
+        changed = []
+        for source, dest in moves.items():
+            if source != dest:
+                table[codes[source]] = codes[dest]
+                changed.extend((slot, source, dest) for slot in _find_all(self.codes, codes[source]))
+        if changed:
+            self.codes = self.codes.translate(table)
+            changed.sort()
+        return changed
@@ -0,0 +1,180 @@
+from itertools import count
+from device import DEVICE_TYPES
+
+
+class Subscription:
+    """
+    Assinatura filtrada de mudanças de estado: cada filtro None aceita qualquer valor.
+    """
+    __slots__ = ('id', 'callback', 'device_type', 'name', 'group', 'source', 'dest', 'delivered')
+
+    def __init__(self, subscription_id, callback, device_type, name, group, source, dest):
+        self.id = subscription_id
+        self.callback = callback
+        self.device_type = device_type
+        self.name = name
+        self.group = group
+        self.source = source
+        self.dest = dest
+        self.delivered = 0
+
+    def __repr__(self):
+        filters = {field: getattr(self, field) for field in ('device_type', 'name', 'group', 'source', 'dest')}
+        return 'Subscription({})'.format(', '.join(f'{k}={v!r}' for k, v in filters.items() if v is not None))
+
+
+class SubscriptionIndex:
+    """
+    Assinaturas de mudanças de estado no nível da casa, filtradas por tipo, nome ou
+    grupo do dispositivo e por estado de origem e destino (e.g., "fechaduras que
+    passaram a 'unlocked'").
+
+    As assinaturas ficam em um índice de dois níveis: (tipo, escopo) -> (origem,
+    destino) -> assinaturas, em que o escopo é o nome do dispositivo, um grupo ou
+    nenhum. Uma mudança consulta apenas as chaves que podem casar com ela (no máximo 4
+    por escopo do dispositivo), de modo que o custo por mudança não depende do número
+    de assinaturas, e só as assinaturas que casam são chamadas.
+    """
+    def __init__(self, home, groups=None):
+        """
+        Inicializa o índice e o registra como ouvinte da casa.
+
+        :param home: Instância de SmartHome.
+        :param groups: GroupTree da casa, necessária para assinaturas por grupo.
+        """
+        self.home = home
+        self.groups = groups
+        self.subscriptions = {}
+        self._index = {}
+        self._by_group = 0
+        self._ids = count(1)
+        home.add_listener(self.on_change)
+
+    def close(self):
+        """
+        Desliga o índice da casa.
+        """
+        self.home.remove_listener(self.on_change)
+
+    def __len__(self):
+        """
+        :return: Número de assinaturas.
+        """
+        return len(self.subscriptions)
+
+    def subscribe(self, callback, device_type=None, name=None, group=None, source=None, dest=None):
+        """
+        Cria uma assinatura.
+
+        Inclusões (origem None) e remoções (destino None) de dispositivos só casam com
+        assinaturas sem filtro de origem ou de destino, respectivamente.
+
+        :param callback: Função que recebe o ChangeEvent, ou objeto com `on_events(events)` (e.g., Observer).
+        :param device_type: Tipo do dispositivo (e.g., 'door_lock').
+        :param name: Nome do dispositivo.
+        :param group: Nome de um grupo da GroupTree; casa com os dispositivos do grupo e dos seus subgrupos.
+        :param source: Estado de origem.
+        :param dest: Estado de destino.
+        :return: A Subscription criada.
+        :raises ValueError: Se um tipo ou estado for desconhecido, ou se `name` e `group` forem informados juntos.
+        :raises KeyError: Se o grupo não existir.
+        """
+        if name is not None and group is not None:
+            raise ValueError("A subscription filters by device name or by group, not both")
+        if device_type is not None:
+            device_class = DEVICE_TYPES.get(device_type)
+            if device_class is None:
+                raise ValueError(f"Unknown device type: {device_type}")
+            states = device_class.states
+        else:
+            states = {state for device_class in DEVICE_TYPES.values() for state in device_class.states}
+        for state in (source, dest):
+            if state is not None and state not in states:
+                raise ValueError(f"Unknown state: {state}")
+        if group is not None:
+            if self.groups is None:
+                raise ValueError("Group subscriptions require a GroupTree")
+            self.groups.get(group)
+            self._by_group += 1
+        if not callable(callback):
+            on_events = callback.on_events
+            callback = lambda event: on_events([event])
+        subscription = Subscription(next(self._ids), callback, device_type, name, group, source, dest)
+        self._index.setdefault(self._scope_key(subscription), {}).setdefault((source, dest), {})[
+            subscription.id] = subscription
+        self.subscriptions[subscription.id] = subscription
+        return subscription
+
+    @staticmethod
+    def _scope_key(subscription):
+        """
+        Chave do primeiro nível do índice: (tipo, escopo).
+        """
+        if subscription.name is not None:
+            scope = ('name', subscription.name)
+        elif subscription.group is not None:
+            scope = ('group', subscription.group)
+        else:
+            scope = None
+        return subscription.device_type, scope
+
+    def unsubscribe(self, subscription):
+        """
+        Remove uma assinatura.
+
+        :param subscription: Subscription devolvida por `subscribe`.
+        :raises KeyError: Se a assinatura não existir.
+        """
+        del self.subscriptions[subscription.id]
+        scope_key = self._scope_key(subscription)
+        by_state = self._index[scope_key]
+        state_key = (subscription.source, subscription.dest)
+        subscriptions = by_state[state_key]
+        del subscriptions[subscription.id]
+        if not subscriptions:
+            del by_state[state_key]
+            if not by_state:
+                del self._index[scope_key]
+        if subscription.group is not None:
+            self._by_group -= 1
+
+    def matching(self, event):
+        """
+        :param event: ChangeEvent.
+        :return: Lista das assinaturas que casam com o evento, na ordem de entrega.
+        """
+        index = self._index
+        if not index:
+            return []
+        scopes = [None, ('name', event.name)]
+        if self._by_group:
+            scopes.extend(('group', group.name) for group in self.groups.groups_of(event.name))
+        source, dest = event.source, event.dest
+        state_keys = [(None, None)]
+        if source is not None:
+            state_keys.append((source, None))
+        if dest is not None:
+            state_keys.append((None, dest))
+            if source is not None:
+                state_keys.append((source, dest))
+        matches = []
+        for device_type in (None, event.device_type):
+            for scope in scopes:
+                by_state = index.get((device_type, scope))
+                if by_state:
+                    for state_key in state_keys:
+                        subscriptions = by_state.get(state_key)
+                        if subscriptions:
+                            matches.extend(subscriptions.values())
+        return matches
+
+    def on_change(self, event):
+        """
+        Entrega um ChangeEvent da casa às assinaturas que casam com ele.
+
+        :param event: Evento de mudança.
+        """
+        if self._index:
+            for subscription in self.matching(event):
+                subscription.delivered += 1
+                subscription.callback(event)
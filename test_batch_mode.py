@@ -0,0 +1,63 @@
+import io
+import json
+from smart_home import SmartHome
+from batch_mode import CommandRunner
+
+def test_batch_mode():
+    """
+    Testa a execução não interativa de comandos em texto e em JSON.
+    """
+    runner = CommandRunner(SmartHome(max_devices=3))
+    script = io.StringIO("""# comentário
+add light kitchen
+add thermostat
+{"op": "trigger", "name": "kitchen", "trigger": "turn_on"}
+trigger device_1 lock
+broadcast thermostat heat
+
+count_active
+{"op": "list", "type": "light"}
+remove nowhere
+""")
+    out = io.StringIO()
+    assert runner.run(script, out) == (8, 2)
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['ok'] for r in results] == [True, True, True, False, True, True, True, False]
+    assert results[1]['result'] == 'device_1'
+    assert results[2]['result'] == 'on'
+    assert results[4]['result'] == 1
+    assert results[5]['result'] == 2
+    assert results[6]['result'] == ['kitchen: Light is on']
+    assert runner.run_line('status kitchen') == '{"ok":true,"result":"Light is on"}'
+    assert runner.run_line('stats') == '{"ok":false,"error":"Metrics are disabled"}'
+    assert json.loads(runner.run_line('changes 3'))['result'] == {
+        'version': 4, 'resync': False, 'changes': [{'name': 'device_1', 'device_type': 'thermostat', 'state': 'heating'}]}
+
+def test_batch_mode_json_pagination():
+    """
+    Testa a paginação em JSON com campos omitidos, que assumem o valor padrão.
+    """
+    runner = CommandRunner(SmartHome(max_devices=5))
+    for name in ('a', 'b', 'c'):
+        runner.run_line(f'add light {name}')
+    runner.run_line('add thermostat d')
+    run = lambda line: json.loads(runner.run_line(line))['result']
+    assert run('{"op": "list", "limit": 1}') == ['a: Light is off']
+    assert run('{"op": "list", "offset": 1, "limit": 2}') == ['b: Light is off', 'c: Light is off']
+    assert run('{"op": "list", "type": "light", "offset": 2}') == ['c: Light is off']
+    assert run('{"op": "list", "offset": 3}') == ['d: Thermostat is off']
+    assert run('{"op": "changes"}')['version'] == 4
+    assert json.loads(runner.run_line('{"op": "trigger", "trigger": "turn_on"}'))['ok'] is False
+    assert runner.run_line('list * x') == '{"ok":false,"error":"Invalid offset: x"}'
+    assert runner.run_line('{"op": "changes", "since": "later"}') == '{"ok":false,"error":"Invalid since: later"}'
+
+    # JSON com espaços à esquerda: o modo script e run_line aceitam a mesma entrada
+    out = io.StringIO()
+    assert runner.run(io.StringIO('  {"op": "list", "limit": 1}\n'), out) == (1, 0)
+    assert json.loads(out.getvalue())['result'] == ['a: Light is off']
+    assert json.loads(runner.run_line('  {"op": "list", "limit": 1}'))['result'] == ['a: Light is off']
+
+if __name__ == "__main__":
+    test_batch_mode()
+    test_batch_mode_json_pagination()
+    print("Todos os testes passaram!")
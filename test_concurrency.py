@@ -0,0 +1,192 @@
+import random
+import sys
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from transitions import MachineError
+from device import DoorLock, Light, Thermostat
+from persistence import HomeStore
+from smart_home import SmartHome
+
+KINDS = (Light, Thermostat, DoorLock)
+
+def _check_indexes(home):
+    """
+    Compara os índices da casa com uma recontagem feita a partir dos estados dos dispositivos.
+    """
+    active = {name for name, device in home.devices.items() if device.state != 'off'}
+    assert home.count_active_devices() == len(active)
+    assert {device._name for device in home.get_active_devices()} == active
+    for device_class in KINDS:
+        for state in device_class.states:
+            expected = {name for name, device in home.devices.items()
+                        if type(device) is device_class and device.state == state}
+            assert {name for name, _ in home.get_devices(device_class.device_type, state)} == expected
+
+def _stress(columnar):
+    """
+    Aciona a mesma frota por várias threads, com inclusões, remoções, lotes e consultas simultâneos.
+    """
+    home = SmartHome(max_devices=1000, columnar=columnar)
+    home.add_devices((f'device_{i}', KINDS[i % 3]()) for i in range(300))
+    events = defaultdict(list)
+    home.add_listener(lambda event: events[event.name].append(event))
+    fired = []
+    stop = threading.Event()
+
+    def trigger_worker(seed):
+        rng = random.Random(seed)
+        count = 0
+        for _ in range(3000):
+            device = home.devices.get(f'device_{rng.randrange(300)}')
+            try:
+                device._fire(rng.choice(sorted(device._table)))
+                count += 1
+            except MachineError:
+                pass
+        fired.append(count)
+
+    def batch_worker(seed):
+        rng = random.Random(seed)
+        count = 0
+        for _ in range(100):
+            if rng.random() < 0.5:
+                count += len(home.broadcast('light', rng.choice(['turn_on', 'turn_off'])))
+            else:
+                lights = [f'device_{3 * rng.randrange(100)}' for _ in range(20)]
+                count += len(home.apply_batch([(name, 'turn_off') for name in lights], strict=False))
+        fired.append(count)
+
+    def churn_worker(seed):
+        for i in range(300):
+            name = f'churn_{seed}_{i}'
+            home.add_device(name, Thermostat())
+            home.devices[name].heat()
+            home.remove_device(name)
+
+    def scan_worker():
+        while not stop.is_set():
+            statuses = list(home.iter_statuses())
+            assert len(statuses) >= 300
+            assert home.count_active_devices() <= len(home.devices)
+            home.get_devices('thermostat', 'heating')
+
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            scanners = [pool.submit(scan_worker) for _ in range(2)]
+            work = [pool.submit(trigger_worker, seed) for seed in range(6)]
+            work += [pool.submit(batch_worker, seed) for seed in range(2)]
+            work += [pool.submit(churn_worker, seed) for seed in range(2)]
+            try:
+                for future in work:
+                    future.result()
+            finally:
+                stop.set()
+            for future in scanners:
+                future.result()
+    finally:
+        sys.setswitchinterval(switch)
+
+    assert len(home.devices) == 300
+    _check_indexes(home)
+    transitions = 0
+    for name, device_events in events.items():
+        # Os eventos de cada dispositivo formam uma cadeia: cada um parte do destino do anterior.
+        for previous, event in zip(device_events, device_events[1:]):
+            assert event.source == previous.dest
+        if name.startswith('churn_'):
+            assert [(e.source, e.dest) for e in device_events] == [(None, 'off'), ('off', 'heating'), ('heating', None)]
+        else:
+            assert device_events[-1].dest == home.devices[name].state
+            transitions += len(device_events)
+    assert transitions == sum(fired)
+
+def test_concurrent_triggers():
+    """
+    Testa a casa com índices por dicionário sob acesso concorrente.
+    """
+    _stress(columnar=False)
+
+def test_concurrent_triggers_columnar():
+    """
+    Testa a casa colunar sob acesso concorrente, incluindo difusões em massa.
+    """
+    _stress(columnar=True)
+
+def test_concurrent_name_reuse():
+    """
+    Testa remoções e reinclusões concorrentes dos mesmos nomes com dispositivos diferentes
+    (em travas listradas diferentes): os eventos de cada nome chegam em ordem e o diário,
+    com snapshots frequentes, restaura a mesma casa.
+    """
+    directory = tempfile.mkdtemp()
+    store = HomeStore(directory, sync='none', snapshot_every=50)
+    home = store.open(max_devices=100)
+    events = defaultdict(list)
+    home.add_listener(lambda event: events[event.name].append(event))
+    names = [f'shared_{i}' for i in range(8)]
+
+    def reuse_worker(seed):
+        rng = random.Random(seed)
+        for _ in range(1500):
+            name = rng.choice(names)
+            try:
+                if rng.random() < 0.5:
+                    home.add_device(name, rng.choice(KINDS)())
+                else:
+                    home.remove_device(name)
+            except (KeyError, ValueError):
+                pass
+            device = home.devices.get(name)
+            if device is not None and device.device_type == 'thermostat':
+                try:
+                    device.heat()
+                except (MachineError, AttributeError):
+                    pass
+
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            for future in [pool.submit(reuse_worker, seed) for seed in range(6)]:
+                future.result()
+    finally:
+        sys.setswitchinterval(switch)
+
+    for name, name_events in events.items():
+        for previous, event in zip(name_events, name_events[1:]):
+            assert event.source == previous.dest
+            if previous.source is None:
+                assert event.device_type == previous.device_type
+        if name in home.devices:
+            assert name_events[-1].dest == home.devices[name].state
+        else:
+            assert name_events[-1].dest is None
+    _check_indexes(home)
+    expected = {name: (device.device_type, device.state) for name, device in home.devices.items()}
+    store.close()
+    restored = HomeStore(directory).open()
+    assert {name: (device.device_type, device.state) for name, device in restored.devices.items()} == expected
+
+def test_lock_for():
+    """
+    Testa que a trava de um dispositivo é estável e reentrante.
+    """
+    home = SmartHome(max_devices=2)
+    light = Light()
+    home.add_device('light', light)
+    lock = home.lock_for(light)
+    assert lock is home.lock_for(light)
+    with lock:
+        light.turn_on()
+    assert home.count_active_devices() == 1
+
+if __name__ == "__main__":
+    test_concurrent_triggers()
+    test_concurrent_triggers_columnar()
+    test_concurrent_name_reuse()
+    test_lock_for()
+    print("Todos os testes passaram!")
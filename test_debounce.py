@@ -0,0 +1,126 @@
+import time
+from debounce import Debouncer
+from device import DoorLock, Light, Thermostat
+from observer import Observer
+from smart_home import SmartHome
+
+class FakeClock:
+    """
+    Relógio controlado manualmente pelos testes.
+    """
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_debounce_listener():
+    """
+    Testa a fusão de rajadas, o cancelamento de mudanças que se anulam e as janelas por tipo e por dispositivo.
+    """
+    clock = FakeClock()
+    home = SmartHome(max_devices=5)
+    light, thermostat, lock = Light(), Thermostat(), DoorLock()
+    home.add_device('hall', light)
+    home.add_device('living', thermostat)
+    home.add_device('front', lock)
+    debouncer = Debouncer({'light': 1.0, 'thermostat': 2.0, 'front': 0}, clock=clock)
+    received = []
+    debouncer.subscribe(received.extend)
+    home.add_listener(debouncer)
+
+    thermostat.heat()
+    for _ in range(10):
+        light.turn_on()
+        light.turn_off()
+        thermostat.cool()
+        thermostat.heat()
+    lock.unlock()
+    assert [(c.name, c.source, c.dest, c.count) for c in received] == [('front', 'locked', 'unlocked', 1)]
+    assert len(debouncer) == 2 and debouncer.next_due() == 1.0
+
+    clock.now = 1.0
+    assert debouncer.poll() == 0 and debouncer.cancelled == 1
+    clock.now = 1.5
+    light.turn_on()
+    clock.now = 2.0
+    assert debouncer.poll() == 1
+    assert (received[-1].name, received[-1].source, received[-1].dest, received[-1].count) == \
+        ('living', 'off', 'heating', 21)
+    assert debouncer.flush() == 1 and received[-1].dest == 'on'
+    assert debouncer.received == 43 and debouncer.delivered == 3 and len(debouncer) == 0
+
+    # Inclusão seguida de remoção dentro da janela não produz mudança.
+    home.add_device('spare', Light())
+    home.remove_device('spare')
+    assert debouncer.flush() == 0
+
+def test_debounce_observer():
+    """
+    Testa o debouncer como observador de dispositivos, alimentando um Observer.
+    """
+    clock = FakeClock()
+    debouncer = Debouncer(default=0.5, clock=clock)
+    observer = Observer(verbose=False)
+    debouncer.subscribe(observer)
+    home = SmartHome(max_devices=2)
+    light = Light()
+    light.add_observer(debouncer)
+    home.add_device('porch', light)
+    for trigger in ('turn_on', 'turn_off', 'turn_on'):
+        getattr(light, trigger)()
+        light.notify_observers()
+    clock.now = 0.5
+    debouncer.poll()
+    assert [(r.name, r.source, r.dest) for r in observer.since(0)] == [('porch', None, 'on')]
+    light.turn_off()
+    home.broadcast('light', 'turn_on')
+    clock.now = 1.0
+    debouncer.poll()
+    assert debouncer.cancelled == 1 and len(observer) == 1
+
+def test_debounce_unnamed_devices():
+    """
+    Testa que dispositivos sem nome não ficam presos no debouncer depois da entrega.
+    """
+    clock = FakeClock()
+    debouncer = Debouncer({'light': 1.0}, clock=clock)
+    received = []
+    debouncer.subscribe(received.extend)
+    for _ in range(50):
+        light = Light()
+        light.add_observer(debouncer)
+        light.turn_on()
+        light.notify_observers()
+    assert not any(isinstance(key, Light) for key in debouncer._last)
+    clock.now = 1.0
+    assert debouncer.poll() == 50 and not debouncer._last and not len(debouncer)
+    assert {(c.name, c.source, c.dest) for c in received} == {(None, None, 'on')}
+
+def test_debounce_thread():
+    """
+    Testa a entrega pela thread quando as janelas vencem.
+    """
+    received = []
+    home = SmartHome(max_devices=1)
+    light = Light()
+    home.add_device('desk', light)
+    with Debouncer({'light': 0.05}) as debouncer:
+        debouncer.subscribe(received.extend)
+        home.add_listener(debouncer)
+        light.turn_on()
+        light.turn_off()
+        light.turn_on()
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [(c.source, c.dest, c.count) for c in received] == [('off', 'on', 3)]
+        light.turn_off()
+    assert received[-1].dest == 'off'
+
+if __name__ == "__main__":
+    test_debounce_listener()
+    test_debounce_observer()
+    test_debounce_unnamed_devices()
+    test_debounce_thread()
+    print("Todos os testes passaram!")
@@ -0,0 +1,52 @@
+from device import Device, Light
+from device_factory import DeviceFactory
+from smart_home import SmartHome
+
+class SmartPlug(Device):
+    """
+    Dispositivo de plugin usado nos testes do registro.
+    """
+    __slots__ = ()
+
+    label = 'Smart Plug'
+    states = ['off', 'on']
+    initial = 'off'
+    transitions = [
+        {'trigger': 'plug_on', 'source': 'off', 'dest': 'on'},
+        {'trigger': 'plug_off', 'source': 'on', 'dest': 'off'},
+    ]
+
+    def get_status(self):
+        return self.format_status(self.state)
+
+def test_device_factory_registry():
+    """
+    Testa o registro de tipos, a consulta de classes e a criação em massa.
+    """
+    factory = DeviceFactory()
+    assert factory.get_class('light') is Light
+    assert factory.device_types()[:5] == ['light', 'thermostat', 'security', 'air_conditioner', 'door_lock']
+    try:
+        factory.create_device('toaster')
+        assert False, "Era esperado ValueError"
+    except ValueError as e:
+        assert str(e) == 'Unknown device type: toaster'
+
+    DeviceFactory.register('smart_plug', SmartPlug)
+    try:
+        DeviceFactory.register('light', SmartPlug)
+        assert False, "Era esperado ValueError"
+    except ValueError:
+        pass
+    plugs = factory.create_devices('smart_plug', 1000)
+    assert len(plugs) == 1000 and len(set(map(id, plugs))) == 1000
+    assert plugs[0].state == 'off'
+
+    home = SmartHome(max_devices=1000)
+    home.add_devices((f'plug_{i}', plug) for i, plug in enumerate(plugs))
+    plugs[1].plug_on()
+    assert home.get_all_status('smart_plug').split('\n')[1] == 'plug_1: Smart Plug is on'
+    assert home.count_active_devices() == 1
+
+if __name__ == "__main__":
+    test_device_factory_registry()
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+from device import DEVICE_TYPES
+
+def test_schema_matches_machine():
+    """
+    Verifica que a tabela pré-compilada de cada classe coincide com a máquina da biblioteca transitions.
+    """
+    for device_class in DEVICE_TYPES.values():
+        machine = device_class.machine
+        expected = {trigger: {source: moves[0].dest for source, moves in event.transitions.items()}
+                    for trigger, event in machine.events.items()}
+        assert device_class._table == expected
+        assert device_class().machine is machine
+
+def test_transition_table_queries():
+    """
+    Verifica as consultas sem exceção (gatilhos válidos, can_trigger, next_state) contra a máquina.
+    """
+    for device_class in DEVICE_TYPES.values():
+        machine = device_class.machine
+        device = device_class()
+        for state in device_class.states:
+            assert set(device_class.triggers_from(state)) == set(machine.get_triggers(state))
+            device.state = state
+            assert device.valid_triggers() == device_class.triggers_from(state)
+            for trigger in device_class.triggers + ('heat', 'explode'):
+                event = machine.events.get(trigger)
+                moves = event.transitions.get(state) if event is not None else None
+                assert device.can_trigger(trigger) == bool(moves)
+                assert device.next_state(trigger) == (moves[0].dest if moves else None)
+    assert 'heat' not in DEVICE_TYPES['air_conditioner'].triggers
+
+def test_lazy_transitions_import():
+    """
+    Verifica que importar a casa e criar/acionar dispositivos não carrega a biblioteca transitions.
+    """
+    code = ("import sys, smart_home; home = smart_home.SmartHome(); light = smart_home.Light(); "
+            "home.add_device('l', light); light.turn_on(); print('transitions' in sys.modules)")
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == 'False'
+
+if __name__ == "__main__":
+    test_schema_matches_machine()
+    test_transition_table_queries()
+    test_lazy_transitions_import()
+    print("Todos os testes passaram!")
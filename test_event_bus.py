@@ -0,0 +1,84 @@
+from event_bus import ChangeEvent, EventBus
+from smart_home import SmartHome
+from device import Light, Thermostat
+from observer import Observer
+
+def test_event_bus_policies():
+    """
+    Testa as políticas de contrapressão do barramento de eventos.
+    """
+    events = [ChangeEvent('light', 'light', 'off', 'on', 0.0),
+              ChangeEvent('light', 'light', 'on', 'off', 1.0),
+              ChangeEvent('thermostat', 'thermostat', 'off', 'heating', 2.0)]
+
+    bus = EventBus(maxsize=2, policy='drop_oldest')
+    received = []
+    bus.subscribe(received.extend)
+    for event in events:
+        bus.publish(event)
+    assert bus.dispatch_pending() == 2
+    assert received == events[1:] and bus.dropped == 1
+
+    bus = EventBus(maxsize=2, policy='coalesce')
+    received = []
+    bus.subscribe(received.extend)
+    for event in events:
+        bus.publish(event)
+    bus.dispatch_pending()
+    assert [(e.name, e.source, e.dest) for e in received] == [('light', 'off', 'off'), ('thermostat', 'off', 'heating')]
+    assert bus.dropped == 0
+
+    # Cheia, a política 'coalesce' não descarta o estado final de nenhum dispositivo
+    bus = EventBus(maxsize=1, policy='coalesce')
+    received = []
+    bus.subscribe(received.extend)
+    for event in events:
+        bus.publish(event)
+    assert bus.dispatch_pending() == 2 and bus.dropped == 0
+    assert [(e.name, e.dest) for e in received] == [('light', 'off'), ('thermostat', 'heating')]
+
+def test_event_bus_consumer_errors():
+    """
+    Testa que uma exceção em um consumidor não interrompe a thread de trabalho.
+    """
+    received = []
+
+    def failing(batch):
+        raise ValueError("consumer failed")
+
+    with EventBus(maxsize=2, policy='block', batch_size=1) as bus:
+        bus.subscribe(failing)
+        bus.subscribe(received.extend)
+        for i in range(10):
+            bus.publish(ChangeEvent(f'light_{i}', 'light', 'off', 'on', float(i)))
+        assert bus.flush(timeout=5)
+    assert len(received) == 10 and bus.delivered == 10
+    assert bus.errors == 10 and isinstance(bus.last_error, ValueError)
+
+def test_event_bus_with_smarthome():
+    """
+    Testa a entrega assíncrona, em lotes, das transições da casa inteligente.
+    """
+    smarthome = SmartHome(max_devices=3)
+    observer = Observer()
+    with EventBus(maxsize=16, policy='block', batch_size=4) as bus:
+        bus.subscribe(observer)
+        smarthome.add_listener(bus)
+        light, thermostat = Light(), Thermostat()
+        smarthome.add_device('light', light)
+        smarthome.add_device('thermostat', thermostat)
+        for _ in range(5):
+            light.turn_on()
+            light.turn_off()
+        thermostat.cool()
+        smarthome.remove_device('thermostat')
+        assert bus.flush(timeout=5)
+    assert bus.delivered == 14
+    assert observer.notifications[0] == 'Light is off'
+    assert observer.notifications[-1] == 'Thermostat is cooling'
+
+if __name__ == "__main__":
+    test_event_bus_policies()
+    test_event_bus_consumer_errors()
+    test_event_bus_with_smarthome()
+    print("Todos os testes passaram!")
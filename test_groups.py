@@ -0,0 +1,97 @@
+import random
+from device import DoorLock, Light, Thermostat
+from groups import GroupTree
+from smart_home import SmartHome
+
+def _recount(tree, group_name):
+    """
+    Recalcula do zero o resumo de um grupo, para comparar com os agregados incrementais.
+    """
+    devices = [tree.home.devices[name] for name in tree.device_names(group_name)]
+    states = {}
+    for device in devices:
+        by_type = states.setdefault(device.device_type, {})
+        by_type[device.state] = by_type.get(device.state, 0) + 1
+    return {'name': group_name, 'kind': tree.get(group_name).kind, 'total': len(devices),
+            'active': sum(device.state != 'off' for device in devices), 'states': states}
+
+def test_groups():
+    """
+    Testa agregados, comandos de grupo e grupos sobrepostos.
+    """
+    home = SmartHome(max_devices=10)
+    home.add_device('hall_light', Light())
+    tree = GroupTree(home)
+    tree.add_group('ground', 'floor')
+    tree.add_group('kitchen', 'room', parent='ground')
+    tree.add_group('entrance', 'room', parent='ground')
+    tree.add_group('night', parent='kitchen')
+    home.add_device('kitchen_light', Light())
+    home.add_device('front', DoorLock())
+    home.add_device('back', DoorLock())
+    tree.assign('kitchen_light', 'kitchen')
+    tree.assign('kitchen_light', 'night')
+    tree.assign('front', 'entrance')
+    tree.assign('back', 'kitchen')
+    tree.assign('hall_light', 'entrance')
+
+    ground = tree.get('ground')
+    assert ground.total == 4 and tree.root.total == 4
+    assert ground.all_in('door_lock', 'locked') and ground.any_active()
+    home.devices['front'].unlock()
+    assert not ground.all_in('door_lock', 'locked')
+    assert tree.get('kitchen').all_in('door_lock', 'locked')
+
+    changed = tree.apply('kitchen', 'turn_on')
+    assert [device._name for device in changed] == ['kitchen_light']
+    assert tree.get('night').count('light', 'on') == 1 and ground.count('light', 'on') == 1
+    tree.apply('ground', 'lock', device_type='door_lock')
+    assert ground.all_in('door_lock', 'locked')
+
+    tree.unassign('kitchen_light', 'night')
+    assert tree.get('kitchen').count('light') == 1 and tree.get('night').total == 0
+    home.remove_device('back')
+    assert tree.get('kitchen').count('door_lock') == 0 and tree.root.total == 3
+    tree.remove_group('kitchen')
+    assert ground.total == 2 and 'night' not in tree.groups
+    for name in ('ground', 'entrance', 'home'):
+        assert tree.get(name).summary() == _recount(tree, name)
+
+def test_groups_random():
+    """
+    Compara os agregados incrementais com uma recontagem após mudanças aleatórias.
+    """
+    rng = random.Random(5)
+    home = SmartHome(max_devices=200)
+    tree = GroupTree(home)
+    names = ['f0', 'f1', 'r0', 'r1', 'r2', 'g0']
+    tree.add_group('f0', 'floor')
+    tree.add_group('f1', 'floor')
+    tree.add_group('r0', 'room', parent='f0')
+    tree.add_group('r1', 'room', parent='f0')
+    tree.add_group('r2', 'room', parent='f1')
+    tree.add_group('g0', parent='r1')
+    for i in range(100):
+        home.add_device(f'd{i}', rng.choice([Light, Thermostat, DoorLock])())
+    for _ in range(2000):
+        name = f'd{rng.randrange(100)}'
+        device = home.devices.get(name)
+        choice = rng.random()
+        if choice < 0.2:
+            tree.assign(name, rng.choice(names))
+        elif choice < 0.3:
+            tree.unassign(name, rng.choice(names))
+        elif device is not None and choice < 0.9:
+            moves = [trigger for trigger, table in device._table.items() if device.state in table]
+            getattr(device, rng.choice(moves))()
+        elif device is not None:
+            home.remove_device(name)
+        else:
+            home.add_device(name, Light())
+    for name in ['home'] + names:
+        assert tree.get(name).summary() == _recount(tree, name)
+
+if __name__ == "__main__":
+    test_groups()
+    test_groups_random()
+    print("Todos os testes passaram!")
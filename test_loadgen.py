@@ -0,0 +1,37 @@
+import os
+import tempfile
+from loadgen import command_stream, fleet_commands, main, replay, run
+
+def test_loadgen():
+    """
+    Testa a geração determinística de frotas e fluxos e a execução com vários trabalhadores.
+    """
+    fleet = fleet_commands(50, {'light': 3, 'door_lock': 1}, seed=1)
+    assert fleet == fleet_commands(50, {'light': 3, 'door_lock': 1}, seed=1)
+    assert {line.split()[1] for line in fleet} == {'light', 'door_lock'}
+    stream = list(command_stream(fleet, 500, invalid=0.2, seed=2))
+    assert stream == list(command_stream(fleet, 500, invalid=0.2, seed=2))
+    assert any(line.endswith(' lock') and 'light_' in line for line in stream)
+
+    for mode in ('thread', 'process'):
+        result = run(fleet, 400, workers=2, mode=mode)
+        assert result['commands'] == 400 and 0 < result['errors'] < 400
+        assert result['latency_us']['p50'] <= result['latency_us']['p99'] <= result['max_us']
+
+def test_record_replay():
+    """
+    Testa que a reprodução de um fluxo gravado é determinística.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stream.txt')
+        main(['--size', '20', '--commands', '300', '--record', path])
+        first, second = replay(path), replay(path, rate=50000)
+        assert first['commands'] == second['commands'] == 300
+        assert first['digest'] == second['digest'] and first['errors'] == second['errors']
+        # A reprodução confere com a execução que gerou o fluxo
+        assert run(fleet_commands(20), 300)['digest'] == first['digest']
+
+if __name__ == "__main__":
+    test_loadgen()
+    test_record_replay()
+    print("Todos os testes passaram!")
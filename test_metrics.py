@@ -0,0 +1,63 @@
+import random
+import metrics
+from device import Device, Light
+from metrics import LatencyHistogram, Metrics
+from observer import Observer
+from smart_home import SmartHome
+
+def test_histogram():
+    """
+    Testa os percentis do histograma contra os valores exatos.
+    """
+    rng = random.Random(0)
+    values = [int(rng.lognormvariate(8, 2)) for _ in range(10000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = values[round(q * len(values)) - 1]
+        assert exact <= histogram.percentile(q) <= exact * 1.04
+    assert histogram.percentile(1.0) == histogram.max == values[-1]
+    other = LatencyHistogram()
+    other.merge(histogram)
+    assert other.count == 10000 and other.percentile(0.5) == histogram.percentile(0.5)
+
+def test_metrics():
+    """
+    Testa a coleta de medições e a restauração dos métodos originais.
+    """
+    original = Device._fire
+    registry = metrics.enable(Metrics())
+    try:
+        home = SmartHome(max_devices=3)
+        light = Light()
+        light.add_observer(Observer(verbose=False))
+        home.add_device('kitchen', light)
+        light.turn_on()
+        light.notify_observers()
+        try:
+            light.turn_on()
+        except Exception:
+            pass
+        home.control_lights('turn_off')
+        home.count_active_devices()
+        assert light.get_status() == 'Light is off'
+    finally:
+        metrics.disable()
+    assert Device._fire is original and not metrics.is_enabled()
+    rows = {(row['category'], row['device_type'], row['name']): row for row in registry.snapshot()}
+    assert rows['trigger', 'light', 'turn_on']['count'] == 2
+    assert rows['trigger', 'light', 'turn_on']['errors'] == 1
+    assert rows['trigger', 'light', 'turn_off']['count'] == 1
+    assert rows['observer', 'light', 'Observer']['count'] == 1
+    assert rows['observer', '', 'Observer']['count'] == 1
+    assert rows['status', 'light', 'off']['count'] == 1
+    assert rows['query', '', 'broadcast']['count'] == 1
+    assert rows['query', '', 'count_active_devices']['count'] == 1
+    assert len(registry.format()) == len(rows) + 1
+
+if __name__ == "__main__":
+    test_histogram()
+    test_metrics()
+    print("Todos os testes passaram!")
@@ -0,0 +1,53 @@
+from device import Light, Thermostat, DoorLock
+from observer import NO_STATE, Observer
+
+def test_observer_history():
+    """
+    Testa o histórico circular de notificações do observador.
+    """
+    observer = Observer(capacity=4, verbose=False)
+    light, thermostat, door_lock = Light(), Thermostat(), DoorLock()
+
+    light.turn_on()
+    observer.update(light)
+    thermostat.heat()
+    observer.update(thermostat)
+    assert observer.notifications == ['Light is on', 'Thermostat is heating']
+    assert observer.last(1)[0].dest == 'heating'
+
+    for _ in range(3):
+        door_lock.unlock()
+        observer.update(door_lock)
+        door_lock.lock()
+        observer.update(door_lock)
+
+    # Apenas as 4 notificações mais recentes são mantidas
+    assert len(observer) == 4 and observer.seq == 8
+    assert observer.notifications == ['Door Lock is unlocked', 'Door Lock is locked'] * 2
+    record = observer.since(7)[0]
+    assert (record.seq, record.device_type, record.source, record.dest) == (7, 'door_lock', 'unlocked', 'locked')
+    assert [r.seq for r in observer.since(0)] == [4, 5, 6, 7]
+    assert observer.last(0) == []
+
+def test_observer_key_table():
+    """
+    Testa que a tabela de dispositivos é limitada pelo histórico e não mantém objetos vivos.
+    """
+    observer = Observer(capacity=8, verbose=False)
+    for _ in range(100):
+        light = Light()
+        light.turn_on()
+        observer.update(light)
+    assert len(observer._key_ids) <= 9 and len(observer._keys) <= 9 and len(observer._last) <= 9
+    assert not any(isinstance(key, Light) for key in observer._keys)
+    assert all(record.name is None and record.dest == 'on' for record in observer.since(0))
+
+    for i in range(20):
+        observer.record(f'light_{i}', NO_STATE, Light._codes['on'])
+    assert [r.name for r in observer.last(2)] == ['light_18', 'light_19']
+    assert len(observer._key_ids) == 8
+
+if __name__ == "__main__":
+    test_observer_history()
+    test_observer_key_table()
+    print("Todos os testes passaram!")
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import time
+from device import Light, Thermostat, DoorLock
+from persistence import HomeStore
+from smart_home import SmartHome
+
+def _reopen(directory, **kwargs):
+    """
+    Simula o reinício do processo: descarta a casa atual e a restaura do disco.
+    """
+    store = HomeStore(directory, **kwargs)
+    return store, store.open(max_devices=1)
+
+def test_persistence():
+    """
+    Testa a restauração a partir de snapshot e diário.
+    """
+    directory = tempfile.mkdtemp()
+    store = HomeStore(directory, sync='always')
+    home = store.open(max_devices=5)
+    light, thermostat = Light(), Thermostat()
+    home.add_device('light', light)
+    home.add_device('thermostat', thermostat)
+    light.turn_on()
+    store.snapshot()
+    thermostat.heat()
+    home.add_device('door_lock', DoorLock())
+    home.remove_device('light')
+    store.close()
+
+    # Snapshot com a luz ligada + diário com o restante
+    store, home = _reopen(directory)
+    assert home.max_devices == 5
+    assert home.list_all_devices() == ['thermostat: Thermostat is heating', 'door_lock: Door Lock is locked']
+    assert home.count_active_devices() == 2
+    home.devices['door_lock'].unlock()
+    store.close(snapshot=True)
+
+    # Um registro final incompleto (queda durante a escrita) é ignorado
+    store, home = _reopen(directory, sync='none')
+    home.devices['door_lock'].lock()
+    store.close()
+    with open(store.journal_path, 'r+b') as journal:
+        journal.truncate(os.path.getsize(store.journal_path) - 2)
+    store, home = _reopen(directory)
+    assert home.get_device_status('door_lock') == 'Door Lock is unlocked'
+
+    # Um diário de geração anterior (queda logo após o snapshot) não é reaplicado
+    home.add_device('light', Light())
+    store.commit()
+    with open(store.journal_path, 'rb') as journal:
+        old_journal = journal.read()
+    store.snapshot()
+    with open(store.journal_path, 'wb') as journal:
+        journal.write(old_journal)
+    store.close()
+    store, home = _reopen(directory)
+    assert list(home.devices) == ['thermostat', 'door_lock', 'light']
+    store.close()
+
+def test_persistence_journal_limits():
+    """
+    Testa a gravação de um registro isolado no modo 'batch' e a restauração, sem snapshot,
+    de um diário com mais dispositivos que o limite informado.
+    """
+    directory = tempfile.mkdtemp()
+    store = HomeStore(directory, sync='batch', group_size=256, interval=0.02)
+    home = store.open(max_devices=5)
+    size = os.path.getsize(store.journal_path)
+    home.add_device('light', Light())
+    deadline = time.monotonic() + 5
+    while os.path.getsize(store.journal_path) == size and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert os.path.getsize(store.journal_path) > size
+    for i in range(4):
+        home.add_device(f'thermostat_{i}', Thermostat())
+    store.close()
+
+    store, home = _reopen(directory)
+    assert len(home.devices) == 5 and home.max_devices == 5
+    store.close()
+
+def test_persistence_snapshot_race():
+    """
+    Testa a restauração quando uma transição é gravada no diário depois de um snapshot
+    que já contém o seu resultado.
+    """
+    directory = tempfile.mkdtemp()
+    home = SmartHome(max_devices=2)
+    paused, resume = threading.Event(), threading.Event()
+
+    def pause(event):
+        # Ouvinte registrado antes do diário: segura a transição antes de ela ser gravada
+        if event.dest == 'off' and event.source == 'on':
+            paused.set()
+            resume.wait(5)
+
+    home.add_listener(pause)
+    store = HomeStore(directory, sync='always')
+    store.open(home)
+    light = Light()
+    home.add_device('porch', light)
+    light.turn_on()
+    worker = threading.Thread(target=light.turn_off)
+    worker.start()
+    assert paused.wait(5)
+    store.snapshot()
+    resume.set()
+    worker.join()
+    store.close()
+
+    store, home = _reopen(directory)
+    assert home.get_device_status('porch') == 'Light is off' and home.count_active_devices() == 0
+    store.close()
+
+if __name__ == "__main__":
+    test_persistence()
+    test_persistence_journal_limits()
+    test_persistence_snapshot_race()
+    print("Todos os testes passaram!")
@@ -0,0 +1,72 @@
+from device import DoorLock, Light, SecuritySystem
+from rules import RuleEngine
+from smart_home import SmartHome
+
+def test_rules():
+    """
+    Testa o disparo de regras com condições, ações em cadeia e remoção de regras.
+    """
+    home = SmartHome(max_devices=10)
+    alarm = SecuritySystem()
+    door = DoorLock()
+    siren = Light()
+    porch = Light()
+    home.add_device('alarm', alarm)
+    home.add_device('front', door)
+    home.add_device('siren', siren)
+    engine = RuleEngine(home)
+    events = []
+    intrusion = engine.add_rule(when=('door_lock', 'unlocked'), conditions=[('security', 'armed_away')],
+                                actions=[('siren', 'turn_on'), events.append], name='intrusion')
+    engine.add_rule(when=('light', 'on', 'siren'), actions=[('porch', 'turn_on')])
+
+    door.unlock()
+    assert siren.state == 'off' and intrusion.fired == 0
+    door.lock()
+    alarm.arm_away()
+    door.unlock()
+    assert intrusion.fired == 1 and events[0].name == 'front'
+    assert siren.state == 'on'
+
+    # A regra em cadeia só casa quando 'porch' existe
+    siren.turn_off()
+    home.add_device('porch', porch)
+    door.lock()
+    door.unlock()
+    assert siren.state == 'on' and porch.state == 'on'
+
+    alarm.disarm()
+    siren.turn_off()
+    door.lock()
+    door.unlock()
+    assert intrusion.fired == 2 and siren.state == 'off'
+
+    engine.remove_rule(intrusion)
+    alarm.arm_away()
+    door.lock()
+    door.unlock()
+    assert intrusion.fired == 2 and len(engine.rules) == 1
+
+def test_rules_scale():
+    """
+    Verifica que uma mudança só avalia as regras do seu evento, com dezenas de milhares de regras.
+    """
+    home = SmartHome(max_devices=10)
+    light = Light()
+    home.add_device('kitchen', light)
+    engine = RuleEngine(home)
+    fired = []
+    for i in range(20000):
+        engine.add_rule(when=('door_lock', 'unlocked', f'door_{i}'), actions=[fired.append],
+                        conditions=[('light', 'on')])
+    engine.add_rule(when=('light', 'on'), actions=[fired.append])
+    light.turn_on()
+    assert len(fired) == 1
+    assert all(rule.missing == 0 for rule in engine.rules.values())
+    light.turn_off()
+    assert all(rule.missing == 1 for rule in list(engine.rules.values())[:-1])
+
+if __name__ == "__main__":
+    test_rules()
+    test_rules_scale()
+    print("Todos os testes passaram!")
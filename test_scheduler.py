@@ -0,0 +1,111 @@
+import random
+from device import DoorLock, Light
+from scheduler import Scheduler
+from smart_home import SmartHome
+
+class FakeClock:
+    """
+    Relógio controlado manualmente pelos testes.
+    """
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_scheduler():
+    """
+    Testa ações únicas, recorrentes, por seletor e o cancelamento.
+    """
+    clock = FakeClock()
+    home = SmartHome(max_devices=5)
+    home.add_device('kitchen', Light())
+    home.add_device('hall', Light())
+    scheduler = Scheduler(home, clock=clock)
+    scheduler.after(10, 'kitchen', 'turn_on')
+    cancelled = scheduler.after(10, 'hall', 'turn_on')
+    scheduler.after(30, 'light', 'turn_off', broadcast=True)
+    blink = scheduler.after(100, 'hall', 'turn_on', every=1000)
+    assert scheduler.cancel(cancelled) and not scheduler.cancel(cancelled)
+    assert len(scheduler) == 3
+
+    clock.now = 9
+    assert scheduler.run_pending() == []
+    clock.now = 10
+    assert [timer.target for timer in scheduler.run_pending()] == ['kitchen']
+    assert home.get_device_status('kitchen') == 'Light is on'
+    assert home.get_device_status('hall') == 'Light is off'
+    clock.now = 100
+    scheduler.run_pending()
+    assert home.get_device_status('kitchen') == 'Light is off'
+    assert home.get_device_status('hall') == 'Light is on'
+    assert blink.active and blink.due == 1100 and len(scheduler) == 1
+    home.remove_device('hall')
+    clock.now = 5000
+    assert scheduler.run_pending() == [blink]
+    assert blink.due == 5100
+
+def test_scheduler_sub_tick():
+    """
+    Testa que um timer fora da fronteira de um tick não é executado antes do seu instante.
+    """
+    clock = FakeClock()
+    home = SmartHome(max_devices=1)
+    home.add_device('porch', Light())
+    scheduler = Scheduler(home, clock=clock, tick=1.0)
+    timer = scheduler.schedule(10.4, 'porch', 'turn_on')
+    for now in (10.0, 10.1, 10.39, 10.9):
+        clock.now = now
+        assert scheduler.run_pending() == [] and timer.active
+    clock.now = 11.0
+    assert scheduler.run_pending() == [timer]
+    assert home.get_device_status('porch') == 'Light is on'
+
+def test_scheduler_auto_trigger():
+    """
+    Testa o gatilho automático após um tempo em um estado.
+    """
+    clock = FakeClock(1000.0)
+    home = SmartHome(max_devices=5)
+    scheduler = Scheduler(home, clock=clock)
+    scheduler.auto_trigger('door_lock', 'unlocked', 300, 'lock')
+    door = DoorLock()
+    home.add_device('front', door)
+    door.unlock()
+    clock.now += 200
+    door.lock()
+    door.unlock()
+    clock.now += 299
+    scheduler.run_pending()
+    assert door.state == 'unlocked'
+    clock.now += 1
+    scheduler.run_pending()
+    assert door.state == 'locked' and len(scheduler) == 0
+
+def test_scheduler_many_timers():
+    """
+    Compara a ordem de execução da roda com uma ordenação direta, em vários níveis da roda.
+    """
+    clock = FakeClock()
+    home = SmartHome(max_devices=1)
+    scheduler = Scheduler(home, clock=clock, tick=0.5)
+    rng = random.Random(3)
+    timers = [scheduler.schedule(rng.choice([rng.uniform(0, 200), rng.uniform(0, 5e6)]), 'x', 'turn_on')
+              for _ in range(5000)]
+    for timer in timers[::7]:
+        scheduler.cancel(timer)
+    expected = sorted((timer for timer in timers if timer.active), key=lambda timer: timer.due)
+    fired = []
+    while len(scheduler):
+        clock.now += rng.uniform(0, 20000)
+        for timer in scheduler.run_pending():
+            assert timer.due <= clock.now
+            fired.append(timer)
+    assert fired == expected
+
+if __name__ == "__main__":
+    test_scheduler()
+    test_scheduler_sub_tick()
+    test_scheduler_auto_trigger()
+    test_scheduler_many_timers()
+    print("Todos os testes passaram!")
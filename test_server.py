@@ -0,0 +1,86 @@
+import asyncio
+import json
+from device import Light
+from server import MAX_SUBSCRIBER_BACKLOG, HomeServer, load_test
+from smart_home import SmartHome
+
+class FakeTransport:
+    """
+    Transporte em memória com tamanho de buffer de escrita controlado pelo teste.
+    """
+    def __init__(self):
+        self.lines = []
+        self.backlog = 0
+
+    def is_closing(self):
+        return False
+
+    def get_write_buffer_size(self):
+        return self.backlog
+
+    def write(self, data):
+        self.lines.append(json.loads(data))
+
+class FakeRunner:
+    """
+    Conexão assinante mínima, com apenas o transporte.
+    """
+    def __init__(self):
+        self.transport = FakeTransport()
+
+async def _session():
+    server = HomeServer(SmartHome(max_devices=100), port=0)
+    port = await server.start()
+    watcher_reader, watcher_writer = await asyncio.open_connection('127.0.0.1', port)
+    watcher_writer.write(b'subscribe light\n')
+    assert json.loads(await watcher_reader.readline()) == {'ok': True, 'result': 'subscribed'}
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    # Vários comandos enviados de uma vez (pipelining), inclusive em pedaços de linha
+    writer.write(b'add light kitchen\nadd door_lock front\n{"op": "trigger", "name": "kitchen", "trig')
+    await writer.drain()
+    writer.write(b'ger": "turn_on"}\ntrigger front unlock\nstatus kitchen\nsubscribe robot\n')
+    responses = [json.loads(await reader.readline()) for _ in range(6)]
+    assert [response.get('result') for response in responses[:5]] == \
+        ['kitchen', 'front', 'on', 'unlocked', 'Light is on']
+    assert not responses[5]['ok']
+
+    events = [json.loads(await watcher_reader.readline())['event'] for _ in range(2)]
+    assert [(event['name'], event['source'], event['dest']) for event in events] == \
+        [('kitchen', None, 'off'), ('kitchen', 'off', 'on')]
+
+    count, _, samples, errors = await load_test('127.0.0.1', port, connections=20, requests=40, pipeline=4)
+    assert count == len(samples) == 800 and errors == 0
+    for stream in (writer, watcher_writer):
+        stream.close()
+    await server.close()
+    assert len(server.home.devices) == 2
+
+def test_server():
+    """
+    Testa comandos em pipeline, assinaturas de eventos e o cliente de carga.
+    """
+    asyncio.run(_session())
+
+def test_server_slow_subscriber():
+    """
+    Testa que o cancelamento de um assinante lento é avisado por uma linha de evento, não de resposta.
+    """
+    home = SmartHome(max_devices=1)
+    server = HomeServer(home, port=0)
+    runner = FakeRunner()
+    server.subscribers[runner] = None
+    light = Light()
+    home.add_device('porch', light)
+    runner.transport.backlog = MAX_SUBSCRIBER_BACKLOG + 1
+    light.turn_on()
+    light.turn_off()
+    assert runner.transport.lines == [
+        {'event': {'name': 'porch', 'device_type': 'light', 'source': None, 'dest': 'off'}},
+        {'event': {'dropped': 'slow consumer'}}]
+    assert not server.subscribers
+
+if __name__ == "__main__":
+    test_server()
+    test_server_slow_subscriber()
+    print("Todos os testes passaram!")
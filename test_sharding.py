@@ -0,0 +1,35 @@
+from sharding import ShardedHomeManager
+from batch_mode import CommandError
+
+def test_sharded_homes():
+    """
+    Testa casas independentes distribuídas entre processos.
+    """
+    with ShardedHomeManager(shards=2) as manager:
+        homes = [f'home_{i}' for i in range(4)]
+        for home_id in homes:
+            manager.create_home(home_id, max_devices=3)
+
+        commands = []
+        for home_id in homes:
+            commands += [(home_id, 'add', ('light', 'lamp')), (home_id, 'trigger', ('lamp', 'turn_on'))]
+        commands.append(('home_0', 'add', ('door_lock', 'front')))
+        results = manager.execute_many(commands)
+        assert all(ok for ok, _ in results)
+        assert results[1] == (True, 'on')
+
+        # O mesmo nome de dispositivo existe em cada casa, sem conflito
+        assert manager.execute('home_2', 'status', 'lamp') == 'Light is on'
+        try:
+            manager.execute('home_2', 'trigger', 'lamp', 'lock')
+            assert False, "Era esperado CommandError"
+        except CommandError:
+            pass
+
+        total, per_home = manager.count_active()
+        assert total == 5 and per_home['home_0'] == 2
+        assert manager.list_statuses('door_lock') == {'home_0': ['front: Door Lock is locked'],
+                                                      'home_1': [], 'home_2': [], 'home_3': []}
+
+if __name__ == "__main__":
+    test_sharded_homes()
@@ -1,5 +1,6 @@
-from smart_home import SmartHome
+from smart_home import STATUS_CHUNK, SmartHome
 from device import Light, Thermostat, SecuritySystem, AirConditioner, DoorLock
+from observer import Observer
 
 def test_smarthome():
     """
@@ -82,5 +83,191 @@ def test_smarthome():
     print("All tests passed!")
 
 
+def test_smarthome_columnar():
+    """
+    Testa a casa inteligente com o armazenamento colunar de estados.
+    """
+    smarthome = SmartHome(max_devices=6, columnar=True)
+    light1, light2, thermostat, door_lock = Light(), Light(), Thermostat(), DoorLock()
+    smarthome.add_device('light1', light1)
+    smarthome.add_device('light2', light2)
+    smarthome.add_device('thermostat', thermostat)
+    smarthome.add_device('door_lock', door_lock)
+
+    # Os dispositivos continuam funcionando como visões sobre seus slots
+    light1.turn_on()
+    thermostat.heat()
+    assert smarthome.store.count([Light._codes['on']]) == 1
+    assert smarthome.get_device_status('light1') == 'Light is on'
+    assert smarthome.count_active_devices() == 3  # light1, thermostat e door_lock
+    assert smarthome.get_active_devices() == [light1, thermostat, door_lock]
+
+    smarthome.control_lights('turn_on')
+    assert light2.state == 'on'
+    assert smarthome.get_all_status('light') == 'light1: Light is on\nlight2: Light is on'
+    smarthome.control_lights('turn_off')
+    assert smarthome.count_active_devices() == 2
+
+    # Ao remover, o dispositivo volta a guardar o próprio estado e o slot é reaproveitado
+    smarthome.remove_device('thermostat')
+    assert thermostat.state == 'heating'
+    smarthome.add_device('air_conditioner', AirConditioner())
+    assert smarthome.get_all_status('air_conditioner') == 'air_conditioner: Air Conditioner is off'
+
+
+def test_smarthome_indexes():
+    """
+    Testa os índices por tipo, por estado e de dispositivos ativos.
+    """
+    smarthome = SmartHome(max_devices=5)
+    light = Light()
+    security1, security2 = SecuritySystem(), SecuritySystem()
+    smarthome.add_device('light', light)
+    smarthome.add_device('security1', security1)
+    smarthome.add_device('security2', security2)
+    assert smarthome.count_active_devices() == 2  # 'disarmed' não é 'off'
+
+    security1.arm_away()
+    light.turn_on()
+    assert smarthome.get_devices('security', 'armed_away') == [('security1', security1)]
+    assert smarthome.get_devices(SecuritySystem, 'disarmed') == [('security2', security2)]
+    assert smarthome.count_active_devices() == 3
+    assert smarthome.get_active_statuses()[-1] == 'light: Light is on'
+
+    light.turn_off()
+    smarthome.remove_device('security1')
+    security1.disarm()  # fora da casa, não altera mais os índices
+    assert smarthome.get_devices('security', 'armed_away') == []
+    assert smarthome.count_active_devices() == 1
+
+
+def test_smarthome_paginated_statuses():
+    """
+    Testa a listagem de status sob demanda e paginada.
+    """
+    smarthome = SmartHome(max_devices=5)
+    for i in range(5):
+        smarthome.add_device(f'device_{i}', Light() if i % 2 else Thermostat())
+    smarthome.devices['device_1'].turn_on()
+
+    records = smarthome.iter_statuses('light')
+    first = next(records)
+    assert (first.name, first.device_type, first.state) == ('device_1', 'light', 'on')
+    assert first.format() == 'device_1: Light is on'
+    assert [record.name for record in records] == ['device_3']
+
+    page, cursor = smarthome.page_statuses(limit=2)
+    assert [record.name for record in page] == ['device_0', 'device_1'] and cursor == 2
+    page, cursor = smarthome.page_statuses(cursor=cursor, limit=2)
+    page, cursor = smarthome.page_statuses(cursor=cursor, limit=2)
+    assert [record.name for record in page] == ['device_4'] and cursor is None
+    assert smarthome.list_all_devices()[1] == 'device_1: Light is on'
+
+    # Frota maior que um bloco, com inclusões e remoções entre os blocos
+    smarthome = SmartHome(max_devices=3 * STATUS_CHUNK)
+    smarthome.add_devices((f'light_{i}', Light()) for i in range(2 * STATUS_CHUNK + 10))
+    assert [r.name for r in smarthome.iter_statuses(offset=STATUS_CHUNK - 1, limit=3)] == \
+        [f'light_{i}' for i in range(STATUS_CHUNK - 1, STATUS_CHUNK + 2)]
+    names = []
+    for record in smarthome.iter_statuses():
+        names.append(record.name)
+        if len(names) == STATUS_CHUNK:
+            smarthome.add_device('late', Light())
+    assert names[:2 * STATUS_CHUNK + 10] == [f'light_{i}' for i in range(2 * STATUS_CHUNK + 10)]
+    assert names[-1] == 'late'
+
+
+class CountingObserver(Observer):
+    """
+    Observador que conta quantas notificações agrupadas recebeu.
+    """
+    def __init__(self):
+        super().__init__(verbose=False)
+        self.batches = 0
+
+    def update_batch(self, devices):
+        self.batches += 1
+        super().update_batch(devices)
+
+
+def test_smarthome_batch():
+    """
+    Testa os comandos em lote e o broadcast com notificação agrupada.
+    """
+    smarthome = SmartHome(max_devices=6)
+    observer = CountingObserver()
+    devices = {'light1': Light(), 'light2': Light(), 'thermostat': Thermostat(),
+               'security1': SecuritySystem(), 'security2': SecuritySystem()}
+    for name, device in devices.items():
+        device.add_observer(observer)
+        smarthome.add_device(name, device)
+
+    # Validação sem execução, encadeando os estados produzidos pelo próprio lote
+    assert smarthome.validate_batch([('light1', 'turn_on'), ('light1', 'turn_off')]) == []
+    assert smarthome.validate_batch([('thermostat', 'lock'), ('nowhere', 'turn_on')]) == [
+        'Ação lock não encontrada para Thermostat.', 'nowhere not found']
+    assert devices['light1'].state == 'off'
+
+    # Um comando inválido aborta o lote inteiro antes de qualquer transição
+    try:
+        smarthome.apply_batch([('light1', 'turn_on'), ('thermostat', 'lock')])
+        assert False, "Era esperado ValueError"
+    except ValueError:
+        pass
+    assert devices['light1'].state == 'off'
+
+    changed = smarthome.apply_batch([('light1', 'turn_on'), ('light1', 'turn_off'),
+                                     ('light2', 'turn_off'), ('thermostat', 'heat')])
+    assert changed == [devices['light1'], devices['thermostat']]
+    assert devices['light1'].state == 'off'
+    assert observer.batches == 1
+
+    devices['security2'].arm_home()
+    assert smarthome.broadcast('security', 'arm_away') == [devices['security1']]
+    assert smarthome.broadcast(None, 'turn_off') == [devices['thermostat']]
+    assert smarthome.broadcast(('light', 'on'), 'turn_off') == []
+    assert observer.batches == 3
+    assert observer.notifications == ['Light is off', 'Thermostat is heating',
+                                      'Security System is armed_away', 'Thermostat is off']
+
+def test_smarthome_change_feed():
+    """
+    Testa a versão da casa, o feed de mudanças e o pedido de releitura quando a janela é excedida.
+    """
+    for columnar in (False, True):
+        smarthome = SmartHome(max_devices=4, columnar=columnar, feed_size=4)
+        smarthome.add_device('light1', Light())
+        smarthome.add_device('light2', Light())
+        smarthome.add_device('lock', DoorLock())
+        start = smarthome.changes_since(0)
+        assert start.version == smarthome.version == 3 and not start.resync
+        assert [record.format() for record in start.changes] == smarthome.get_statuses()
+
+        smarthome.devices['light1'].turn_on()
+        smarthome.devices['light1'].turn_off()
+        smarthome.broadcast('light', 'turn_on')
+        delta = smarthome.changes_since(start.version)
+        assert delta.version == 7 and sorted((r.name, r.state) for r in delta.changes) == [('light1', 'on'), ('light2', 'on')]
+        assert smarthome.changes_since(delta.version) == (7, [], False)
+
+        smarthome.remove_device('lock')
+        smarthome.add_device('thermostat', Thermostat())
+        delta = smarthome.changes_since(delta.version)
+        assert [tuple(r) for r in delta.changes] == [('lock', 'door_lock', None), ('thermostat', 'thermostat', 'off')]
+
+        # Cinco nomes com feed_size=4: a entrada mais antiga é descartada.
+        assert smarthome.changes_since(3).resync is False
+        smarthome.remove_device('thermostat')
+        smarthome.add_device('thermostat2', Thermostat())
+        assert smarthome.changes_since(3).resync is True
+        assert smarthome.changes_since(smarthome.version + 1).resync is True
+        assert len(smarthome.changes_since(delta.version).changes) == 2
+
+
 if __name__ == "__main__":
     test_smarthome()
+    test_smarthome_columnar()
+    test_smarthome_indexes()
+    test_smarthome_paginated_statuses()
+    test_smarthome_batch()
+    test_smarthome_change_feed()
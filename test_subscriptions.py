@@ -0,0 +1,97 @@
+import random
+from device import DoorLock, Light, Thermostat
+from groups import GroupTree
+from observer import Observer
+from smart_home import SmartHome
+from subscriptions import SubscriptionIndex
+
+def test_subscriptions():
+    """
+    Testa os filtros por tipo, nome, grupo e estados, e a remoção de assinaturas.
+    """
+    home = SmartHome(max_devices=10)
+    tree = GroupTree(home)
+    tree.add_group('ground', 'floor')
+    tree.add_group('kitchen', 'room', parent='ground')
+    tree.assign('back', 'kitchen')
+    index = SubscriptionIndex(home, tree)
+    unlocked, kitchen, front, everything, lights = [], [], [], [], []
+    index.subscribe(unlocked.append, device_type='door_lock', dest='unlocked')
+    index.subscribe(kitchen.append, group='ground', source='locked')
+    front_subscription = index.subscribe(front.append, name='front')
+    index.subscribe(everything.append)
+    index.subscribe(lights.append, device_type='light')
+    observer = Observer(verbose=False)
+    index.subscribe(observer, device_type='thermostat', source='off', dest='heating')
+
+    home.add_device('front', DoorLock())
+    home.add_device('back', DoorLock())
+    home.add_device('hall', Light())
+    home.add_device('living', Thermostat())
+    home.devices['front'].unlock()
+    home.devices['back'].unlock()
+    home.devices['back'].lock_with_alarm()
+    home.devices['hall'].turn_on()
+    home.devices['living'].heat()
+    home.devices['living'].cool()
+
+    assert [e.name for e in unlocked] == ['front', 'back']
+    assert [(e.name, e.dest) for e in kitchen] == [('back', 'unlocked')]
+    assert [e.dest for e in front] == ['locked', 'unlocked']
+    assert len(everything) == 10
+    assert [(e.source, e.dest) for e in lights] == [(None, 'off'), ('off', 'on')]
+    assert [(r.name, r.dest) for r in observer.since(0)] == [('living', 'heating')]
+
+    index.unsubscribe(front_subscription)
+    home.devices['front'].lock()
+    assert len(front) == 2 and len(index) == 5 and front_subscription.delivered == 2
+
+def test_subscriptions_match_brute_force():
+    """
+    Testa o índice contra uma verificação direta dos filtros de cada assinatura.
+    """
+    rng = random.Random(7)
+    home = SmartHome(max_devices=40)
+    tree = GroupTree(home)
+    tree.add_group('a')
+    tree.add_group('b', parent='a')
+    kinds = (Light, Thermostat, DoorLock)
+    for i in range(30):
+        home.add_device(f'd{i}', kinds[i % 3]())
+        if i % 4 == 0:
+            tree.assign(f'd{i}', rng.choice('ab'))
+    index = SubscriptionIndex(home, tree)
+    for _ in range(500):
+        device_class = rng.choice(kinds)
+        kwargs = {'device_type': device_class.device_type if rng.random() < 0.7 else None}
+        if rng.random() < 0.3:
+            kwargs['name'] = f'd{rng.randrange(30)}'
+        elif rng.random() < 0.3:
+            kwargs['group'] = rng.choice('ab')
+        if kwargs['device_type'] and rng.random() < 0.5:
+            kwargs['source'] = rng.choice(device_class.states)
+        if kwargs['device_type'] and rng.random() < 0.5:
+            kwargs['dest'] = rng.choice(device_class.states)
+        index.subscribe(lambda event: None, **kwargs)
+
+    def expected(event):
+        groups = {group.name for group in tree.groups_of(event.name)}
+        return {s.id for s in index.subscriptions.values()
+                if s.device_type in (None, event.device_type) and s.name in (None, event.name)
+                and (s.group is None or s.group in groups) and s.source in (None, event.source)
+                and s.dest in (None, event.dest)}
+
+    events = []
+    home.add_listener(events.append)
+    for _ in range(300):
+        device = home.devices[f'd{rng.randrange(30)}']
+        valid = [trigger for trigger, moves in device._table.items() if device.state in moves]
+        getattr(device, rng.choice(valid))()
+    for event in events:
+        matches = [s.id for s in index.matching(event)]
+        assert len(matches) == len(set(matches)) and set(matches) == expected(event)
+
+if __name__ == "__main__":
+    test_subscriptions()
+    test_subscriptions_match_brute_force()
+    print("Todos os testes passaram!")
@@ -0,0 +1,95 @@
+import os
+import tempfile
+from device import DoorLock, Light, Thermostat
+from smart_home import SmartHome
+from timeseries import StateHistory
+
+class FakeClock:
+    """
+    Relógio controlado manualmente pelos testes.
+    """
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def test_timeseries():
+    """
+    Testa consultas por intervalo, tempo no estado, redução em baldes e segmentos mapeados.
+    """
+    clock = FakeClock(0.0)
+    home = SmartHome(max_devices=5)
+    thermostat = Thermostat()
+    home.add_device('thermostat1', thermostat)
+    history = StateHistory(home, clock=clock)
+    door = DoorLock()
+    home.add_device('front', door)
+    for at, action in [(10, thermostat.heat), (20, door.unlock), (40, thermostat.turn_off),
+                       (50, door.lock), (70, thermostat.heat), (90, door.unlock)]:
+        clock.now = at
+        action()
+    clock.now = 95
+    home.remove_device('front')
+    clock.now = 100
+
+    assert history.events('thermostat1', 10, 70) == [(10, 'heating'), (40, 'off')]
+    assert history.state_at('thermostat1', 39.9) == 'heating'
+    assert history.state_at('front', 96) is None
+    assert history.intervals('front', 'unlocked', 0, 100) == [(20, 50), (90, 95)]
+    assert history.time_in_state('thermostat1', 'heating', 0, 100) == 60
+    assert history.time_in_state('thermostat1', 'heating', 30, 80) == 20
+    assert history.fleet_time_in_state('thermostat', 'heating', 0, 100) == {'thermostat1': 60}
+    assert history.downsample('thermostat', 'heating', 0, 100, 25) == [0.6, 0.6, 0.2, 1.0]
+    assert history.downsample('door_lock', 'locked', 0, 100, 50, name='front') == [0.4, 0.8]
+    assert len(history) == 9
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.seg')
+        history.save(path)
+        assert os.path.getsize(path) < 200
+        loaded = StateHistory.load(path, home=home, clock=clock)
+        assert loaded.intervals('front', 'unlocked', 0, 100) == [(20, 50), (90, 95)]
+        assert loaded.downsample('thermostat', 'heating', 0, 100, 25) == [0.6, 0.6, 0.2, 1.0]
+        clock.now = 110
+        thermostat.turn_off()
+        assert loaded.time_in_state('thermostat1', 'heating', 0, 200) == 70
+        loaded.close()
+        del loaded
+
+def test_timeseries_type_change():
+    """
+    Testa que reutilizar um nome com outro tipo de dispositivo mantém o histórico anterior.
+    """
+    clock = FakeClock(0.0)
+    home = SmartHome(max_devices=2)
+    history = StateHistory(home, clock=clock)
+    light = Light()
+    home.add_device('porch', light)
+    clock.now = 10
+    light.turn_on()
+    clock.now = 30
+    home.remove_device('porch')
+    thermostat = Thermostat()
+    home.add_device('porch', thermostat)
+    clock.now = 40
+    thermostat.heat()
+
+    assert history.events('porch') == [(0, 'off'), (10, 'on'), (30, None), (30, 'off'), (40, 'heating')]
+    assert history.state_at('porch', 20) == 'on' and history.state_at('porch', 30) == 'off'
+    assert history.time_in_state('porch', 'on', 0, 100, device_type='light') == 20
+    assert history.time_in_state('porch', 'heating', 0, 100) == 60
+    assert history.fleet_time_in_state('light', 'on', 0, 100) == {'porch': 20}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'history.seg')
+        history.save(path)
+        loaded = StateHistory.load(path, clock=clock)
+        assert loaded.events('porch') == history.events('porch')
+        assert loaded.time_in_state('porch', 'heating', 0, 100) == 60
+        del loaded
+
+if __name__ == "__main__":
+    test_timeseries()
+    test_timeseries_type_change()
+    print("Todos os testes passaram!")
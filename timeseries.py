@@ -0,0 +1,334 @@
+import struct
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from device import DEVICE_TYPES
+from persistence import _map, _write_atomically
+
+SEGMENT_MAGIC = b'SHTSER1\0'
+NO_STATE = 255  # dispositivo fora da casa (removido)
+
+_SEGMENT_HEADER = struct.Struct('<QQ')     # número de séries, total de eventos
+_SERIES_RECORD = struct.Struct('<HBQ')     # tamanho do nome, tamanho do tipo, número de eventos
+
+
+class _Series:
+    """
+    Transições de um dispositivo em colunas: instantes (8 bytes) e índices de estado (1 byte).
+    """
+    __slots__ = ('device_type', 'states', 'times', 'codes')
+
+    def __init__(self, device_type, times=None, codes=None):
+        self.device_type = device_type
+        self.states = DEVICE_TYPES[device_type].states
+        self.times = array('d') if times is None else times
+        self.codes = array('B') if codes is None else codes
+
+    def writable(self):
+        """
+        Converte colunas mapeadas de um segmento em arrays que aceitam novos eventos.
+        """
+        if not isinstance(self.times, array):
+            self.times = array('d', self.times)
+            self.codes = array('B', self.codes)
+
+
+class StateHistory:
+    """
+    Histórico de estados dos dispositivos, somente de acréscimo.
+
+    Cada dispositivo tem uma série com os instantes das suas mudanças em um
+    array('d') e os estados em um array('B') (índice em `states` da classe), ou seja,
+    9 bytes por evento. As consultas por intervalo usam busca binária sobre os
+    instantes; os segmentos gravados com `save` podem ser reabertos com `load` e são
+    lidos diretamente via mmap, sem cópia.
+
+    As séries são identificadas por (nome, tipo): um nome reutilizado por um
+    dispositivo de outro tipo ganha uma nova série, e o histórico do anterior é
+    mantido. As consultas por nome usam, por padrão, o tipo mais recente do nome
+    (`events` e `state_at` combinam todos os tipos).
+    """
+    def __init__(self, home=None, clock=time.time):
+        """
+        Inicializa o histórico e, se houver uma casa, registra o estado atual dos seus
+        dispositivos e passa a ouvir as mudanças.
+
+        :param home: Instância de SmartHome, ou None para um histórico sem fonte.
+        :param clock: Função que devolve o instante atual, em segundos.
+        """
+        self.home = home
+        self.clock = clock
+        self.series = {}
+        self._types = {}  # nome -> tipos já registrados, o mais recente por último
+        self._indexes = {}
+        if home is not None:
+            now = clock()
+            for name, device in home.devices.items():
+                self.record(name, device.device_type, device.state, now)
+            home.add_listener(self.on_change)
+
+    def close(self):
+        """
+        Desliga o histórico da casa.
+        """
+        if self.home is not None:
+            self.home.remove_listener(self.on_change)
+            self.home = None
+
+    def __len__(self):
+        """
+        :return: Número total de eventos.
+        """
+        return sum(len(series.times) for series in self.series.values())
+
+    def _index(self, device_type):
+        """
+        :return: Dicionário estado -> índice da classe de um tipo.
+        """
+        index = self._indexes.get(device_type)
+        if index is None:
+            index = self._indexes[device_type] = {state: i for i, state in enumerate(DEVICE_TYPES[device_type].states)}
+        return index
+
+    def record(self, name, device_type, state, timestamp=None):
+        """
+        Acrescenta um evento ao histórico de um dispositivo.
+
+        :param name: Nome do dispositivo.
+        :param device_type: Tipo do dispositivo.
+        :param state: Novo estado, ou None se o dispositivo saiu da casa.
+        :param timestamp: Instante do evento; por padrão, o relógio. Instantes anteriores ao
+            último evento da série são ajustados para ele, mantendo a série ordenada.
+        """
+        series = self.series.get((name, device_type))
+        if series is None:
+            series = self.series[(name, device_type)] = _Series(device_type)
+        else:
+            series.writable()
+        types = self._types.setdefault(name, [])
+        if not types or types[-1] != device_type:
+            if device_type in types:
+                types.remove(device_type)
+            types.append(device_type)
+        if timestamp is None:
+            timestamp = self.clock()
+        times = series.times
+        if times and timestamp < times[-1]:
+            timestamp = times[-1]
+        times.append(timestamp)
+        series.codes.append(NO_STATE if state is None else self._index(device_type)[state])
+
+    def on_change(self, event):
+        """
+        Registra um ChangeEvent da casa.
+
+        :param event: Evento de mudança.
+        """
+        self.record(event.name, event.device_type, event.dest)
+
+    def _get(self, name, device_type=None):
+        """
+        :return: Série de um dispositivo no tipo informado ou, por padrão, no seu tipo mais recente.
+        """
+        types = self._types.get(name)
+        series = None
+        if types:
+            series = self.series.get((name, types[-1] if device_type is None else device_type))
+        if series is None:
+            raise KeyError(f"No history for device: {name}")
+        return series
+
+    def _all(self, name):
+        """
+        :return: Séries de um dispositivo em todos os tipos que ele já teve.
+        """
+        types = self._types.get(name)
+        if not types:
+            raise KeyError(f"No history for device: {name}")
+        return [self.series[(name, device_type)] for device_type in types]
+
+    def events(self, name, start=None, end=None):
+        """
+        Lista as mudanças de um dispositivo em um intervalo, em todos os tipos que ele já teve.
+
+        :param name: Nome do dispositivo.
+        :param start: Início do intervalo (inclusivo), ou None para o começo.
+        :param end: Fim do intervalo (exclusivo), ou None para o fim.
+        :return: Lista de tuplas (instante, estado ou None se removido).
+        :raises KeyError: Se não houver histórico do dispositivo.
+        """
+        events = []
+        for series in self._all(name):
+            times = series.times
+            first = 0 if start is None else bisect_left(times, start)
+            last = len(times) if end is None else bisect_left(times, end)
+            states = series.states
+            events.extend((times[i], None if series.codes[i] == NO_STATE else states[series.codes[i]])
+                          for i in range(first, last))
+        # No mesmo instante, a remoção do dispositivo anterior vem antes da inclusão do novo
+        events.sort(key=lambda event: (event[0], event[1] is not None))
+        return events
+
+    def state_at(self, name, timestamp):
+        """
+        :return: Estado do dispositivo no instante, em qualquer tipo que ele tinha então, ou
+            None se ele não estava na casa.
+        :raises KeyError: Se não houver histórico do dispositivo.
+        """
+        latest = None
+        for series in self._all(name):
+            i = bisect_right(series.times, timestamp) - 1
+            if i >= 0:
+                key = (series.times[i], series.codes[i] != NO_STATE)
+                if latest is None or key > latest[0]:
+                    latest = (key, series, series.codes[i])
+        if latest is None or latest[2] == NO_STATE:
+            return None
+        return latest[1].states[latest[2]]
+
+    def _spans(self, series, code, start, end):
+        """
+        Gera os trechos (início, fim) de [start, end) em que a série esteve no estado `code`.
+        """
+        times, codes = series.times, series.codes
+        i = bisect_right(times, start) - 1
+        current = codes[i] if i >= 0 else NO_STATE
+        since = start
+        for j in range(i + 1, bisect_left(times, end)):
+            if codes[j] != current:
+                if current == code:
+                    yield since, times[j]
+                current = codes[j]
+                since = times[j]
+        if current == code and since < end:
+            yield since, end
+
+    def intervals(self, name, state, start, end, device_type=None):
+        """
+        Lista os trechos de um intervalo em que um dispositivo esteve em um estado
+        (e.g., quando a fechadura esteve destrancada).
+
+        :param device_type: Tipo do dispositivo; por padrão, o tipo mais recente do nome.
+        :return: Lista de tuplas (início, fim).
+        :raises KeyError: Se não houver histórico do dispositivo.
+        """
+        series = self._get(name, device_type)
+        return list(self._spans(series, self._index(series.device_type)[state], start, end))
+
+    def time_in_state(self, name, state, start, end, device_type=None):
+        """
+        :param device_type: Tipo do dispositivo; por padrão, o tipo mais recente do nome.
+        :return: Tempo, em segundos, que o dispositivo passou no estado dentro de [start, end)
+            (e.g., quanto tempo o termostato aqueceu hoje).
+        :raises KeyError: Se não houver histórico do dispositivo.
+        """
+        return sum(to - since for since, to in self.intervals(name, state, start, end, device_type))
+
+    def fleet_time_in_state(self, device_type, state, start, end):
+        """
+        Soma o tempo no estado de todos os dispositivos de um tipo.
+
+        :return: Dicionário nome -> segundos, apenas com os dispositivos que estiveram no estado.
+        """
+        code = self._index(device_type)[state]
+        totals = {}
+        for (name, series_type), series in self.series.items():
+            if series_type == device_type:
+                total = sum(to - since for since, to in self._spans(series, code, start, end))
+                if total:
+                    totals[name] = total
+        return totals
+
+    def downsample(self, device_type, state, start, end, step, name=None):
+        """
+        Reduz o histórico a baldes de tamanho fixo.
+
+        :param device_type: Tipo dos dispositivos.
+        :param state: Estado medido.
+        :param start: Início do primeiro balde.
+        :param end: Fim do intervalo.
+        :param step: Tamanho de cada balde, em segundos.
+        :param name: Dispositivo a considerar, ou None para todos os do tipo.
+        :return: Lista com, para cada balde, o número médio de dispositivos no estado (para um
+            único dispositivo, a fração do balde em que ele esteve no estado).
+        """
+        code = self._index(device_type)[state]
+        buckets = [0.0] * max(0, -int((start - end) // step))
+        if name is None:
+            selected = [series for series in self.series.values() if series.device_type == device_type]
+        else:
+            selected = [self._get(name, device_type)]
+        for series in selected:
+            for since, to in self._spans(series, code, start, end):
+                index = int((since - start) // step)
+                while since < to:
+                    limit = min(to, start + (index + 1) * step)
+                    buckets[index] += limit - since
+                    since = limit
+                    index += 1
+        return [total / step for total in buckets]
+
+    def save(self, path):
+        """
+        Grava o histórico em um segmento binário compacto.
+
+        Formato: cabeçalho, diretório das séries (nome, tipo, número de eventos), todos
+        os instantes (alinhados em 8 bytes) e todos os índices de estado.
+
+        :param path: Caminho do arquivo.
+        """
+        directory = []
+        for (name, _), series in self.series.items():
+            name_bytes, type_bytes = name.encode('utf-8'), series.device_type.encode('utf-8')
+            directory.append(_SERIES_RECORD.pack(len(name_bytes), len(type_bytes), len(series.times)))
+            directory.append(name_bytes)
+            directory.append(type_bytes)
+        head = SEGMENT_MAGIC + _SEGMENT_HEADER.pack(len(self.series), len(self)) + b''.join(directory)
+        parts = [head, bytes(-len(head) % 8)]
+        parts.extend(series.times.tobytes() if isinstance(series.times, array) else bytes(series.times)
+                     for series in self.series.values())
+        parts.extend(bytes(series.codes) for series in self.series.values())
+        _write_atomically(path, b''.join(parts))
+
+    @classmethod
+    def load(cls, path, home=None, clock=time.time):
+        """
+        Abre um segmento gravado com `save`, mapeando-o em memória: as séries são lidas
+        diretamente do arquivo e só são copiadas se receberem novos eventos.
+
+        :param path: Caminho do arquivo.
+        :param home: Casa cujas mudanças passam a ser acrescentadas, ou None.
+        :param clock: Função que devolve o instante atual.
+        :return: Novo StateHistory.
+        :raises ValueError: Se o arquivo não for um segmento válido.
+        """
+        history = cls(clock=clock)
+        data = _map(path)
+        if data[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            raise ValueError(f"Not a state history segment: {path}")
+        view = memoryview(data)
+        count, total = _SEGMENT_HEADER.unpack_from(data, len(SEGMENT_MAGIC))
+        offset = len(SEGMENT_MAGIC) + _SEGMENT_HEADER.size
+        directory = []
+        for _ in range(count):
+            name_size, type_size, events = _SERIES_RECORD.unpack_from(data, offset)
+            offset += _SERIES_RECORD.size
+            name = bytes(view[offset:offset + name_size]).decode('utf-8')
+            device_type = bytes(view[offset + name_size:offset + name_size + type_size]).decode('utf-8')
+            offset += name_size + type_size
+            directory.append((name, device_type, events))
+        times = view[offset + (-offset % 8):][:8 * total].cast('d')
+        codes = view[offset + (-offset % 8) + 8 * total:][:total]
+        first = 0
+        latest = {}
+        for name, device_type, events in directory:
+            series = history.series[(name, device_type)] = _Series(
+                device_type, times[first:first + events], codes[first:first + events])
+            first += events
+            latest.setdefault(name, []).append((series.times[-1] if events else 0.0, device_type))
+        for name, types in latest.items():
+            history._types[name] = [device_type for _, device_type in sorted(types)]
+        if home is not None:
+            history.home = home
+            home.add_listener(history.on_change)
+        return history